@@ -0,0 +1,189 @@
+"""
+저장된 세션과 생성 로그를 일괄 분석하여 정적 HTML/JSON 리포트를 만드는 스크립트
+
+사용 예:
+    python analytics_report.py --sessions saved_sessions --logs generation_logs --out reports
+"""
+import os
+import json
+import argparse
+import logging
+from datetime import datetime
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+import pyarrow.dataset as ds
+
+from generation_log import LOG_SCHEMA
+from session_reader import resolve_saved_path
+
+GROUP_KEYS = ("style", "mood", "aspect_ratio")
+QUANTILES = (0.5, 0.9, 0.99)
+SESSION_FIELDS = ("type", "style", "mood", "composition", "aspect_ratio", "visualization_type", "timestamp")
+
+
+def load_sessions(save_dir: str) -> pd.DataFrame:
+    """세션 매니페스트에서 분석에 필요한 필드만 추려 DataFrame 구성"""
+    rows = []
+    if not os.path.isdir(save_dir):
+        return pd.DataFrame(columns=list(SESSION_FIELDS) + ["image_count", "image_files", "image_bytes"])
+
+    for session_name in os.listdir(save_dir):
+        config_path = os.path.join(save_dir, session_name, "config.json")
+        if not os.path.isfile(config_path):
+            continue
+        try:
+            with open(config_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+        except Exception as e:
+            logging.error(f"세션 읽기 실패 ({session_name}): {str(e)}")
+            continue
+
+        images = manifest.get('saved_images') or {}
+        # 중복 제거된 블롭은 한 번만 집계
+        unique_paths = {resolve_saved_path(p) for p in images.values()}
+        row = {field: manifest.get(field) for field in SESSION_FIELDS}
+        row["session"] = session_name
+        row["image_count"] = len(images)
+        # 같은 블롭을 다른 형태의 경로(상대/절대)로 기록한 세션도 같은 파일로 집계
+        row["image_files"] = tuple(sorted(os.path.realpath(p) for p in unique_paths if os.path.exists(p)))
+        row["image_bytes"] = sum(os.path.getsize(p) for p in row["image_files"])
+        rows.append(row)
+    return pd.DataFrame(rows)
+
+
+def unique_image_bytes(file_lists) -> int:
+    """
+    여러 세션의 이미지 파일 용량 합계 (같은 파일은 한 번만 집계)
+
+    블롭 경로는 내용 해시(sha256)로 정해지므로 경로로 중복을 제거하면 세션 간에 공유된 블롭도 한 번만 셉니다.
+    """
+    unique = set()
+    for files in file_lists:
+        unique.update(files)
+    return sum(os.path.getsize(p) for p in unique if os.path.exists(p))
+
+
+def load_generation_logs(log_dir: str) -> pd.DataFrame:
+    """Parquet 생성 로그 중 분석 열만 읽어 DataFrame으로 변환"""
+    columns = ["timestamp", "flow", "style", "mood", "aspect_ratio", "scene_count",
+               "total_time", "avg_clip_score", "scene_times", "scores", "cut_attempts"]
+    if not os.path.isdir(log_dir):
+        return pd.DataFrame(columns=columns)
+    dataset = ds.dataset(log_dir, format="parquet", partitioning="hive", schema=LOG_SCHEMA,
+                         exclude_invalid_files=True)
+    return dataset.to_table(columns=columns).to_pandas()
+
+
+def _distribution(df: pd.DataFrame, keys: List[str], column: str) -> pd.DataFrame:
+    """그룹별 평균과 분위수를 한 번의 groupby로 계산"""
+    grouped = df.groupby(keys, dropna=False)[column]
+    stats = grouped.agg(["count", "mean"])
+    quantiles = grouped.quantile(list(QUANTILES)).unstack()
+    quantiles.columns = [f"p{int(q * 100)}" for q in quantiles.columns]
+    return stats.join(quantiles).reset_index()
+
+
+def build_report(sessions: pd.DataFrame, logs: pd.DataFrame) -> Dict[str, pd.DataFrame]:
+    """스타일/분위기/비율별 분포 테이블 생성"""
+    report = {}
+
+    if not logs.empty:
+        # 컷 단위 지연/점수는 리스트 열을 펼쳐 벡터 연산으로 집계
+        cuts = logs[list(GROUP_KEYS) + ["flow", "scene_times", "scores"]].explode(["scene_times", "scores"])
+        cuts = cuts.dropna(subset=["scene_times"]).astype({"scene_times": float, "scores": float})
+        # 컷별 시도 횟수는 이 열을 기록하기 전의 로그에는 없으므로 따로 펼침
+        tries = logs[list(GROUP_KEYS) + ["cut_attempts"]].explode("cut_attempts")
+        tries = tries.dropna(subset=["cut_attempts"]).astype({"cut_attempts": float})
+
+        for key in GROUP_KEYS:
+            report[f"episode_latency_by_{key}"] = _distribution(logs, [key], "total_time")
+            report[f"cuts_by_{key}"] = _distribution(logs, [key], "scene_count")
+            if not tries.empty:
+                report[f"image_attempts_by_{key}"] = _distribution(tries, [key], "cut_attempts")
+            report[f"clip_score_by_{key}"] = _distribution(logs, [key], "avg_clip_score")
+            if not cuts.empty:
+                report[f"cut_latency_by_{key}"] = _distribution(cuts, [key], "scene_times")
+        report["episode_latency_by_flow"] = _distribution(logs, ["flow"], "total_time")
+
+    if not sessions.empty:
+        for key in ("type",) + GROUP_KEYS:
+            if key in sessions:
+                report[f"sessions_by_{key}"] = (
+                    sessions.groupby(key, dropna=False)
+                    .agg(sessions=("session", "count"),
+                         images=("image_count", "sum"),
+                         image_bytes=("image_files", unique_image_bytes))
+                    .reset_index()
+                )
+    return report
+
+
+def _json_ready(df: pd.DataFrame) -> List[Dict]:
+    return json.loads(df.replace({np.nan: None}).to_json(orient="records", force_ascii=False))
+
+
+def write_report(report: Dict[str, pd.DataFrame], sessions: pd.DataFrame, logs: pd.DataFrame,
+                 out_dir: str) -> Dict[str, str]:
+    """리포트를 JSON과 정적 HTML로 저장"""
+    os.makedirs(out_dir, exist_ok=True)
+    generated_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    overview = {
+        "generated_at": generated_at,
+        "session_count": int(len(sessions)),
+        "episode_count": int(len(logs)),
+        "total_image_bytes": unique_image_bytes(sessions["image_files"]) if not sessions.empty else 0,
+    }
+
+    json_path = os.path.join(out_dir, "report.json")
+    with open(json_path, 'w', encoding='utf-8') as f:
+        json.dump({"overview": overview, **{name: _json_ready(df) for name, df in report.items()}},
+                  f, ensure_ascii=False, indent=2)
+
+    sections = [
+        f"<h2>{name}</h2>\n{df.to_html(index=False, float_format=lambda v: f'{v:.3f}', na_rep='-')}"
+        for name, df in report.items()
+    ]
+    html = f"""<!DOCTYPE html>
+<html lang="ko">
+<head>
+<meta charset="utf-8">
+<title>Webtoonizer 생성 분석 리포트</title>
+<style>
+body {{ font-family: sans-serif; margin: 2em; }}
+table {{ border-collapse: collapse; margin-bottom: 2em; }}
+th, td {{ border: 1px solid #ccc; padding: 4px 8px; text-align: right; }}
+th {{ background: #f4f4f4; }}
+</style>
+</head>
+<body>
+<h1>Webtoonizer 생성 분석 리포트</h1>
+<p>생성 시각: {generated_at} · 세션 {overview['session_count']}개 · 에피소드 로그 {overview['episode_count']}건 ·
+이미지 용량 {overview['total_image_bytes'] / 1024 / 1024:.1f} MB</p>
+{''.join(sections) or '<p>분석할 데이터가 없습니다.</p>'}
+</body>
+</html>
+"""
+    html_path = os.path.join(out_dir, "report.html")
+    with open(html_path, 'w', encoding='utf-8') as f:
+        f.write(html)
+    return {"json": json_path, "html": html_path}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="저장된 세션과 생성 로그 분석 리포트 생성")
+    parser.add_argument("--sessions", default="saved_sessions", help="세션 저장 디렉토리")
+    parser.add_argument("--logs", default="generation_logs", help="생성 로그(Parquet) 디렉토리")
+    parser.add_argument("--out", default="reports", help="리포트 출력 디렉토리")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    sessions = load_sessions(args.sessions)
+    logs = load_generation_logs(args.logs)
+    paths = write_report(build_report(sessions, logs), sessions, logs, args.out)
+    print(f"리포트 생성 완료: {paths['html']}, {paths['json']}")
+
+
+if __name__ == "__main__":
+    main()
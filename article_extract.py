@@ -0,0 +1,72 @@
+import re
+from typing import Optional
+
+from lxml import etree
+
+# 본문 영역 후보 (우선순위 순): 최신 네이버 뉴스, 구형 기사 페이지, 연예/스포츠 등 기타 섹션
+_BODY_MATCHERS = (
+    etree.XPath('self::*[@id="dic_area"]'),
+    etree.XPath('self::*[@id="articleBodyContents"]'),
+    etree.XPath('self::*[contains(concat(" ", normalize-space(@class), " "), " news_end ")]'),
+)
+_REMOVED_TAGS = ("script", "iframe", "style")
+_WHITESPACE = re.compile(r'\s+')
+_CHUNK_SIZE = 16 * 1024
+
+
+def _body_priority(element) -> Optional[int]:
+    """본문 후보이면 _BODY_MATCHERS에서의 우선순위, 아니면 None"""
+    # 속성 비교로 대부분의 요소를 걸러낸 뒤에만 XPath 평가
+    element_id = element.get("id")
+    if element_id == "dic_area":
+        return 0
+    if element_id == "articleBodyContents":
+        return 1
+    if "news_end" in (element.get("class") or "") and _BODY_MATCHERS[2](element):
+        return 2
+    return None
+
+
+def find_article_body(html: str):
+    """
+    HTML을 조각 단위로 파싱하면서 우선순위가 가장 높은 본문 요소를 찾아 반환
+
+    최우선 후보(dic_area)가 닫히면 즉시 중단합니다. 네이버 기사 페이지는 본문 뒤에
+    랭킹/댓글/푸터가 길게 이어지므로 이 경우 본문 이후 부분은 파싱하지 않습니다.
+    하위 후보만 나온 경우에는 더 높은 후보가 뒤에 있을 수 있으므로 끝까지 파싱한 뒤
+    우선순위가 가장 높은 요소를 반환합니다.
+    """
+    parser = etree.HTMLPullParser(events=("end",))
+    best, best_priority = None, len(_BODY_MATCHERS)
+    for start in range(0, len(html), _CHUNK_SIZE):
+        parser.feed(html[start:start + _CHUNK_SIZE])
+        for _, element in parser.read_events():
+            priority = _body_priority(element)
+            if priority is None or priority >= best_priority:
+                continue
+            if priority == 0:
+                return element
+            best, best_priority = element, priority
+    root = parser.close()
+    if best is not None:
+        return best
+
+    # 스트리밍 중 찾지 못한 경우(닫는 태그 누락 등) 완성된 트리에서 우선순위대로 탐색
+    if root is None:
+        return None
+    for matcher in _BODY_MATCHERS:
+        for element in root.iter():
+            if isinstance(element.tag, str) and matcher(element):
+                return element
+    return None
+
+
+def extract_article_text(html: str) -> Optional[str]:
+    """네이버 뉴스 HTML에서 기사 본문 텍스트 추출 (본문 영역이 없으면 None)"""
+    body = find_article_body(html)
+    if body is None:
+        return None
+
+    etree.strip_elements(body, *_REMOVED_TAGS, with_tail=False)
+    text = "".join(part.strip() for part in body.itertext())
+    return _WHITESPACE.sub(' ', text)
@@ -1,17 +1,39 @@
-import openai
 import os
+import logging
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from cachetools import LRUCache
 from dotenv import load_dotenv
+from openai import OpenAI
+
+from cost_governor import governed_chat
+from episode_model import stable_hash
+from tracing import span, traced
 
 # .env 파일에서 API 키 로드
 load_dotenv()
-openai.api_key = os.getenv("OPENAI_API_KEY")
 
-def extract_news_info(title, content):
+MAX_PARALLEL_ARTICLES = int(os.getenv("WEBTOONIZER_NEWS_PIPELINE_CONCURRENCY", "3"))
+
+
+def _message_lines(response) -> Optional[List[str]]:
+    if response and response.choices:
+        return response.choices[0].message.content.strip().split('\n')
+    print("API 호출이 성공했지만, 응답이 비어 있습니다:", response)
+    return None
+
+
+@traced("gpt.extract_news_info")
+def extract_news_info(client: OpenAI, title, content):
     """
     뉴스 기사의 전체 내용을 사용하여 핵심 정보를 추출합니다.
     """
     try:
-        response = openai.ChatCompletion.create(
+        response = governed_chat(
+            client,
             model="gpt-3.5-turbo",
             messages=[
                 {"role": "system", "content": "Extract key information from the news article and format it as bullet points."},
@@ -19,17 +41,16 @@ def extract_news_info(title, content):
             ],
             max_tokens=500  # 더 많은 내용을 포함하기 위해 증가시킴
         )
-        if response and response.choices:
-            # 응답을 줄바꿈 기준으로 나누어 리스트로 반환
-            return response.choices[0].message['content'].strip().split('\n')
-        else:
-            print("API 호출이 성공했지만, 응답이 비어 있습니다:", response)
-            return None
+        # 응답을 줄바꿈 기준으로 나누어 리스트로 반환
+        return _message_lines(response)
     except Exception as e:
         print(f"API 호출 중 오류 발생: {e}")
         return None
 
-def simplify_terms_dynamically(content, domain_hint="general", simplification_level="basic", extract_keywords=True):
+
+@traced("gpt.simplify_terms")
+def simplify_terms_dynamically(client: OpenAI, content, domain_hint="general", simplification_level="basic",
+                               extract_keywords=True):
     """
     뉴스 기사에서 복잡한 용어를 간소화하고 주요 키워드를 추출합니다.
     """
@@ -43,30 +64,30 @@ def simplify_terms_dynamically(content, domain_hint="general", simplification_le
                 Extract Keywords: {extract_keywords}
             """}
         ]
-        response = openai.ChatCompletion.create(
+        response = governed_chat(
+            client,
             model="gpt-3.5-turbo",
             messages=messages,
             max_tokens=200  # 충분한 길이로 설정
         )
-        if response and response.choices:
-            return response.choices[0].message['content'].strip().split('\n')
-        else:
-            print("API 호출이 성공했지만, 응답이 비어 있습니다:", response)
-            return None
+        return _message_lines(response)
     except Exception as e:
         print(f"Error in simplify_terms_dynamically: {e}")
         return None
 
-def generate_webtoon_scenes(extracted_info):
+
+@traced("gpt.generate_webtoon_scenes")
+def generate_webtoon_scenes(client: OpenAI, extracted_info):
     """
     추출된 정보를 기반으로 최대 4컷 이하의 웹툰 장면을 생성합니다.
     """
     try:
-        response = openai.ChatCompletion.create(
+        response = governed_chat(
+            client,
             model="gpt-4",
             messages=[
                 {
-                    "role": "system", 
+                    "role": "system",
                     "content": (
                         "Create a webtoon episode based on the extracted information from a news article. "
                         "The episode should consist of up to 4 distinct scenes. "
@@ -78,30 +99,119 @@ def generate_webtoon_scenes(extracted_info):
             ],
             max_tokens=500
         )
-        if response and response.choices:
-            # 응답을 줄바꿈 기준으로 나누고 빈 문자열 제거
-            scenes = response.choices[0].message['content'].strip().split('\n')
-            scenes = [scene.strip() for scene in scenes if scene.strip()]  # 빈 문자열 제거 및 각 장면 트리밍
-            
-            # "Scene X:" 패턴이 있을 때만 장면별로 나누기
-            separated_scenes = []
-            current_scene = []
-            for line in scenes:
-                if line.startswith("Scene"):
-                    if current_scene:
-                        separated_scenes.append(" ".join(current_scene))
-                        current_scene = []
-                    current_scene.append(line)
-                else:
-                    current_scene.append(line)
-            if current_scene:
-                separated_scenes.append(" ".join(current_scene))
-
-            # 최대 4개의 장면만 반환
-            return separated_scenes[:4] if len(separated_scenes) > 4 else separated_scenes
-        else:
-            print("API 호출이 성공했지만, 응답이 비어 있습니다:", response)
+        scenes = _message_lines(response)
+        if scenes is None:
             return None
+
+        # 빈 문자열 제거 및 각 장면 트리밍
+        scenes = [scene.strip() for scene in scenes if scene.strip()]
+
+        # "Scene X:" 패턴이 있을 때만 장면별로 나누기
+        separated_scenes = []
+        current_scene = []
+        for line in scenes:
+            if line.startswith("Scene"):
+                if current_scene:
+                    separated_scenes.append(" ".join(current_scene))
+                    current_scene = []
+                current_scene.append(line)
+            else:
+                current_scene.append(line)
+        if current_scene:
+            separated_scenes.append(" ".join(current_scene))
+
+        # 최대 4개의 장면만 반환
+        return separated_scenes[:4]
     except Exception as e:
         print(f"Error in generate_webtoon_scenes: {e}")
         return None
+
+
+class NewsPipeline:
+    """
+    뉴스 기사 -> 핵심 정보/용어 간소화 -> 웹툰 장면 파이프라인
+
+    서로 독립적인 핵심 정보 추출과 용어 간소화는 동시에 실행하고,
+    결과는 기사 URL 단위로 캐시합니다 (같은 URL이라도 본문이 바뀌면 다시 계산).
+    """
+
+    def __init__(self, client: OpenAI, max_workers: int = MAX_PARALLEL_ARTICLES * 2, cache_size: int = 256):
+        self.client = client
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="news-pipeline")
+        self._cache = LRUCache(maxsize=cache_size)
+        self._lock = threading.Lock()
+
+    def _submit(self, fn, *args, **kwargs):
+        # 비용 관리자/추적 스팬이 작업 스레드에서도 이어지도록 컨텍스트 복사
+        ctx = contextvars.copy_context()
+        return self._executor.submit(ctx.run, fn, *args, **kwargs)
+
+    def cached(self, url: str, content: str) -> Optional[Dict]:
+        with self._lock:
+            entry = self._cache.get(url)
+        if entry and entry[0] == stable_hash(content):
+            return entry[1]
+        return None
+
+    def process_article(self, title: str, content: str, url: Optional[str] = None) -> Dict:
+        """
+        기사 하나를 장면 목록까지 처리
+
+        Returns:
+            dict: extracted_info, simplified_content, scenes (각 단계 실패 시 None)
+        """
+        cache_key = url or stable_hash(title, content)
+        result = self.cached(cache_key, content)
+        if result is not None:
+            logging.info(f"뉴스 파이프라인 캐시 사용: {cache_key}")
+            return result
+
+        with span("news.pipeline"):
+            info_future = self._submit(extract_news_info, self.client, title, content)
+            simplify_future = self._submit(simplify_terms_dynamically, self.client, content)
+            extracted_info = info_future.result()
+            # 장면 생성은 핵심 정보에만 의존하므로 간소화 완료를 기다리지 않음
+            scenes = generate_webtoon_scenes(self.client, extracted_info) if extracted_info else None
+            simplified_content = simplify_future.result()
+
+        result = {
+            "extracted_info": extracted_info,
+            "simplified_content": simplified_content,
+            "scenes": scenes,
+        }
+        if extracted_info and scenes:
+            with self._lock:
+                self._cache[cache_key] = (stable_hash(content), result)
+        return result
+
+    def process_articles(self, articles: List[Dict]) -> List[Dict]:
+        """
+        여러 기사를 한 번에 처리 (동시에 처리하는 기사 수는 MAX_PARALLEL_ARTICLES로 제한)
+
+        Args:
+            articles (list): {"title", "content", "url"} 딕셔너리 목록
+
+        Returns:
+            list: 입력 순서대로의 process_article 결과
+        """
+        def run(article):
+            return self.process_article(article["title"], article["content"], article.get("url"))
+
+        # 기사 단위 작업은 별도 풀에서 실행하여 내부 단계 작업과 스레드를 나눠 쓰지 않음
+        with ThreadPoolExecutor(max_workers=MAX_PARALLEL_ARTICLES, thread_name_prefix="news-batch") as pool:
+            futures = [pool.submit(contextvars.copy_context().run, run, article) for article in articles]
+            return [future.result() for future in futures]
+
+
+_pipeline = None
+_pipeline_lock = threading.Lock()
+
+
+def get_news_pipeline(client: OpenAI) -> NewsPipeline:
+    """프로세스 공용 뉴스 파이프라인 (URL 캐시를 세션 간에 공유)"""
+    global _pipeline
+    if _pipeline is None:
+        with _pipeline_lock:
+            if _pipeline is None:
+                _pipeline = NewsPipeline(client)
+    return _pipeline
@@ -0,0 +1,73 @@
+"""
+기사 본문 추출 벤치마크 - 기존 BeautifulSoup(html.parser) 방식과 lxml 추출기 비교
+
+사용 예:
+    python benchmark_news_extract.py --fixtures news_fixtures --repeat 200
+"""
+import os
+import re
+import time
+import argparse
+from typing import Callable, Dict, List, Optional
+
+from bs4 import BeautifulSoup
+
+from article_extract import extract_article_text
+
+
+def extract_with_bs4(html: str) -> Optional[str]:
+    """기존 user_input.extract_news_content의 파싱 로직"""
+    soup = BeautifulSoup(html, 'html.parser')
+    article = soup.select_one('#dic_area') or soup.select_one('#articleBodyContents') or soup.select_one('.news_end')
+    if not article:
+        return None
+    for tag in article.select('script, iframe, style'):
+        tag.decompose()
+    return re.sub(r'\s+', ' ', article.get_text(strip=True))
+
+
+def load_fixtures(fixture_dir: str) -> Dict[str, str]:
+    corpus = {}
+    for name in sorted(os.listdir(fixture_dir)):
+        if name.endswith(".html"):
+            with open(os.path.join(fixture_dir, name), 'r', encoding='utf-8') as f:
+                corpus[name] = f.read()
+    return corpus
+
+
+def time_extractor(extract: Callable[[str], Optional[str]], documents: List[str], repeat: int) -> float:
+    """문서당 평균 추출 시간(ms)"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for html in documents:
+            extract(html)
+    return (time.perf_counter() - start) * 1000 / (repeat * len(documents))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="기사 본문 추출 벤치마크")
+    parser.add_argument("--fixtures", default="news_fixtures", help="저장된 기사 HTML 디렉토리")
+    parser.add_argument("--repeat", type=int, default=200, help="반복 횟수")
+    args = parser.parse_args()
+
+    corpus = load_fixtures(args.fixtures)
+    if not corpus:
+        print(f"HTML 픽스처가 없습니다: {args.fixtures}")
+        return
+
+    # 두 추출기의 결과가 같은지 먼저 확인
+    mismatches = [name for name, html in corpus.items() if extract_with_bs4(html) != extract_article_text(html)]
+    for name in mismatches:
+        print(f"결과 불일치: {name}")
+
+    documents = list(corpus.values())
+    baseline = time_extractor(extract_with_bs4, documents, args.repeat)
+    optimized = time_extractor(extract_article_text, documents, args.repeat)
+    print(f"문서 {len(documents)}개 x {args.repeat}회")
+    print(f"BeautifulSoup(html.parser): {baseline:.3f} ms/문서")
+    print(f"lxml 추출기:               {optimized:.3f} ms/문서")
+    print(f"속도 향상: {baseline / optimized:.1f}배")
+
+
+if __name__ == "__main__":
+    main()
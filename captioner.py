@@ -0,0 +1,130 @@
+import os
+import json
+import logging
+from typing import List, Optional
+
+from openai import OpenAI
+
+from cost_governor import governed_chat
+from tracing import traced
+
+CAPTION_MODEL = "gpt-3.5-turbo"
+CAPTION_BATCH_SIZE = int(os.getenv("WEBTOONIZER_CAPTION_BATCH_SIZE", "20"))  # 응답 길이 제한 때문에 이 컷 수마다 한 번 호출
+CAPTION_TOKENS_PER_CUT = 200
+ORIGINAL_TEXT_LIMIT = 3000  # 요청마다 함께 보내는 원문 최대 길이
+
+STORY_CAPTION_GUIDE = """각 장면에 대해 독자의 이해를 돕는 설명을 만들어주세요.
+요구사항:
+1. 원본 텍스트의 내용과 표현을 최대한 유지할 것
+2. 현재 장면에 해당하는 부분을 중심으로 설명할 것
+3. 이야기의 흐름이 앞뒤 장면과 자연스럽게 이어지도록 할 것
+4. 기술적인 설명이나 시각적 묘사는 최소화할 것
+5. 실제 스토리텔링에 중점을 둘 것
+예시:
+❌ "위에서 내려다보는 구도로, 왼쪽에는 개미들이 오른쪽에는 베짱이가 위치해 있다"
+⭕ "무더운 여름날, 주인공이 무엇을 하는데 무엇이 발생했다."
+⭕ "주인공은 어떠한 상황에 있다\""""
+
+NONFICTION_CAPTION_GUIDE = """각 장면의 맥락과 핵심 메시지를 설명해주세요.
+요구사항:
+1. 단순한 시각적 묘사("~장면이다")는 피하고, 맥락과 의미를 담을 것
+2. 가능한 현재형으로 설명할 것
+3. 필요시 인과관계나 변화를 포함해도 좋음
+예시:
+❌ "원과 화살표가 연결된 장면이다"
+⭕ "물이 수증기로 변하며 순환하는 과정을 보여줍니다"
+❌ "두 개의 사각형이 비교된 장면이다"
+⭕ "고체와 액체 상태에서 분자의 움직임이 달라집니다\""""
+
+
+def fit_caption(caption: str, max_chars: int) -> str:
+    """캡션을 max_chars 이내로 맞춤 (가능하면 마지막 문장 끝에서 자르고, 없으면 잘라낸 뒤 마침표 추가)"""
+    caption = ' '.join(caption.split())
+    if not caption:
+        return caption
+    if len(caption) > max_chars:
+        last_period = max(caption.rfind(mark, 0, max_chars) for mark in ('.', '!', '?'))
+        caption = caption[:last_period + 1] if last_period != -1 else caption[:max_chars - 1].rstrip() + '.'
+    if not caption.endswith(('.', '!', '?')):
+        caption = caption[:max_chars - 1].rstrip() + '.' if len(caption) >= max_chars else caption + '.'
+    return caption
+
+
+class EpisodeCaptioner:
+    """
+    에피소드의 모든 컷 캡션을 한 번의 구조화된(JSON) 호출로 생성하는 캡션 생성기
+
+    장면 텍스트에만 의존하므로 이미지 생성과 동시에 실행할 수 있으며,
+    캡션 길이는 모델 지시에 맡기지 않고 로컬에서 max_chars로 맞춥니다.
+    """
+
+    def __init__(self, client: OpenAI, guide: str = STORY_CAPTION_GUIDE, max_chars: int = 150,
+                 batch_size: int = CAPTION_BATCH_SIZE):
+        self.client = client
+        self.guide = guide
+        self.max_chars = max_chars
+        self.batch_size = batch_size
+
+    def caption(self, scenes: List[str], original_text: str = "", labels: Optional[List[str]] = None) -> List[str]:
+        """
+        장면 목록의 캡션을 입력 순서대로 반환 (실패한 항목은 장면 텍스트를 줄여 사용)
+
+        Args:
+            scenes (list): 장면 텍스트 목록
+            original_text (str): 장면을 뽑은 원문 (맥락 유지용, 선택)
+            labels (list): 장면 구조 이름 (예: "기(起) 1"), 선택
+        """
+        captions = []
+        for start in range(0, len(scenes), self.batch_size):
+            batch = scenes[start:start + self.batch_size]
+            batch_labels = labels[start:start + self.batch_size] if labels else None
+            captions.extend(self._caption_batch(batch, original_text, batch_labels, start))
+        return captions
+
+    @traced("gpt.caption_episode")
+    def _caption_batch(self, scenes: List[str], original_text: str, labels: Optional[List[str]],
+                       offset: int) -> List[str]:
+        numbered = "\n\n".join(
+            f"[{offset + i + 1}]{f' ({labels[i]})' if labels else ''}\n{scene}" for i, scene in enumerate(scenes)
+        )
+        context = f"원본 텍스트:\n{original_text[:ORIGINAL_TEXT_LIMIT]}\n\n" if original_text else ""
+        prompt = f"""{context}장면 목록:
+{numbered}
+
+각 장면마다 {self.max_chars}자 이내의 설명을 작성하고, 다음 JSON 형식으로만 답하세요:
+{{"captions": [{{"index": 장면 번호, "caption": "설명"}}, ...]}}"""
+
+        fallback = [fit_caption(scene, self.max_chars) for scene in scenes]
+        try:
+            response = governed_chat(
+                self.client,
+                model=CAPTION_MODEL,
+                messages=[
+                    {"role": "system", "content": self.guide},
+                    {"role": "user", "content": prompt}
+                ],
+                response_format={"type": "json_object"},
+                temperature=0.5,
+                max_tokens=CAPTION_TOKENS_PER_CUT * len(scenes)
+            )
+            items = json.loads(response.choices[0].message.content).get("captions", [])
+        except Exception as e:
+            logging.error(f"Episode captioning failed: {str(e)}")
+            return fallback
+
+        captions = list(fallback)
+        filled = set()
+        for item in items:
+            try:
+                position = int(item["index"]) - offset - 1
+                text = str(item["caption"])
+            except (KeyError, TypeError, ValueError):
+                continue
+            if 0 <= position < len(scenes) and text.strip():
+                captions[position] = fit_caption(text, self.max_chars)
+                filled.add(position)
+
+        missing = len(scenes) - len(filled)
+        if missing:
+            logging.warning(f"캡션 {missing}개 누락, 장면 텍스트로 대체")
+        return captions
@@ -0,0 +1,153 @@
+import os
+import re
+import logging
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from image_io import CLIP_IMAGE_SIZE, DecodedImage, load_decoded
+from tracing import traced
+
+# 같은 캐릭터의 크롭끼리는 대략 0.8 이상, 다른 인물/장면의 크롭은 0.6~0.7 수준
+CHARACTER_GATE_THRESHOLD = float(os.getenv("WEBTOONIZER_CHARACTER_GATE_THRESHOLD", "0.75"))
+CROP_SCALES = (1.0, 0.5)  # 이미지 한 변 대비 크롭 크기 (0.5는 3x3 격자로 겹쳐 자름)
+CROP_GRID = 3
+REFERENCE_CROPS = 3  # 기준 컷에서 뱅크에 넣을 캐릭터 크롭 수
+MAX_DESCRIPTOR_WORDS = 60  # CLIP 텍스트 최대 토큰(77) 안에 들도록 자름
+
+
+def crop_boxes(width: int, height: int) -> List[Tuple[int, int, int, int]]:
+    """전체 이미지와 겹치는 격자 크롭 영역 목록"""
+    boxes = []
+    for scale in CROP_SCALES:
+        crop_w, crop_h = int(width * scale), int(height * scale)
+        steps = 1 if scale >= 1.0 else CROP_GRID
+        for row in range(steps):
+            for col in range(steps):
+                left = (width - crop_w) * col // max(steps - 1, 1)
+                top = (height - crop_h) * row // max(steps - 1, 1)
+                boxes.append((left, top, left + crop_w, top + crop_h))
+    return boxes
+
+
+def character_descriptors(character_desc: str) -> List[str]:
+    """캐릭터 설명 전체와 쉼표/줄 단위로 나눈 특징들"""
+    parts = [part.strip() for part in re.split(r'[,\n/·]', character_desc or "") if part.strip()]
+    descriptors = [character_desc.strip()] + parts if len(parts) > 1 else parts
+    return [' '.join(descriptor.split()[:MAX_DESCRIPTOR_WORDS]) for descriptor in descriptors]
+
+
+def _normalize(embeddings: np.ndarray) -> np.ndarray:
+    return embeddings / np.linalg.norm(embeddings, axis=-1, keepdims=True).clip(min=1e-12)
+
+
+class CharacterBank:
+    """
+    에피소드 단위 캐릭터 참조 임베딩 뱅크
+
+    캐릭터 설명(SceneConfig.character_desc)의 텍스트 임베딩과, 처음 채택된 컷에서
+    캐릭터 설명과 가장 가까운 크롭들의 CLIP 임베딩을 보관합니다.
+    새 후보는 크롭 임베딩을 한 번의 배치로 계산한 뒤 뱅크 전체와 행렬곱 한 번으로 점수를 매깁니다.
+    """
+
+    def __init__(self, encoder, character_desc: str, threshold: float = CHARACTER_GATE_THRESHOLD):
+        self.encoder = encoder
+        self.character_desc = character_desc
+        self.threshold = threshold
+        self.reference_source: Optional[str] = None
+        self._lock = threading.Lock()
+
+        descriptors = character_descriptors(character_desc)
+        self.text_refs = _normalize(self.encoder.encode_texts(descriptors)) if descriptors else None
+        self.image_refs: Optional[np.ndarray] = None
+
+    @property
+    def seeded(self) -> bool:
+        return self.image_refs is not None
+
+    def _crop_embeddings(self, source) -> np.ndarray:
+        """후보 이미지의 전체/격자 크롭 임베딩 (K, D), 정규화됨"""
+        # 절반 크기 크롭도 CLIP 입력 해상도를 유지하도록 두 배 해상도로 디코딩
+        image = source if isinstance(source, DecodedImage) else load_decoded(source, 2 * CLIP_IMAGE_SIZE)
+        crops = [image.crop(box) for box in crop_boxes(*image.size)]
+        return _normalize(self.encoder.encode_images(crops))
+
+    @traced("character.seed")
+    def seed(self, source) -> bool:
+        """
+        채택된 컷으로 뱅크 초기화 (이미 초기화됐으면 아무것도 하지 않음)
+
+        Returns:
+            bool: 이번 호출로 초기화되었는지 여부
+        """
+        with self._lock:
+            if self.seeded:
+                return False
+        try:
+            crops = self._crop_embeddings(source)
+        except Exception as e:
+            logging.warning(f"캐릭터 뱅크 초기화 실패: {str(e)}")
+            return False
+
+        if self.text_refs is not None:
+            # 캐릭터 설명과 가장 가까운 크롭만 기준으로 사용
+            relevance = (crops @ self.text_refs.T).max(axis=1)
+            crops = crops[np.argsort(relevance)[::-1][:REFERENCE_CROPS]]
+        else:
+            crops = crops[:REFERENCE_CROPS]
+
+        with self._lock:
+            if self.seeded:
+                return False
+            self.image_refs = crops
+            self.reference_source = source if isinstance(source, str) else None
+        logging.info(f"캐릭터 뱅크 초기화: 기준 크롭 {len(crops)}개")
+        return True
+
+    @traced("character.score")
+    def score(self, source) -> Optional[Dict[str, float]]:
+        """
+        후보 이미지와 뱅크의 일치도
+
+        Returns:
+            dict: character(기준 크롭과의 유사도), descriptor(캐릭터 설명과의 유사도),
+                뱅크가 아직 초기화되지 않았으면 None
+        """
+        with self._lock:
+            image_refs = self.image_refs
+        if image_refs is None:
+            return None
+
+        refs = image_refs if self.text_refs is None else np.vstack([image_refs, self.text_refs])
+        sims = self._crop_embeddings(source) @ refs.T  # (크롭 수, 기준 수) 행렬곱 한 번
+        # 기준마다 가장 잘 맞는 크롭을 고른 뒤 평균
+        best = sims.max(axis=0)
+        return {
+            "character": float(best[:len(image_refs)].mean()),
+            "descriptor": float(best[len(image_refs):].mean()) if self.text_refs is not None else 1.0,
+        }
+
+    def check(self, source) -> Tuple[bool, Optional[float]]:
+        """
+        일관성 게이트 (뱅크 초기화 전이거나 점수 계산에 실패하면 통과)
+
+        Returns:
+            tuple: (통과 여부, 캐릭터 유사도)
+        """
+        try:
+            result = self.score(source)
+        except Exception as e:
+            logging.warning(f"캐릭터 일관성 점수 계산 실패: {str(e)}")
+            return True, None
+        if result is None:
+            return True, None
+        return result["character"] >= self.threshold, result["character"]
+
+    def reinforce_prompt(self, description: str) -> str:
+        """일관성 미달 후보를 다시 생성할 때 캐릭터 외형을 강조한 설명"""
+        return (
+            f"{description}\n"
+            f"Character consistency: keep exactly the same character design as the previous cuts - "
+            f"{self.character_desc}"
+        )
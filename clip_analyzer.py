@@ -1,19 +1,199 @@
+import os
+import base64
+import threading
 import torch
-from PIL import Image
+import numpy as np
 import logging
+from typing import List, Union
 from transformers import CLIPProcessor, CLIPModel
 from openai import OpenAI
-import requests
-from io import BytesIO
 import streamlit as st
+from image_io import CLIP_IMAGE_SIZE, DecodedImage, get_http_session, load_decoded
+from cost_governor import governed_chat
+from shared_cache import digest_key, get_shared_cache
+from micro_batch import MicroBatcher
+from tracing import span, traced
+
+CLIP_MODEL_NAME = "openai/clip-vit-base-patch32"
+CLIP_WORKER_URL = os.getenv("WEBTOONIZER_CLIP_WORKER_URL")  # 설정 시 별도 추론 워커 사용
+CLIP_MAX_BATCH = int(os.getenv("WEBTOONIZER_CLIP_MAX_BATCH", "16"))
+CLIP_MAX_WAIT_MS = float(os.getenv("WEBTOONIZER_CLIP_MAX_WAIT_MS", "5"))
+# 1차 선별: DALL-E가 다듬은 영문 프롬프트(revised_prompt)와의 코사인 유사도가 이 값보다 낮으면
+# 명백한 실패로 보고 정밀 검증 없이 탈락 (WEBTOONIZER_CLIP_PRESCREEN=0이면 끔)
+# ViT-B/32에서 77토큰으로 잘린 영문 문장 기준, 관련 없는 이미지-문장 쌍은 대략 0.10~0.17,
+# 해당 이미지를 설명하는 쌍은 0.25~0.35에 분포하므로 두 분포 사이의 0.18로 설정
+PRESCREEN_ENABLED = os.getenv("WEBTOONIZER_CLIP_PRESCREEN", "1") != "0"
+PRESCREEN_THRESHOLD = float(os.getenv("WEBTOONIZER_CLIP_PRESCREEN_THRESHOLD", "0.18"))
+
+
+class CLIPEncoder:
+    """
+    CLIP 이미지/텍스트 임베딩 계산기
+
+    임베딩은 공유 디스크 캐시에 저장되어 같은 호스트의 다른 프로세스와 재사용됩니다.
+    여러 세션에서 동시에 들어온 인코딩 요청은 마이크로 배치로 묶어 한 번의 forward로 처리합니다.
+    """
+
+    def __init__(self, model_name: str = CLIP_MODEL_NAME, max_batch_size: int = CLIP_MAX_BATCH,
+                 max_wait_ms: float = CLIP_MAX_WAIT_MS):
+        self.model_name = model_name
+        self.device = "cuda" if torch.cuda.is_available() else "cpu"
+        self.model = CLIPModel.from_pretrained(model_name).to(self.device)
+        self.processor = CLIPProcessor.from_pretrained(model_name)
+        self.model.eval()
+        self._image_batcher = MicroBatcher(self._image_features_batch, max_batch_size, max_wait_ms,
+                                           name="clip.image_batch")
+        self._text_batcher = MicroBatcher(self._text_features_batch, max_batch_size, max_wait_ms,
+                                          name="clip.text_batch")
+
+    @property
+    def logit_scale(self) -> float:
+        return self.model.logit_scale.exp().item()
+
+    def encode_images(self, images: List[Union[bytes, DecodedImage]]) -> np.ndarray:
+        """원본 이미지 바이트 또는 디코딩된 이미지 목록 -> (N, D) 임베딩 (정규화 전)"""
+        return self._cached_encode("image", images, self._forward_images, key_of=_image_key)
+
+    def encode_texts(self, texts: List[str]) -> np.ndarray:
+        """텍스트 목록 -> (N, D) 임베딩 (정규화 전)"""
+        return self._cached_encode("text", texts, self._forward_texts)
+
+    def _cached_encode(self, kind: str, items: List, forward, key_of=lambda item: item) -> np.ndarray:
+        cache = get_shared_cache()
+        keys = [digest_key(kind, self.model_name, key_of(item)) for item in items]
+        embeddings = [None] * len(items)
+        missing = []
+        for i, key in enumerate(keys):
+            cached = cache.get("embedding", key)
+            if cached is not None:
+                embeddings[i] = np.frombuffer(cached, dtype=np.float32)
+            else:
+                missing.append(i)
+
+        if missing:
+            # 캐시에 없는 항목만 한 번의 배치로 계산
+            computed = forward([items[i] for i in missing])
+            for i, embedding in zip(missing, computed):
+                embedding = np.ascontiguousarray(embedding, dtype=np.float32)
+                cache.set("embedding", keys[i], embedding.tobytes())
+                embeddings[i] = embedding
+        return np.stack(embeddings)
+
+    def _forward_images(self, images: List[Union[bytes, DecodedImage]]) -> np.ndarray:
+        # 디코딩/전처리는 호출 스레드에서 하고, 배치 스레드는 모델 forward만 담당
+        image_processor = self.processor.image_processor
+        pixel_values = [
+            _as_decoded(image).clip_tensor(mean=image_processor.image_mean, std=image_processor.image_std)
+            for image in images
+        ]
+        return np.stack(self._image_batcher.map(pixel_values))
+
+    def _forward_texts(self, texts: List[str]) -> np.ndarray:
+        return np.stack(self._text_batcher.map(texts))
+
+    def _image_features_batch(self, pixel_values: List[torch.Tensor]) -> np.ndarray:
+        with span("clip.inference", kind="image", batch=len(pixel_values)):
+            with torch.no_grad():
+                batch = torch.stack(pixel_values).to(self.device)
+                return self.model.get_image_features(pixel_values=batch).cpu().numpy()
+
+    def _text_features_batch(self, texts: List[str]) -> np.ndarray:
+        with span("clip.inference", kind="text", batch=len(texts)):
+            inputs = self.processor(text=texts, return_tensors="pt", padding=True, truncation=True,
+                                    max_length=77).to(self.device)
+            with torch.no_grad():
+                return self.model.get_text_features(**inputs).cpu().numpy()
+
+
+class RemoteCLIPEncoder(CLIPEncoder):
+    """
+    별도 프로세스의 CLIP 추론 워커(clip_worker.py)를 HTTP로 호출하는 인코더
+
+    여러 Streamlit 프로세스가 모델 하나를 공유하며, 임베딩 캐시도 같은 디스크 캐시를 사용합니다.
+    """
+
+    def __init__(self, worker_url: str, model_name: str = CLIP_MODEL_NAME, timeout: float = 60):
+        self.worker_url = worker_url.rstrip("/")
+        self.model_name = model_name
+        self.timeout = timeout
+        self.device = f"remote ({self.worker_url})"
+        self.model = None
+        self.processor = None
+        self._logit_scale = None
+
+    @property
+    def logit_scale(self) -> float:
+        if self._logit_scale is None:
+            response = get_http_session().get(f"{self.worker_url}/health", timeout=self.timeout)
+            response.raise_for_status()
+            self._logit_scale = response.json()["logit_scale"]
+        return self._logit_scale
+
+    def _post(self, path: str, payload: dict) -> np.ndarray:
+        with span("clip.remote", path=path):
+            response = get_http_session().post(f"{self.worker_url}{path}", json=payload, timeout=self.timeout)
+            response.raise_for_status()
+        return np.asarray(response.json()["embeddings"], dtype=np.float32)
+
+    def _forward_images(self, images: List[Union[bytes, DecodedImage]]) -> np.ndarray:
+        return self._post("/encode/image", {
+            "images": [base64.b64encode(_image_bytes(image)).decode("ascii") for image in images]
+        })
+
+    def _forward_texts(self, texts: List[str]) -> np.ndarray:
+        return self._post("/encode/text", {"texts": texts})
+
+
+def gram_matrix(embeddings: np.ndarray) -> np.ndarray:
+    """L2 정규화된 임베딩의 전체 코사인 유사도 행렬 (행렬곱 한 번)"""
+    return embeddings @ embeddings.T
+
+
+def mean_pairwise_similarity(gram: np.ndarray) -> float:
+    """자기 자신을 제외한 모든 쌍(i < j)의 평균 유사도"""
+    rows, cols = np.triu_indices(len(gram), k=1)
+    return float(gram[rows, cols].mean())
+
+
+def banded_similarities(embeddings: np.ndarray, window: int) -> List[np.ndarray]:
+    """
+    거리 1..window인 이웃 쌍의 유사도 (전체 N x N 행렬을 만들지 않음)
+
+    Returns:
+        list: k번째 원소는 (N-k,) 배열로 i번째 값이 (i, i+k) 쌍의 유사도
+    """
+    return [
+        np.einsum("ij,ij->i", embeddings[offset:], embeddings[:-offset])
+        for offset in range(1, min(window, len(embeddings) - 1) + 1)
+    ]
+
+
+def _image_bytes(image: Union[bytes, DecodedImage]) -> bytes:
+    return image.data if isinstance(image, DecodedImage) else image
+
+
+def _image_key(image: Union[bytes, DecodedImage]) -> str:
+    # 바이트와 같은 바이트로 만든 DecodedImage는 같은 키 (잘라낸 이미지는 인코딩 없이 원본 키+영역)
+    return image.key if isinstance(image, DecodedImage) else digest_key(image)
+
+
+def _as_decoded(image: Union[bytes, DecodedImage]) -> DecodedImage:
+    # CLIP 입력은 224px이면 충분하므로 바이트는 축소 디코딩
+    return image if isinstance(image, DecodedImage) else DecodedImage.from_bytes(image, CLIP_IMAGE_SIZE)
+
+
+def _normalize(embeddings: np.ndarray) -> np.ndarray:
+    return embeddings / np.linalg.norm(embeddings, axis=-1, keepdims=True).clip(min=1e-12)
+
 
 class CLIPAnalyzer:
-    def __init__(self):
-        """CLIP 모델과 프로세서 초기화"""
+    def __init__(self, encoder: CLIPEncoder = None):
+        """CLIP 모델과 프로세서 초기화 (encoder를 주면 해당 인코더 사용)"""
         try:
-            self.device = "cuda" if torch.cuda.is_available() else "cpu"
-            self.model = CLIPModel.from_pretrained("openai/clip-vit-base-patch32").to(self.device)
-            self.processor = CLIPProcessor.from_pretrained("openai/clip-vit-base-patch32")
+            self.encoder = encoder or CLIPEncoder()
+            self.device = self.encoder.device
+            self.model = self.encoder.model
+            self.processor = self.encoder.processor
             self.client = OpenAI()
             self.minimum_score_threshold = 0.5  # 최소 허용 점수
             self.target_score_threshold = 0.7   # 목표 점수
@@ -23,6 +203,7 @@ class CLIPAnalyzer:
             logging.error(f"CLIP 모델 초기화 실패: {str(e)}")
             raise RuntimeError(f"CLIP 모델 초기화 실패: {str(e)}")
 
+    @traced("gpt.enhance_prompt")
     def enhance_prompt(self, prompt, style, mood):
         """프롬프트를 개선하고 시각적 요소를 강화"""
         try:
@@ -43,7 +224,8 @@ class CLIPAnalyzer:
             {prompt}
             """
             
-            response = self.client.chat.completions.create(
+            response = governed_chat(
+                self.client,
                 model="gpt-3.5-turbo",  # 더 빠른 응답을 위해 GPT-3.5 사용
                 messages=[{"role": "user", "content": enhancement_prompt}],
                 max_tokens=200,
@@ -61,6 +243,7 @@ class CLIPAnalyzer:
             logging.error(f"프롬프트 개선 중 오류: {str(e)}")
             return prompt
 
+    @traced("gpt.extract_key_elements")
     def _extract_key_elements(self, text):
         """텍스트에서 핵심적인 시각적 요소들을 추출"""
         try:
@@ -74,7 +257,9 @@ class CLIPAnalyzer:
             {text}
             """
             
-            response = self.client.chat.completions.create(
+            response = governed_chat(
+                self.client,
+                use_cache=True,  # 같은 장면 설명은 재시도마다 다시 요청하지 않음
                 model="gpt-4",
                 messages=[{"role": "user", "content": prompt.format(text=text)}],
                 max_tokens=100,
@@ -90,32 +275,61 @@ class CLIPAnalyzer:
             logging.error(f"핵심 요소 추출 중 오류: {str(e)}")
             return "핵심 요소 추출 실패"
 
-    def validate_image(self, image_url, prompt, story_context=None, return_score=False):
-        """이미지와 프롬프트의 일치도를 검증"""
+    @traced("clip.prescreen")
+    def prescreen(self, image_url, prompt):
+        """
+        1차 선별: 축소 디코딩한 이미지와 영문 프롬프트의 코사인 유사도만 계산
+
+        GPT 호출 없이 캐시된 텍스트 임베딩을 사용하므로, 명백히 어긋난 후보는
+        핵심 프롬프트 추출이나 일관성 검사 전에 걸러집니다.
+
+        Returns:
+            tuple: (통과 여부, 코사인 유사도, 디코딩된 이미지)
+        """
+        image = load_decoded(image_url, CLIP_IMAGE_SIZE)
+        image_embeds = _normalize(self.encoder.encode_images([image]))
+        text_embeds = _normalize(self.encoder.encode_texts([prompt]))
+        score = float(image_embeds[0] @ text_embeds[0])
+        return score >= PRESCREEN_THRESHOLD, score, image
+
+    @traced("clip.validate_image")
+    def validate_image(self, image_url, prompt, story_context=None, return_score=False, prescreen_prompt=None):
+        """
+        이미지와 프롬프트의 일치도를 검증
+
+        prescreen_prompt(영문, 예: DALL-E의 revised_prompt)가 주어지면 1차 선별을 통과한 후보만
+        정밀 검증합니다. 탈락한 결과에는 similarity_score가 없고
+        prescreen_rejected와 참고용 prescreen_score만 담기므로 점수로 기록하지 않아야 합니다.
+        """
         try:
+            if PRESCREEN_ENABLED and prescreen_prompt:
+                passed, prescreen_score, _ = self.prescreen(image_url, prescreen_prompt)
+                if not passed:
+                    logging.info(f"1차 선별 탈락 (유사도: {prescreen_score:.3f})")
+                    result = {
+                        "meets_requirements": False,
+                        "prescreen_rejected": True,
+                        "prescreen_score": prescreen_score,
+                        "missing_elements": [],
+                        "prompt_used": prompt
+                    }
+                    return result if return_score else False
+
             # 프롬프트 길이 제한
             core_prompt = self._extract_core_prompt(prompt)
             max_length = 77  # CLIP 모델의 최대 토큰 길이
             core_prompt = ' '.join(core_prompt.split()[:max_length])
             
-            # 이미지 다운로드 및 전처리
-            response = requests.get(image_url)
-            image = Image.open(BytesIO(response.content))
-            
-            # CLIP 입력 준비
-            inputs = self.processor(
-                images=image,
-                text=[core_prompt],
-                return_tensors="pt",
-                padding=True
-            ).to(self.device)
+            # 이미지 다운로드 및 CLIP 해상도로 축소 디코딩 (1차 선별에서 디코딩한 결과 재사용)
+            image = load_decoded(image_url, CLIP_IMAGE_SIZE)
             
-            # 유사도 계산
-            with torch.no_grad():
-                outputs = self.model(**inputs)
-                logits_per_image = outputs.logits_per_image
-                probs = torch.nn.functional.softmax(logits_per_image, dim=1)
-                similarity = probs[0][0].item()
+            # 유사도 계산 (CLIP logits_per_image에 대한 softmax와 동일)
+            image_embeds = _normalize(self.encoder.encode_images([image]))
+            text_embeds = _normalize(self.encoder.encode_texts([core_prompt]))
+            logits = self.encoder.logit_scale * (image_embeds @ text_embeds.T)
+            probs = np.exp(logits - logits.max(axis=1, keepdims=True))
+            probs /= probs.sum(axis=1, keepdims=True)
+            similarity = float(probs[0][0])
             
             # 스토리 컨텍스트가 있는 경우 일관성 체크
             if story_context and story_context.get("previous_scenes"):
@@ -141,6 +355,7 @@ class CLIPAnalyzer:
             }
             return default_result if return_score else True
 
+    @traced("gpt.extract_core_prompt")
     def _extract_core_prompt(self, prompt):
         """프롬프트에서 핵심 내용만 추출"""
         try:
@@ -152,7 +367,9 @@ class CLIPAnalyzer:
             최대 50단어로 제한하세요.
             """
             
-            response = self.client.chat.completions.create(
+            response = governed_chat(
+                self.client,
+                use_cache=True,  # 핵심 문장 추출 결과는 프로세스 간에 공유
                 model="gpt-4",
                 messages=[
                     {"role": "system", "content": system_prompt},
@@ -171,18 +388,25 @@ class CLIPAnalyzer:
             logging.error(f"핵심 프롬프트 추출 중 오류: {str(e)}")
             return prompt[:100]  # 오류 시 원본 프롬프트의 처음 100자 사용
 
-    def _check_story_consistency(self, new_image, story_context):
-        """새 이미지와 이전 장면들과의 일관성 검증"""
+    def embed_images(self, images) -> np.ndarray:
+        """이미지 URL/경로 목록을 한 번씩만 임베딩하여 L2 정규화된 (N, D) 행렬 반환"""
+        decoded = [
+            image if isinstance(image, (bytes, DecodedImage)) else load_decoded(image, CLIP_IMAGE_SIZE)
+            for image in images
+        ]
+        return _normalize(self.encoder.encode_images(decoded))
+
+    @traced("clip.story_consistency")
+    def _check_story_consistency(self, new_image, story_context, window: int = 3):
+        """새 이미지(디코딩된 이미지 또는 원본 바이트)와 최근 window개 장면과의 일관성 검증"""
         try:
             if not story_context.get("previous_scenes"):
                 return 1.0  # 첫 장면인 경우
 
             previous_images = []
-            for scene in story_context["previous_scenes"][-3:]:  # 최근 3개 장면만 비교
+            for scene in story_context["previous_scenes"][-window:]:
                 try:
-                    response = requests.get(scene["image_url"])
-                    prev_image = Image.open(BytesIO(response.content))
-                    previous_images.append(prev_image)
+                    previous_images.append(load_decoded(scene["image_url"], CLIP_IMAGE_SIZE))
                 except Exception as e:
                     logging.warning(f"이전 이미지 로드 실패: {e}")
                     continue
@@ -190,68 +414,32 @@ class CLIPAnalyzer:
             if not previous_images:
                 return 1.0
 
-            # 스타일 일관성 점수 계산
-            consistency_scores = []
-            for prev_image in previous_images:
-                try:
-                    inputs = self.processor(
-                        images=[prev_image, new_image],
-                        return_tensors="pt",
-                        padding=True
-                    ).to(self.device)
-                    
-                    with torch.no_grad():
-                        features = self.model.get_image_features(**inputs)
-                        similarity = torch.nn.functional.cosine_similarity(
-                            features[0].unsqueeze(0), 
-                            features[1].unsqueeze(0)
-                        ).item()
-                    consistency_scores.append(similarity)
-                except Exception as e:
-                    logging.error(f"일관성 점수 계산 중 오류: {e}")
-                    continue
-
-            if not consistency_scores:
+            # 이전 장면과 새 장면을 한 번에 임베딩하고 새 장면 행만 행렬곱으로 계산
+            try:
+                embeddings = self.embed_images(previous_images + [new_image])
+                return float((embeddings[:-1] @ embeddings[-1]).mean())
+            except Exception as e:
+                logging.error(f"일관성 점수 계산 중 오류: {e}")
                 return 1.0
 
-            return sum(consistency_scores) / len(consistency_scores)
-
         except Exception as e:
             logging.error(f"일관성 검사 중 오류: {str(e)}")
             return 1.0
 
+    @traced("clip.style_consistency")
     def analyze_style_consistency(self, images):
-        """여러 이미지 간의 스타일 일관성 분석"""
+        """
+        여러 이미지 간의 스타일 일관성 분석 (모든 쌍 비교, 긴 에피소드는 windowed_consistency 사용)
+
+        Returns:
+            tuple: (일관성 기준 충족 여부, 평균 유사도)
+        """
         if len(images) < 2:
             return True, 1.0
             
         try:
-            # 이미지들을 CLIP 임베딩으로 변환
-            embeddings = []
-            for img_url in images:
-                response = requests.get(img_url)
-                img = Image.open(BytesIO(response.content))
-                
-                inputs = self.processor(
-                    images=img,
-                    return_tensors="pt"
-                ).to(self.device)
-                
-                with torch.no_grad():
-                    embedding = self.model.get_image_features(**inputs)
-                embeddings.append(embedding)
-            
-            # 임베딩 간의 코사인 유사도 계산
-            similarities = []
-            for i in range(len(embeddings)-1):
-                for j in range(i+1, len(embeddings)):
-                    sim = torch.nn.functional.cosine_similarity(
-                        embeddings[i], embeddings[j]
-                    ).item()
-                    similarities.append(sim)
-            
-            # 평균 유사도 계산
-            avg_similarity = sum(similarities) / len(similarities)
+            embeddings = self.embed_images(images)
+            avg_similarity = mean_pairwise_similarity(gram_matrix(embeddings))
             
             return avg_similarity >= 0.7, avg_similarity
             
@@ -259,11 +447,28 @@ class CLIPAnalyzer:
             logging.error(f"스타일 일관성 분석 중 오류: {str(e)}")
             return False, 0.0
 
+    def windowed_consistency(self, images, window: int = 3) -> np.ndarray:
+        """
+        컷마다 직전 window컷과의 평균 유사도 (첫 컷은 1.0)
+
+        Returns:
+            np.ndarray: (N,) 컷별 일관성 점수
+        """
+        embeddings = self.embed_images(images)
+        scores = np.zeros(len(embeddings))
+        counts = np.zeros(len(embeddings))
+        for offset, sims in enumerate(banded_similarities(embeddings, window), start=1):
+            scores[offset:] += sims
+            counts[offset:] += 1
+        return np.where(counts > 0, scores / np.maximum(counts, 1), 1.0)
+
     def get_image_focus_area(self, image_url, prompt):
         """이미지에서 중요한 영역 감지"""
+        if self.model is None:
+            logging.warning("원격 CLIP 워커 모드에서는 주목 영역 분석을 지원하지 않습니다")
+            return None
         try:
-            response = requests.get(image_url)
-            image = Image.open(BytesIO(response.content))
+            image = load_decoded(image_url).pil()
             
             inputs = self.processor(
                 images=image,
@@ -304,4 +509,23 @@ class CLIPAnalyzer:
                 
         except Exception as e:
             logging.error(f"결과 시각화 중 오류: {str(e)}")
-            st.error("결과 시각화 실패")
\ No newline at end of file
+            st.error("결과 시각화 실패")
+
+
+_analyzer = None
+_analyzer_lock = threading.Lock()
+
+
+def get_clip_analyzer() -> CLIPAnalyzer:
+    """
+    프로세스 공용 CLIP 분석기
+
+    WEBTOONIZER_CLIP_WORKER_URL이 설정되어 있으면 모델을 직접 올리지 않고 추론 워커를 호출합니다.
+    """
+    global _analyzer
+    if _analyzer is None:
+        with _analyzer_lock:
+            if _analyzer is None:
+                encoder = RemoteCLIPEncoder(CLIP_WORKER_URL) if CLIP_WORKER_URL else CLIPEncoder()
+                _analyzer = CLIPAnalyzer(encoder)
+    return _analyzer
@@ -0,0 +1,103 @@
+"""
+CLIP 추론 워커 - 여러 Streamlit 프로세스가 CLIP 모델 하나를 공유하기 위한 로컬 HTTP 서버
+
+여러 프로세스에서 동시에 들어온 요청은 CLIPEncoder의 마이크로 배치로 묶여 함께 추론됩니다
+(WEBTOONIZER_CLIP_MAX_BATCH, WEBTOONIZER_CLIP_MAX_WAIT_MS).
+
+사용 예:
+    python clip_worker.py --port 8610
+    WEBTOONIZER_CLIP_WORKER_URL=http://127.0.0.1:8610 streamlit run webapp.py --server.port 8501
+    WEBTOONIZER_CLIP_WORKER_URL=http://127.0.0.1:8610 streamlit run webapp.py --server.port 8502
+
+엔드포인트:
+    GET  /health        -> {"model", "device", "logit_scale"}
+    POST /encode/image  {"images": [base64 원본 바이트, ...]} -> {"embeddings": [[...], ...]}
+    POST /encode/text   {"texts": [문자열, ...]}             -> {"embeddings": [[...], ...]}
+"""
+import json
+import base64
+import logging
+import argparse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from clip_analyzer import CLIPEncoder
+from tracing import serve_metrics
+
+MAX_REQUEST_BYTES = 64 * 1024 * 1024
+
+
+class _WorkerHandler(BaseHTTPRequestHandler):
+    encoder: CLIPEncoder = None
+
+    def _send_json(self, status: int, payload: dict):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path.rstrip("/") != "/health":
+            self.send_error(404)
+            return
+        self._send_json(200, {
+            "model": self.encoder.model_name,
+            "device": self.encoder.device,
+            "logit_scale": self.encoder.logit_scale,
+        })
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        if length <= 0 or length > MAX_REQUEST_BYTES:
+            self.send_error(413 if length > 0 else 400)
+            return
+        try:
+            payload = json.loads(self.rfile.read(length))
+            if self.path == "/encode/image":
+                embeddings = self.encoder.encode_images([base64.b64decode(data) for data in payload["images"]])
+            elif self.path == "/encode/text":
+                embeddings = self.encoder.encode_texts(list(payload["texts"]))
+            else:
+                self.send_error(404)
+                return
+        except (KeyError, ValueError) as e:
+            self._send_json(400, {"error": str(e)})
+            return
+        except Exception as e:
+            logging.error(f"CLIP 추론 실패: {str(e)}")
+            self._send_json(500, {"error": str(e)})
+            return
+        self._send_json(200, {"embeddings": embeddings.tolist()})
+
+    def log_message(self, format, *args):
+        logging.debug(format % args)
+
+
+def serve_worker(host: str = "127.0.0.1", port: int = 8610, encoder: CLIPEncoder = None) -> ThreadingHTTPServer:
+    """CLIP 모델을 한 번 올리고 요청을 받는 워커 서버 생성 (serve_forever는 호출자가 실행)"""
+    handler = type("WorkerHandler", (_WorkerHandler,), {"encoder": encoder or CLIPEncoder()})
+    server = ThreadingHTTPServer((host, port), handler)
+    logging.info(f"CLIP 추론 워커 시작: http://{host}:{server.server_address[1]} ({handler.encoder.device})")
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CLIP 추론 워커")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8610)
+    parser.add_argument("--metrics-port", type=int, default=None, help="지정 시 /metrics 엔드포인트 실행")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    if args.metrics_port:
+        serve_metrics(port=args.metrics_port)
+    server = serve_worker(args.host, args.port)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+import os
+import json
+import logging
+import threading
+import contextvars
+from collections import defaultdict
+from typing import Dict, Tuple
+
+from tracing import increment
+from shared_cache import digest_key, get_shared_cache
+
+# 1K 토큰당 USD (입력, 출력)
+CHAT_PRICES = {
+    "gpt-4": (0.03, 0.06),
+    "gpt-4o": (0.0025, 0.01),
+    "gpt-4o-mini": (0.00015, 0.0006),
+    "gpt-3.5-turbo": (0.0005, 0.0015),
+}
+
+# 이미지 1장당 USD: (모델, 크기, 품질)
+IMAGE_PRICES = {
+    ("dall-e-3", "1024x1024", "standard"): 0.040,
+    ("dall-e-3", "1024x1792", "standard"): 0.080,
+    ("dall-e-3", "1792x1024", "standard"): 0.080,
+    ("dall-e-3", "1024x1024", "hd"): 0.080,
+    ("dall-e-3", "1024x1792", "hd"): 0.120,
+    ("dall-e-3", "1792x1024", "hd"): 0.120,
+    ("dall-e-2", "1024x1024", "standard"): 0.020,
+    ("dall-e-2", "512x512", "standard"): 0.018,
+    ("dall-e-2", "256x256", "standard"): 0.016,
+}
+
+# 예산 임박 시 대체할 저렴한 모델
+CHEAPER_CHAT_MODEL = {
+    "gpt-4": "gpt-3.5-turbo",
+    "gpt-4o": "gpt-4o-mini",
+}
+
+SESSION_BUDGET_USD = float(os.getenv("WEBTOONIZER_SESSION_BUDGET_USD", "5.0"))
+PROCESS_BUDGET_USD = float(os.getenv("WEBTOONIZER_PROCESS_BUDGET_USD", "50.0"))
+DEGRADE_RATIO = float(os.getenv("WEBTOONIZER_DEGRADE_RATIO", "0.8"))
+
+
+class BudgetExceededError(RuntimeError):
+    """세션 또는 프로세스 예산을 초과한 경우"""
+
+
+class SpendLedger:
+    """모델/크기/품질별 호출 수와 비용 누적"""
+
+    def __init__(self, budget_usd: float):
+        self.budget_usd = budget_usd
+        self.spent_usd = 0.0
+        self.calls: Dict[Tuple, int] = defaultdict(int)
+        self.tokens: Dict[str, int] = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def add(self, key: Tuple, cost: float, tokens: int = 0):
+        with self._lock:
+            self.spent_usd += cost
+            self.calls[key] += 1
+            if tokens:
+                self.tokens[key[1]] += tokens
+
+    @property
+    def usage_ratio(self) -> float:
+        return self.spent_usd / self.budget_usd if self.budget_usd > 0 else 0.0
+
+    def summary(self) -> Dict:
+        with self._lock:
+            return {
+                "spent_usd": round(self.spent_usd, 4),
+                "budget_usd": self.budget_usd,
+                "calls": {"/".join(key): count for key, count in self.calls.items()},
+                "tokens": dict(self.tokens),
+            }
+
+
+_process_ledger = SpendLedger(PROCESS_BUDGET_USD)
+
+
+class CostGovernor:
+    """
+    세션 단위 비용 계량 및 예산 집행
+
+    예산의 DEGRADE_RATIO 이상을 쓰면 더 저렴한 모델, 표준 품질,
+    더 적은 재시도로 낮추고, 예산을 넘으면 BudgetExceededError를 발생시킵니다.
+    """
+
+    def __init__(self, session_budget_usd: float = SESSION_BUDGET_USD,
+                 process_ledger: SpendLedger = _process_ledger,
+                 degrade_ratio: float = DEGRADE_RATIO):
+        self.session = SpendLedger(session_budget_usd)
+        self.process = process_ledger
+        self.degrade_ratio = degrade_ratio
+
+    @property
+    def usage_ratio(self) -> float:
+        return max(self.session.usage_ratio, self.process.usage_ratio)
+
+    @property
+    def degraded(self) -> bool:
+        return self.usage_ratio >= self.degrade_ratio
+
+    def check(self):
+        """예산 초과 여부 확인"""
+        if self.session.spent_usd >= self.session.budget_usd:
+            raise BudgetExceededError(
+                f"세션 예산 초과: ${self.session.spent_usd:.2f} / ${self.session.budget_usd:.2f}"
+            )
+        if self.process.spent_usd >= self.process.budget_usd:
+            raise BudgetExceededError(
+                f"서버 예산 초과: ${self.process.spent_usd:.2f} / ${self.process.budget_usd:.2f}"
+            )
+
+    def plan_chat_model(self, model: str) -> str:
+        """호출 전 예산 확인 후 사용할 채팅 모델 결정"""
+        self.check()
+        if self.degraded and model in CHEAPER_CHAT_MODEL:
+            cheaper = CHEAPER_CHAT_MODEL[model]
+            logging.info(f"예산 임박으로 모델 변경: {model} -> {cheaper}")
+            return cheaper
+        return model
+
+    def plan_image(self, quality: str = "hd", attempts: int = 3) -> Tuple[str, int]:
+        """호출 전 예산 확인 후 이미지 품질과 최대 시도 횟수 결정"""
+        self.check()
+        if self.degraded:
+            logging.info("예산 임박으로 표준 품질, 1회 시도로 변경")
+            return "standard", 1
+        return quality, attempts
+
+    def plan_attempts(self, attempts: int) -> int:
+        """검증 재시도 횟수 결정 (예산 임박 시 1회)"""
+        return 1 if self.degraded else attempts
+
+    def _charge(self, key: Tuple, cost: float, tokens: int = 0):
+        self.session.add(key, cost, tokens)
+        self.process.add(key, cost, tokens)
+        increment("spend_usd", cost, kind=key[0], model=key[1])
+        increment("api_calls", 1, kind=key[0], model=key[1])
+        if tokens:
+            increment("tokens", tokens, model=key[1])
+
+    def record_chat(self, model: str, usage) -> float:
+        """채팅 응답의 usage로 비용 기록"""
+        prompt_tokens = getattr(usage, "prompt_tokens", 0) or 0
+        completion_tokens = getattr(usage, "completion_tokens", 0) or 0
+        input_price, output_price = CHAT_PRICES.get(_base_model(model), CHAT_PRICES["gpt-4"])
+        cost = (prompt_tokens * input_price + completion_tokens * output_price) / 1000
+        self._charge(("chat", model), cost, prompt_tokens + completion_tokens)
+        return cost
+
+    def record_image(self, model: str, size: str, quality: str, n: int = 1) -> float:
+        """이미지 생성 비용 기록"""
+        unit_price = IMAGE_PRICES.get((model, size, quality), IMAGE_PRICES[("dall-e-3", "1024x1792", "hd")])
+        cost = unit_price * n
+        self._charge(("image", model, size, quality), cost)
+        return cost
+
+
+def _base_model(model: str) -> str:
+    """버전 접미사가 붙은 모델명을 가격표 키로 변환"""
+    for name in sorted(CHAT_PRICES, key=len, reverse=True):
+        if model.startswith(name):
+            return name
+    return model
+
+
+_default_governor = CostGovernor()
+_active_governor = contextvars.ContextVar("active_governor", default=None)
+
+
+def activate_session_governor(session_state) -> CostGovernor:
+    """Streamlit 세션의 비용 관리자를 현재 실행 컨텍스트에 연결"""
+    governor = session_state.get('cost_governor')
+    if governor is None:
+        governor = CostGovernor()
+        session_state['cost_governor'] = governor
+    _active_governor.set(governor)
+    return governor
+
+
+def current_governor() -> CostGovernor:
+    """현재 컨텍스트의 비용 관리자 (세션 밖에서는 프로세스 기본값)"""
+    return _active_governor.get() or _default_governor
+
+
+def _restore_completion(payload: bytes):
+    """캐시에 저장된 JSON을 ChatCompletion 객체로 복원"""
+    from openai.types.chat import ChatCompletion
+    return ChatCompletion.model_validate_json(payload)
+
+
+def governed_chat(client, use_cache: bool = False, **kwargs):
+    """
+    예산 확인, 모델 조정, 비용 기록을 거치는 chat.completions.create 래퍼
+
+    Args:
+        client: OpenAI 클라이언트
+        use_cache (bool): 같은 요청의 응답을 공유 디스크 캐시에서 재사용할지 여부
+            (핵심 요소 추출처럼 결과가 거의 고정된 호출에만 사용)
+        **kwargs: chat.completions.create 인자
+
+    Returns:
+        ChatCompletion 응답
+    """
+    governor = current_governor()
+
+    # 캐시 적중은 비용이 없으므로 호출자가 요청한 모델 기준으로 먼저 조회하고 예산 확인/모델 조정은 그 뒤에 수행
+    requested_model = kwargs["model"]
+    key = digest_key(json.dumps(kwargs, ensure_ascii=False, sort_keys=True, default=str)) if use_cache else None
+    if key:
+        cached = get_shared_cache().get("llm", key)
+        if cached is not None:
+            increment("llm_cache_hits", 1, model=requested_model)
+            return _restore_completion(cached)
+
+    kwargs["model"] = governor.plan_chat_model(requested_model)
+    response = client.chat.completions.create(**kwargs)
+    if getattr(response, "usage", None) is not None:
+        governor.record_chat(kwargs["model"], response.usage)
+    # 예산 임박으로 더 저렴한 모델을 쓴 응답은 요청한 모델의 캐시 항목으로 남기지 않음
+    if key and kwargs["model"] == requested_model and hasattr(response, "model_dump_json"):
+        get_shared_cache().set("llm", key, response.model_dump_json().encode('utf-8'))
+    return response
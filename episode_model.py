@@ -0,0 +1,200 @@
+import json
+import hashlib
+import logging
+import threading
+from dataclasses import dataclass, field, asdict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+def stable_hash(*parts) -> str:
+    """입력값들로부터 실행 환경과 무관한 고정 해시 생성"""
+    payload = json.dumps(parts, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+# 컷 단위 파생 단계: (단계 이름, 의존하는 이전 단계들, 의존하는 설정 필드들)
+# *_prompt 필드는 설정값이 아니라 사용한 프롬프트 템플릿의 정적 해시 (템플릿이 바뀌면 해당 단계부터 재계산)
+STAGES: List[Tuple[str, Tuple[str, ...], Tuple[str, ...]]] = [
+    ("description", ("scene_text",), ("style", "mood", "composition", "character_desc", "description_prompt")),
+    ("enhanced_prompt", ("description",), ("style", "mood")),
+    ("image", ("enhanced_prompt",), ("style", "mood", "aspect_ratio", "generation_mode", "image_prompt")),
+    ("score", ("image", "description"), ()),
+]
+# 여러 컷을 한 번의 호출로 계산하는 에피소드 단위 단계 (입력 해시는 컷 단위 단계와 같은 방식으로 관리)
+EPISODE_STAGES: List[Tuple[str, Tuple[str, ...], Tuple[str, ...]]] = [
+    ("summary", ("scene_text",), ()),
+]
+STAGE_NAMES = ["scene_text"] + [name for name, _, _ in STAGES + EPISODE_STAGES]
+
+
+@dataclass
+class StageResult:
+    value: Any
+    input_hash: str
+
+
+@dataclass
+class CutState:
+    index: int
+    scene_type: str
+    stages: Dict[str, StageResult] = field(default_factory=dict)
+
+    def value(self, stage: str, default=None):
+        result = self.stages.get(stage)
+        return result.value if result else default
+
+
+class Episode:
+    """
+    컷별 파생 결과(장면 텍스트, 설명, 개선 프롬프트, 이미지, 점수, 요약)를
+    입력 해시와 함께 보관하여 바뀐 단계만 다시 계산하는 에피소드 모델
+
+    서로 다른 컷은 여러 스레드에서 동시에 계산할 수 있으며,
+    결과 기록과 직렬화(to_dict)는 같은 잠금으로 보호됩니다.
+    """
+
+    def __init__(self, text: str, cut_count: int):
+        self.text = text
+        self.cut_count = cut_count
+        self.source_hash = stable_hash(text, cut_count)
+        self.cuts: List[CutState] = []
+        self._lock = threading.Lock()
+
+    def matches(self, text: str, cut_count: int) -> bool:
+        """같은 원문/컷 수로 만든 에피소드인지 확인 (장면 분할 재사용 가능 여부)"""
+        return self.source_hash == stable_hash(text, cut_count) and bool(self.cuts)
+
+    def set_scenes(self, scenes: Dict[str, str]):
+        """장면 분할 결과로 컷 목록 구성"""
+        self.cuts = []
+        for i, (scene_type, scene) in enumerate(scenes.items()):
+            cut = CutState(index=i, scene_type=scene_type)
+            cut.stages["scene_text"] = StageResult(scene, stable_hash(scene))
+            self.cuts.append(cut)
+
+    def set_scene_text(self, index: int, scene: str):
+        """한 컷의 장면 텍스트 수정 (이후 단계는 다음 계산 시 자동 무효화)"""
+        self.cuts[index].stages["scene_text"] = StageResult(scene, stable_hash(scene))
+
+    def invalidate(self, index: int, stage: str):
+        """특정 컷의 단계를 강제로 무효화 (하위 단계는 해시 변경으로 연쇄 재계산)"""
+        self.cuts[index].stages.pop(stage, None)
+
+    @staticmethod
+    def _stage_input_hash(cut: CutState, upstream: Tuple[str, ...], config_fields: Tuple[str, ...],
+                          config: Dict) -> Optional[str]:
+        upstream_hashes = []
+        for name in upstream:
+            result = cut.stages.get(name)
+            if result is None:
+                return None
+            upstream_hashes.append(stable_hash(result.value))
+        return stable_hash(upstream_hashes, {k: config.get(k) for k in config_fields})
+
+    def compute_cut(self, index: int, config: Dict, stage_fns: Dict[str, Callable[[Dict], Any]],
+                    on_stage: Optional[Callable[[int, str], None]] = None) -> List[str]:
+        """
+        한 컷의 단계들을 순서대로 확인하여 입력이 바뀐 단계만 다시 계산
+
+        Args:
+            index (int): 컷 인덱스
+            config (dict): 현재 설정 (SceneConfig.__dict__)
+            stage_fns (dict): {단계 이름: 입력 딕셔너리를 받아 결과를 반환하는 함수}
+            on_stage (callable): 단계 결과가 기록될 때마다 (컷 인덱스, 단계 이름)으로 호출 (체크포인트용)
+
+        Returns:
+            list: 다시 계산된 단계 이름 목록
+        """
+        cut = self.cuts[index]
+        recomputed = []
+        for name, upstream, config_fields in STAGES:
+            input_hash = self._stage_input_hash(cut, upstream, config_fields, config)
+            if input_hash is None:
+                break  # 상위 단계 결과가 없으면 이후 단계는 계산 불가
+
+            current = cut.stages.get(name)
+            if current is not None and current.input_hash == input_hash:
+                continue
+
+            inputs = {dep: cut.value(dep) for dep in upstream}
+            value = stage_fns[name](inputs)
+            if value is None:
+                # 실패한 결과는 저장하지 않아 다음 계산 때 다시 시도
+                with self._lock:
+                    cut.stages.pop(name, None)
+                logging.warning(f"컷 {index + 1} '{name}' 단계 결과 없음")
+                break
+            with self._lock:
+                cut.stages[name] = StageResult(value, input_hash)
+            recomputed.append(name)
+            if on_stage is not None:
+                on_stage(index, name)
+
+        if recomputed:
+            logging.info(f"컷 {index + 1} 재계산 단계: {', '.join(recomputed)}")
+        return recomputed
+
+    def compute_episode_stage(self, name: str, config: Dict, batch_fn: Callable[[List[Dict]], List[Any]],
+                              on_stage: Optional[Callable[[int, str], None]] = None) -> List[int]:
+        """
+        에피소드 단위 단계를 입력이 바뀐 컷들만 모아 batch_fn 한 번으로 계산
+
+        Args:
+            name (str): EPISODE_STAGES의 단계 이름
+            config (dict): 현재 설정 (SceneConfig.__dict__)
+            batch_fn (callable): 컷별 입력 딕셔너리 목록(각각 "index" 포함)을 받아 같은 순서의 결과 목록 반환
+            on_stage (callable): 결과가 기록된 뒤 (컷 인덱스, 단계 이름)으로 호출
+
+        Returns:
+            list: 다시 계산된 컷 인덱스 목록
+        """
+        upstream, config_fields = next((up, fields) for stage, up, fields in EPISODE_STAGES if stage == name)
+        stale = []
+        for cut in self.cuts:
+            input_hash = self._stage_input_hash(cut, upstream, config_fields, config)
+            current = cut.stages.get(name)
+            if input_hash is not None and (current is None or current.input_hash != input_hash):
+                stale.append((cut, input_hash))
+        if not stale:
+            return []
+
+        inputs = [dict({dep: cut.value(dep) for dep in upstream}, index=cut.index) for cut, _ in stale]
+        values = batch_fn(inputs)
+        recomputed = []
+        for (cut, input_hash), value in zip(stale, values):
+            if value is None:
+                continue
+            with self._lock:
+                cut.stages[name] = StageResult(value, input_hash)
+            recomputed.append(cut.index)
+            if on_stage is not None:
+                on_stage(cut.index, name)
+
+        logging.info(f"에피소드 '{name}' 단계 {len(recomputed)}개 컷 일괄 계산")
+        return recomputed
+
+    def images(self) -> Dict[int, str]:
+        return {cut.index: cut.value("image") for cut in self.cuts if cut.value("image")}
+
+    def completed_count(self) -> int:
+        """이미지까지 생성된 컷 수"""
+        return len(self.images())
+
+    def to_dict(self) -> Dict:
+        with self._lock:
+            return {
+                "text": self.text,
+                "cut_count": self.cut_count,
+                "cuts": [asdict(cut) for cut in self.cuts],
+            }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "Episode":
+        episode = cls(data["text"], data["cut_count"])
+        for cut_data in data.get("cuts", []):
+            cut = CutState(index=cut_data["index"], scene_type=cut_data["scene_type"])
+            cut.stages = {
+                name: StageResult(**result) for name, result in cut_data.get("stages", {}).items()
+            }
+            episode.cuts.append(cut)
+        return episode
@@ -1,3 +1,8 @@
+import os
+import re
+import math
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait
 import streamlit as st
 from typing import List, Dict, Tuple, Optional
 from dataclasses import dataclass
@@ -8,10 +13,78 @@ from openai import OpenAI
 import torch
 from io import BytesIO
 import PyPDF2
-from clip_analyzer import CLIPAnalyzer
+from clip_analyzer import get_clip_analyzer
 from docx import Document
-from image_gen import generate_image_from_text
+from image_gen import GENERATION_MODES, attempt_purpose, generate_image_from_text, upscale_to_final
 from save_utils import save_session
+from image_derivatives import get_derivative_worker, display_source
+from episode_model import Episode
+from job_store import get_job_store
+from character_bank import CharacterBank
+from captioner import EpisodeCaptioner
+from prompt_templates import (
+    COMPOSITION_GUIDES, MOOD_GUIDES, NEGATIVE_ELEMENTS, STORY_NEGATIVE_PROMPT, STYLE_GUIDES, get_prompt_registry
+)
+from generation_log import record_generation_log
+from cost_governor import activate_session_governor, current_governor, governed_chat
+from prompt_cache import get_prompt_cache
+from tracing import get_tracer, current_trace_id, span, traced
+
+MAX_CUTS = 60
+LONG_EPISODE_THRESHOLD = 4  # 이 컷 수를 넘으면 구간별로 나누어 장면을 계획 (긴 에피소드 모드)
+PLAN_CHUNK_CUTS = int(os.getenv("WEBTOONIZER_PLAN_CHUNK_CUTS", "8"))  # 계획 요청 1회당 컷 수
+CONTEXT_WINDOW_SCENES = int(os.getenv("WEBTOONIZER_CONTEXT_WINDOW_SCENES", "3"))  # 다음 구간에 넘길 직전 장면 수
+CUT_CONCURRENCY = int(os.getenv("WEBTOONIZER_CUT_CONCURRENCY", "3"))  # 동시에 계산하는 컷 수
+STYLE_CONSISTENCY_THRESHOLD = 0.7  # 컷별 화풍 일관성이 이보다 낮으면 경고 (analyze_style_consistency 기준과 동일)
+CHARACTER_NOTES_PREFIX = "캐릭터 메모:"
+
+SCENE_TYPES = {
+    1: ["핵심 장면"],
+    2: ["도입부", "절정"],
+    3: ["시작", "전개", "결말"],
+    4: ["기(起)", "승(承)", "전(轉)", "결(結)"]
+}
+
+# 컷별 이미지 생성 시도 횟수 ([횟수] 목록, _compute_cut_timed가 작업 스레드 컨텍스트마다 새로 설정)
+_cut_attempts = contextvars.ContextVar("cut_attempts", default=None)
+
+
+def distribute_counts(total: int, parts: int) -> List[int]:
+    """total개를 parts개 묶음에 최대한 고르게 나눔 (앞 묶음부터 1개씩 더 배정)"""
+    base, extra = divmod(total, parts)
+    return [base + (1 if i < extra else 0) for i in range(parts)]
+
+
+def scene_types_for(cut_count: int) -> List[str]:
+    """컷 수에 맞는 장면 구조 (4컷을 넘으면 기승전결 각 단계를 여러 컷으로 나눔)"""
+    if cut_count in SCENE_TYPES:
+        return list(SCENE_TYPES[cut_count])
+    phases = SCENE_TYPES[4]
+    return [
+        f"{phase} {k + 1}"
+        for phase, count in zip(phases, distribute_counts(cut_count, len(phases)))
+        for k in range(count)
+    ]
+
+
+def split_story_chunks(text: str, chunk_count: int) -> List[str]:
+    """원문을 문단(문단이 부족하면 문장) 경계에서 길이가 비슷한 chunk_count개 구간으로 나눔"""
+    units = [p.strip() for p in re.split(r'\n\s*\n', text) if p.strip()]
+    if len(units) < chunk_count:
+        units = [s.strip() for s in re.split(r'(?<=[.!?。])\s+', text) if s.strip()]
+    if not units:
+        return [text]
+
+    total = sum(len(unit) for unit in units)
+    chunks = [[] for _ in range(chunk_count)]
+    position = 0
+    for unit in units:
+        # 구간 시작 위치 기준으로 배정하여 각 구간 길이를 비슷하게 유지
+        chunks[min(int(position / total * chunk_count), chunk_count - 1)].append(unit)
+        position += len(unit)
+    return ["\n\n".join(chunk) for chunk in chunks if chunk]
+
+
 @dataclass
 class SceneConfig:
     style: str
@@ -19,76 +92,20 @@ class SceneConfig:
     mood: str
     character_desc: str
     aspect_ratio: str
+    generation_mode: str = "final"  # image_gen.GENERATION_MODES 참고
 
 class TextToWebtoonConverter:
     def __init__(self, openai_client: OpenAI, clip_analyzer):
         self.client = openai_client
         self.clip_analyzer = clip_analyzer
         self.setup_logging()
-        self.style_guides = {
-            "미니멀리스트": {
-                "prompt": "minimal details, simple lines, clean composition, essential elements only",
-                "emphasis": "Focus on simplicity and negative space"
-            },
-            "픽토그램": {
-                "prompt": "pictogram style, symbolic representation, simplified shapes, icon-like style",
-                "emphasis": "Clear silhouettes and symbolic elements"
-            },
-            "카툰": {
-                "prompt": "animated style, exaggerated features, bold colors",
-                "emphasis": "Expressive and dynamic elements"
-            },
-            "웹툰": {
-                "prompt": "webtoon style, manhwa art style, clean lines, vibrant colors",
-                "emphasis": "Dramatic angles and clear storytelling"
-            },
-            "예술적": {
-                "prompt": "painterly style, artistic interpretation, creative composition",
-                "emphasis": "Atmospheric and textural details"
-            }
-        }
-        
-        self.mood_guides = {
-            "일상적": {
-                "prompt": "natural lighting, soft colors, everyday atmosphere",
-                "lighting": "warm, natural daylight",
-                "color": "neutral, balanced palette"
-            },
-            "긴장된": {
-                "prompt": "dramatic lighting, high contrast, intense atmosphere",
-                "lighting": "harsh shadows, dramatic highlights",
-                "color": "high contrast, intense tones"
-            },
-            "진지한": {
-                "prompt": "subdued lighting, serious atmosphere, formal composition",
-                "lighting": "soft, directional light",
-                "color": "muted, serious tones"
-            },
-            "따뜻한": {
-                "prompt": "warm colors, soft lighting, comfortable atmosphere",
-                "lighting": "golden hour, soft glow",
-                "color": "warm, inviting palette"
-            },
-            "즐거운": {
-                "prompt": "bright lighting, warm colors, dynamic composition",
-                "lighting": "bright, cheerful",
-                "color": "vibrant, playful colors"
-            }
-        }
-        
-        self.composition_guides = {
-            "배경과 인물": "balanced composition of character and background, eye-level shot",
-            "근접 샷": "close-up shot, focused on character's expression",
-            "대화형": "two-shot composition, characters facing each other",
-            "풍경 위주": "wide shot, emphasis on background scenery",
-            "일반": "standard view, balanced composition"
-        }
-         # 부정적 조건을 클래스 속성으로 정의
-        self.negative_elements = (
-            "blurry images, distorted faces, text in image, unrealistic proportions, "
-            "extra limbs, overly complicated backgrounds, too much characters,excessive details,poor lighting, bad anatomy, "
-            "abstract images, cut-off elements"
-        )
+        self.prompts = get_prompt_registry()
+        self.captioner = EpisodeCaptioner(openai_client)
+        self.style_guides = STYLE_GUIDES
+        self.mood_guides = MOOD_GUIDES
+        self.composition_guides = COMPOSITION_GUIDES
+        # 부정적 조건을 클래스 속성으로 정의
+        self.negative_elements = NEGATIVE_ELEMENTS
 
     @staticmethod
     def setup_logging():
@@ -129,6 +146,7 @@ class TextToWebtoonConverter:
             st.error(f"파일 읽기 오류: {str(e)}")
             return None
 
+    @traced("gpt.analyze_text")
     def analyze_text(self, text: str, cut_count: int) -> List[str]:
         """텍스트를 분석하여 주요 장면들을 추출"""
         try:
@@ -158,7 +176,8 @@ class TextToWebtoonConverter:
             st.subheader("🔍 GPT 요청 메시지")
             st.text_area("Request Messages", value=f"{messages}", height=200)
             
-            response = self.client.chat.completions.create(
+            response = governed_chat(
+                self.client,
                 model="gpt-4",
                 messages=messages,
                 temperature=0.7
@@ -171,19 +190,18 @@ class TextToWebtoonConverter:
             logging.error(f"Scene analysis failed: {str(e)}")
             raise
 
-    def analyze_story_by_cuts(self, text: str, cut_count: int) -> Dict[str, str]:
-        """컷 수에 따른 스토리 분석"""
+    @traced("gpt.analyze_story_by_cuts")
+    def analyze_story_by_cuts(self, text: str, cut_count: int, character_desc: str = "") -> Dict[str, str]:
+        """컷 수에 따른 스토리 분석 (LONG_EPISODE_THRESHOLD를 넘으면 구간별로 나누어 계획)"""
+        if cut_count > LONG_EPISODE_THRESHOLD:
+            return self.plan_long_episode(text, cut_count, character_desc)
+
         try:
-            scene_types = {
-                1: ["핵심 장면"],
-                2: ["도입부", "절정"],
-                3: ["시작", "전개", "결말"],
-                4: ["기(起)", "승(承)", "전(轉)", "결(結)"]
-            }
-            
+            scene_types = scene_types_for(cut_count)
+
             prompt = f"""다음 이야기를 {cut_count}개의 핵심 장면으로 나누어 분석해주세요.
             각 장면은 다음 구조에 맞춰 선택해주세요:
-            {scene_types[cut_count]}
+            {scene_types}
             
             각 장면은 다음 요소를 포함해야 합니다:
             - 구체적인 공간감과 배경 묘사
@@ -195,7 +213,8 @@ class TextToWebtoonConverter:
             텍스트:
             {text}"""
             
-            response = self.client.chat.completions.create(
+            response = governed_chat(
+                self.client,
                 model="gpt-4",
                 messages=[{"role": "user", "content": prompt}],
                 temperature=0.7
@@ -204,7 +223,7 @@ class TextToWebtoonConverter:
             scenes = {}
             raw_scenes = response.choices[0].message.content.strip().split("\n\n")
             
-            for scene_type, scene in zip(scene_types[cut_count], raw_scenes):
+            for scene_type, scene in zip(scene_types, raw_scenes):
                 scenes[scene_type] = scene
             
             return scenes
@@ -213,6 +232,84 @@ class TextToWebtoonConverter:
             logging.error(f"Scene analysis failed: {str(e)}")
             raise
 
+    @traced("gpt.plan_long_episode")
+    def plan_long_episode(self, text: str, cut_count: int, character_desc: str = "") -> Dict[str, str]:
+        """
+        긴 에피소드 장면 계획 - 원문을 구간으로 나누어 구간마다 PLAN_CHUNK_CUTS개 안팎의 장면을 계획
+
+        전체 원문을 매번 다시 보내는 대신 현재 구간 텍스트와 함께
+        누적 캐릭터 메모, 직전 CONTEXT_WINDOW_SCENES개 장면만 문맥으로 전달합니다.
+        """
+        scene_types = scene_types_for(cut_count)
+        chunks = split_story_chunks(text, math.ceil(cut_count / PLAN_CHUNK_CUTS))
+        scenes: Dict[str, str] = {}
+        character_notes = character_desc
+        offset = 0
+
+        for chunk_index, (chunk, count) in enumerate(zip(chunks, distribute_counts(cut_count, len(chunks)))):
+            chunk_types = scene_types[offset:offset + count]
+            offset += count
+            recent_scenes = list(scenes.values())[-CONTEXT_WINDOW_SCENES:]
+            planned, character_notes = self._plan_chunk(
+                chunk, chunk_types, character_notes, recent_scenes, chunk_index, len(chunks)
+            )
+            if len(planned) < len(chunk_types):
+                logging.warning(f"구간 {chunk_index + 1}: 장면 {len(chunk_types)}개 중 {len(planned)}개만 계획됨")
+            scenes.update(zip(chunk_types, planned))
+
+        return scenes
+
+    @traced("gpt.plan_chunk")
+    def _plan_chunk(self, chunk: str, scene_types: List[str], character_notes: str, recent_scenes: List[str],
+                    chunk_index: int, chunk_total: int) -> Tuple[List[str], str]:
+        """한 구간의 장면 계획과 갱신된 캐릭터 메모 반환"""
+        recent = "\n\n".join(scene[:300] for scene in recent_scenes) or "없음 (첫 구간)"
+        prompt = f"""긴 이야기를 {chunk_total}개 구간으로 나눈 것 중 {chunk_index + 1}번째 구간입니다.
+            이 구간을 {len(scene_types)}개의 핵심 장면으로 나누어 분석해주세요.
+            각 장면은 다음 구조에 맞춰 선택해주세요:
+            {scene_types}
+
+            각 장면은 다음 요소를 포함해야 합니다:
+            - 구체적인 공간감과 배경 묘사
+            - 캐릭터의 동작과 표정
+            - 조명과 분위기
+            - 시각적 포인트
+            - 앞뒤 장면과의 연결성
+
+            지금까지의 캐릭터 메모 (외형과 호칭을 그대로 유지할 것):
+            {character_notes or '아직 없음'}
+
+            직전 장면:
+            {recent}
+
+            현재 구간 텍스트:
+            {chunk}
+
+            장면들은 빈 줄로 구분하고, 마지막 줄은 '{CHARACTER_NOTES_PREFIX}'로 시작하여
+            지금까지 등장한 인물들의 외형, 성격, 관계를 한 줄로 갱신해주세요."""
+
+        try:
+            response = governed_chat(
+                self.client,
+                model="gpt-4",
+                messages=[{"role": "user", "content": prompt}],
+                temperature=0.7
+            )
+            content = response.choices[0].message.content.strip()
+        except Exception as e:
+            logging.error(f"Chunk planning failed: {str(e)}")
+            raise
+
+        lines = content.split("\n")
+        note_lines = [i for i, line in enumerate(lines) if line.strip().startswith(CHARACTER_NOTES_PREFIX)]
+        if note_lines:
+            last = note_lines[-1]
+            character_notes = lines[last].strip()[len(CHARACTER_NOTES_PREFIX):].strip() or character_notes
+            content = "\n".join(lines[:last] + lines[last + 1:])
+
+        planned = [scene.strip() for scene in content.strip().split("\n\n") if scene.strip()]
+        return planned[:len(scene_types)], character_notes
+
     @staticmethod
     def get_image_size(aspect_ratio: str) -> str:
         """이미지 크기 결정"""
@@ -222,35 +319,19 @@ class TextToWebtoonConverter:
             "9:16": "1024x1792"
         }
         return sizes.get(aspect_ratio, "1024x1024")
+    @traced("gpt.create_scene_description")
     def create_scene_description(self, scene: str, config: SceneConfig) -> str:
     ###"""장면별 상세 시각적 설명 생성"""
         try:
-            style_guide = self.style_guides[config.style]
-            mood_guide = self.mood_guides[config.mood]
-        
-            prompt = f"""웹툰 작화 지침:
-            장면: {scene}
-        
-            스타일 요구사항:
-            {style_guide['prompt']}
-            {style_guide['emphasis']}
-        
-            분위기 요구사항:
-            {mood_guide['prompt']}
-            조명: {mood_guide['lighting']}
-            색감: {mood_guide['color']}
-        
-            구도: {self.composition_guides[config.composition]}
-            캐릭터 특징: {config.character_desc if config.character_desc else '특별한 지정 없음'}
-        
-            다음 요소들을 상세히 설명해주세요:
-            1. 화면 구도와 시점
-            2. 캐릭터의 위치, 포즈, 표정
-            3. 배경의 깊이감과 디테일
-            4. 조명과 그림자의 처리
-            5. 감정을 강조하는 시각적 요소"""
-
-            response = self.client.chat.completions.create(
+            prompt = self.prompts.render(
+                "story.scene_description",
+                {"style": config.style, "mood": config.mood, "composition": config.composition},
+                scene=scene,
+                character_desc=config.character_desc if config.character_desc else '특별한 지정 없음'
+            ).text
+
+            response = governed_chat(
+                self.client,
                 model="gpt-4",
                 messages=[{"role": "user", "content": prompt}],
                 temperature=0.7
@@ -262,55 +343,80 @@ class TextToWebtoonConverter:
             raise
 
 
-    def generate_image(self, description: str, config: SceneConfig) -> str:
-        # 최대 시도 횟수 제한
-        max_attempts = 3  
+    @traced("cut.generate_image")
+    def generate_image(self, description: str, config: SceneConfig, use_cache: bool = True,
+                       character_bank: Optional[CharacterBank] = None) -> str:
+        # 최대 시도 횟수 제한 (예산 임박 시 축소)
+        max_attempts = current_governor().plan_attempts(3)
         min_acceptable_score = 0.6  # 최소 허용 점수
+        attempts = []  # 컷마다 따로 기록 (여러 컷을 동시에 생성하므로 인스턴스에 공유하지 않음)
 
         for attempt in range(max_attempts):
+            counter = _cut_attempts.get()
+            if counter is not None:
+                counter[0] += 1
             try:
-                style_guide = self.style_guides[config.style]
-                mood_guide = self.mood_guides[config.mood]
-                
-                final_prompt = f"""{description}
-                Visual style: {style_guide['prompt']}
-                Mood: {mood_guide['prompt']}
-                Lighting: {mood_guide['lighting']}
-                Color: {mood_guide['color']}"""
-
-                # 부정적 프롬프트
-                negative_prompt = """
-                추상적인 이미지, 흐릿한 이미지, 낮은 품질, 비현실적인 비율, 
-                왜곡된 얼굴, 추가 사지, 이미지 안 텍스트, 말풍선, 5명 이상의 인물, 국기 또는 나라, 
-                잘린 이미지, 과도한 필터, 비문법적 구조, 중복된 특징, 
-                나쁜 해부학, 나쁜 손, 과도하게 복잡한 배경
-                """
-
-                # image_gen.py의 함수 사용
+                final_prompt = self.prompts.render(
+                    "story.image", {"style": config.style, "mood": config.mood}, description=description
+                ).text
+
+                # image_gen.py의 함수 사용 (생성 모드에 따라 초안/재시도/최종 품질 선택)
                 image_url, revised_prompt, created_seed = generate_image_from_text(
                     prompt=final_prompt,
                     style=config.style,
                     aspect_ratio=config.aspect_ratio,
-                    negative_prompt=negative_prompt
+                    negative_prompt=STORY_NEGATIVE_PROMPT,
+                    purpose=attempt_purpose(config.generation_mode, attempt),
+                    # 재시도는 다른 이미지가 필요하므로 첫 시도만 캐시 사용
+                    use_cache=use_cache and attempt == 0
                 )
                 
                 if image_url:
-                    quality_check = self.clip_analyzer.validate_image(
-                        image_url, 
-                        description,
-                        return_score=True
-                    )
+                    cache = get_prompt_cache()
+                    cached_score = cache.score_for(image_url) if cache else None
+                    if cached_score is not None:
+                        quality_check = {"similarity_score": cached_score, "missing_elements": []}
+                    else:
+                        quality_check = self.clip_analyzer.validate_image(
+                            image_url, 
+                            description,
+                            return_score=True,
+                            prescreen_prompt=revised_prompt  # 1차 선별은 DALL-E가 다듬은 영문 프롬프트 기준
+                        )
+                    if quality_check.get("prescreen_rejected"):
+                        # 1차 선별 점수는 정밀 점수와 척도가 다르므로 캐시에 남기지 않고,
+                        # 정밀 검증된 시도가 하나도 없을 때만 최후의 대안으로 사용
+                        self._record_attempt(attempts, attempt, image_url, quality_check["prescreen_score"],
+                                             prescreened=True)
+                        continue
                     
                     score = quality_check.get("similarity_score", 0.0)
-                    self._record_attempt(attempt, image_url, score)
+                    if cache is not None and cached_score is None:
+                        cache.record_score(image_url, score)
+                    self._record_attempt(attempts, attempt, image_url, score)
                     
                     # 점수에 따른 조건부 수락
+                    accepted = None
                     if score >= 0.7:  # target_score_threshold
-                        logging.info(f"이상적인 이미지 생성 (점수: {score})")
-                        return image_url
+                        accepted = f"이상적인 이미지 생성 (점수: {score})"
                     elif score >= min_acceptable_score and attempt >= 1:
-                        logging.info(f"적정 수준의 이미지 생성 (점수: {score})")
-                        return image_url
+                        accepted = f"적정 수준의 이미지 생성 (점수: {score})"
+
+                    if accepted and character_bank is not None:
+                        consistent, character_score = character_bank.check(image_url)
+                        if not consistent and attempt < max_attempts - 1:
+                            # 캐릭터가 기준 컷과 다르면 캐릭터 묘사를 강조해 해당 컷만 다시 생성
+                            logging.info(f"캐릭터 일관성 미달 (유사도: {character_score:.2f}), 재생성")
+                            description = character_bank.reinforce_prompt(description)
+                            continue
+
+                    if accepted:
+                        logging.info(accepted)
+                        final_url = self._finalize_accepted(image_url, revised_prompt, description, config,
+                                                            min_acceptable_score, character_bank)
+                        if character_bank is not None:
+                            character_bank.seed(final_url)  # 처음 채택된 컷만 기준으로 사용
+                        return final_url
                     
                     # 프롬프트 개선은 1회만 시도
                     if attempt == 0 and score < min_acceptable_score:
@@ -322,34 +428,62 @@ class TextToWebtoonConverter:
                     
             except Exception as e:
                 logging.error(f"이미지 생성 시도 {attempt + 1} 실패: {str(e)}")
-                if attempt == max_attempts - 1:
-                    best_result = self._get_best_attempt()
-                    if best_result:
-                        return best_result
-                    
-        return None
 
-    def _record_attempt(self, attempt_num: int, image_url: str, score: float):
-        """각 시도의 결과를 기록"""
-        if not hasattr(self, '_generation_attempts'):
-            self._generation_attempts = []
-        
-        self._generation_attempts.append({
+        # 기준을 넘은 시도가 없으면 컷을 버리지 않고 지금까지의 최선의 시도 사용
+        return self._get_best_attempt(attempts)
+
+    def _finalize_accepted(self, image_url: str, revised_prompt: str, description: str, config: SceneConfig,
+                           min_score: float, character_bank: Optional[CharacterBank] = None) -> str:
+        """초안 후 최종 모드에서는 검증을 통과한 초안만 최종 품질로 다시 생성 (최종본이 검증에 실패하면 초안 사용)"""
+        if config.generation_mode != "draft_then_final":
+            return image_url
+        final_url, final_revised_prompt, _ = upscale_to_final(revised_prompt, config.aspect_ratio, STORY_NEGATIVE_PROMPT)
+        if not final_url:
+            return image_url
+
+        # 최종본은 다른 이미지로 다시 생성되므로 초안과 같은 기준으로 다시 검증
+        quality_check = self.clip_analyzer.validate_image(
+            final_url, description, return_score=True, prescreen_prompt=final_revised_prompt
+        )
+        score = quality_check.get("similarity_score", 0.0)
+        if quality_check.get("prescreen_rejected") or score < min_score:
+            logging.info(f"최종 품질 이미지 검증 미통과 (점수: {score}) - 초안 사용")
+            return image_url
+        if character_bank is not None:
+            consistent, character_score = character_bank.check(final_url)
+            if not consistent:
+                logging.info(f"최종 품질 이미지 캐릭터 일관성 미달 (유사도: {character_score:.2f}) - 초안 사용")
+                return image_url
+
+        logging.info("검증된 초안을 최종 품질로 재생성")
+        cache = get_prompt_cache()
+        if cache is not None:
+            cache.record_score(final_url, score)
+        return final_url
+
+    @staticmethod
+    def _record_attempt(attempts: List[Dict], attempt_num: int, image_url: str, score: float,
+                        prescreened: bool = False):
+        """각 시도의 결과를 기록 (prescreened=True면 score는 1차 선별 유사도)"""
+        attempts.append({
             'attempt': attempt_num,
             'image_url': image_url,
             'score': score,
+            'prescreened': prescreened,
             'timestamp': datetime.now()
         })
 
-    def _get_best_attempt(self) -> str:
-        """지금까지의 시도 중 최상의 결과 반환"""
-        if not hasattr(self, '_generation_attempts') or not self._generation_attempts:
+    @staticmethod
+    def _get_best_attempt(attempts: List[Dict]) -> str:
+        """지금까지의 시도 중 최상의 결과 반환 (정밀 검증된 시도를 1차 선별 탈락 시도보다 우선)"""
+        if not attempts:
             return None
             
-        best_attempt = max(self._generation_attempts, key=lambda x: x['score'])
+        best_attempt = max(attempts, key=lambda x: (not x['prescreened'], x['score']))
         logging.info(f"최선의 시도 선택 (점수: {best_attempt['score']})")
         return best_attempt['image_url']
 
+    @traced("gpt.enhance_missing_elements")
     def _enhance_prompt_with_missing_elements(self, original_prompt: str, missing_elements: list) -> str:
         """프롬프트 개선"""
         try:
@@ -362,7 +496,8 @@ class TextToWebtoonConverter:
             특히 캐릭터의 행동과 감정 표현에 중점을 두어주세요.
             """
             
-            response = self.client.chat.completions.create(
+            response = governed_chat(
+                self.client,
                 model="gpt-3.5-turbo",  # 빠른 응답을 위해 GPT-3.5 사용
                 messages=[
                     {"role": "system", "content": enhancement},
@@ -380,68 +515,6 @@ class TextToWebtoonConverter:
             logging.error(f"프롬프트 개선 실패: {str(e)}")
             return original_prompt
 
-    def summarize_scene(self, description: str) -> str:
-        """
-       장면 설명 요약 - 원본 텍스트의 맥락을 유지하면서 사용자 이해를 돕는 설명 생성
-    
-    Args:
-        description (str): 현재 장면 설명
-        original_text (str): 사용자가 입력한 원본 텍스트
-        scene_index (int): 현재 장면 인덱스
-    Returns:
-        str: 맥락이 유지된 요약 설명
-        """
-        try:
-            # 구체적이고 상황 중심의 요약을 요청하는 프롬프트
-            prompt = """다음 내용을 바탕으로 현재 장면에 대한 설명을 만들어주세요.
-원본 텍스트:
-{original_text}
-
-현재 장면 설명:
-{description}
-요구사항:
-1. 원본 텍스트의 내용과 표현을 최대한 유지할 것
-2. 현재 장면에 해당하는 부분을 중심으로 설명할 것
-3. 이야기의 흐름이 자연스럽게 이어지도록 할 것
-4. 기술적인 설명이나 시각적 묘사는 최소화할 것
-5. 실제 스토리텔링에 중점을 둘 것
-6. 150자 이내로 작성할 것
-예시:
-❌ "위에서 내려다보는 구도로, 왼쪽에는 개미들이 오른쪽에는 베짱이가 위치해 있다"
-⭕ "무더운 여름날, 주인공이 무엇을 하는데 무엇이 발생했다. "
-⭕"주인공은 어떠한 상황에 있다"
-
-장면 번호: {scene_index + 1}"""
-        
-            # GPT 모델 호출
-            response = self.client.chat.completions.create(
-                model="gpt-4",
-                messages=[
-                {"role": "system", "content": "당신은 사용자의 원본 텍스트를 기반으로 자연스러운 스토리텔링을 하는 작가입니다."},
-                {"role": "user", "content": prompt}
-                ],
-                temperature=0.5,  # 더 일관성 있는 결과를 위해 낮은 temperature 사용
-                max_tokens=200
-            )
-        
-            # GPT 응답 처리
-            summary = response.choices[0].message.content.strip()
-            # 100자로 제한
-            if len(summary) > 150:
-            # 마지막 마침표 위치 찾기
-                last_period = summary[:150].rfind('.')
-                if last_period != -1:
-                    summary = summary[:last_period + 1]
-                else:
-                # 마침표가 없는 경우 150자에서 자르고 마침표 추가
-                    summary = summary[:150] + '.'
-
-        except Exception as e:
-            logging.error(f"Scene summarization failed: {str(e)}")
-            return description[:150] + ('...' if len(description) > 150 else '')
-        return summary
-
-
     def render_ui(self):
         st.title("스토리 텍스트 시각화하기")
          # UI 가이드 expander 추가
@@ -484,6 +557,8 @@ class TextToWebtoonConverter:
             st.session_state.current_text = None
             st.session_state.scene_descriptions = []
     
+        self.render_pending_jobs()
+
         input_method = st.radio(
         "입력 방식을 선택하세요",
         ["직접 입력", "파일 업로드"],
@@ -536,16 +611,25 @@ class TextToWebtoonConverter:
                  placeholder="주요 캐릭터의 특징을 입력해주세요"
                 )
             
-                cut_count = st.radio(
+                cut_count = st.number_input(
                 "생성할 컷 수",
-                options=[1, 2, 3, 4],
-                horizontal=True
+                min_value=1,
+                max_value=MAX_CUTS,
+                value=4,
+                step=1,
+                help=f"{LONG_EPISODE_THRESHOLD}컷을 넘으면 긴 에피소드 모드로 구간별 계획 후 여러 컷을 동시에 생성합니다"
                 )
             
                 aspect_ratio = st.selectbox(
                 "이미지 비율",
                 ["정사각형 (1:1)", "와이드 (16:9)", "세로형 (9:16)"]
                 )
+
+                generation_mode = st.selectbox(
+                "생성 모드",
+                list(GENERATION_MODES.keys()),
+                format_func=lambda mode: GENERATION_MODES[mode]
+                )
         
             submit = st.form_submit_button("✨웹툰 생성 시작")
         
@@ -562,13 +646,22 @@ class TextToWebtoonConverter:
                     composition=composition,
                     mood=mood,
                     character_desc=character_desc,
-                    aspect_ratio=ratio_map.get(aspect_ratio, "1:1")
+                    aspect_ratio=ratio_map.get(aspect_ratio, "1:1"),
+                    generation_mode=generation_mode
                 )
             
                 # 세션 상태에 현재 설정 저장
                 st.session_state.current_config = config
                 st.session_state.current_text = text_content
-                self.process_submission(text_content, config, cut_count)
+                self.process_submission(text_content, config, int(cut_count))
+
+        # 중단된 작업 이어서 생성
+        resume_hash = st.session_state.pop('resume_job', None)
+        if resume_hash:
+            self.resume_job(resume_hash)
+
+        # 컷 단위 수정/재생성
+        self.render_cut_editor()
 
         # form 바깥에서 저장 버튼 처리
         if st.session_state.generated_images:
@@ -585,33 +678,292 @@ class TextToWebtoonConverter:
                     'scene_descriptions': st.session_state.scene_descriptions
                 }
                 session_dir = save_session(save_config, st.session_state.generated_images)
+                episode = st.session_state.get('episode')
+                if episode is not None and episode.cuts and episode.completed_count() == len(episode.cuts):
+                    # 완료된 에피소드는 세션으로 저장되었으므로 작업 체크포인트가 더 필요 없음
+                    get_job_store().discard(episode.source_hash)
                 st.success(f"✅ 성공적으로 저장되었습니다! 저장 위치: {session_dir}")
 
     
-    # process_submission 메소드 내의 이미지 생성 부분을 다음과 같이 수정
+    @staticmethod
+    def render_pending_jobs():
+        """체크포인트가 남아 있는 미완료 작업 목록 표시"""
+        jobs = get_job_store().list_jobs()
+        if not jobs:
+            return
+        with st.expander(f"💾 중단된 작업 {len(jobs)}개", expanded=False):
+            for job in jobs:
+                col1, col2 = st.columns([4, 1])
+                with col1:
+                    st.write(f"{job['title']}... (컷 {job['completed_cuts']}/{job['total_cuts']} 완료, {job['updated_at'][:16]})")
+                with col2:
+                    if st.button("이어서 생성", key=f"resume_{job['source_hash']}"):
+                        st.session_state.resume_job = job['source_hash']
+
+    def resume_job(self, source_hash: str):
+        """체크포인트의 원문/설정으로 작업 재실행 (완료된 단계는 건너뜀)"""
+        job = get_job_store().load_job(source_hash)
+        if job is None:
+            st.error("작업 체크포인트를 불러오지 못했습니다.")
+            return
+        episode, saved_config = job
+        try:
+            config = SceneConfig(**saved_config)
+        except TypeError as e:
+            st.error(f"저장된 설정을 읽을 수 없습니다: {str(e)}")
+            return
+
+        st.session_state.episode = episode
+        st.session_state.current_config = config
+        st.session_state.current_text = episode.text
+        self.process_submission(episode.text, config, episode.cut_count)
+
+    def _build_stage_functions(self, config: SceneConfig, use_cache: bool = True,
+                               character_bank: Optional[CharacterBank] = None) -> Dict:
+        """에피소드 모델의 컷 단계별 계산 함수 (use_cache=False면 이미지 캐시를 건너뜀)"""
+        def score_stage(inputs):
+            quality_check = self.clip_analyzer.validate_image(
+                inputs['image'],
+                inputs['description'],
+                return_score=True
+            )
+            return quality_check.get("similarity_score", 0.0)
+
+        return {
+            'description': lambda inputs: self.create_scene_description(inputs['scene_text'], config),
+            'enhanced_prompt': lambda inputs: self.clip_analyzer.enhance_prompt(
+                inputs['description'], config.style, config.mood
+            ),
+            'image': lambda inputs: self.generate_image(inputs['enhanced_prompt'], config, use_cache, character_bank),
+            'score': score_stage,
+        }
+
+    def _stage_config(self, config: SceneConfig) -> Dict:
+        """에피소드 단계 입력 해시용 설정 (설정값에 사용한 프롬프트 템플릿의 정적 해시 추가)"""
+        return {
+            **config.__dict__,
+            "description_prompt": self.prompts.static_hash(
+                "story.scene_description",
+                {"style": config.style, "mood": config.mood, "composition": config.composition}
+            ),
+            "image_prompt": self.prompts.static_hash("story.image", {"style": config.style, "mood": config.mood}),
+        }
+
+    def _compute_cut(self, episode: Episode, index: int, config: SceneConfig, use_cache: bool = True,
+                     character_bank: Optional[CharacterBank] = None) -> List[str]:
+        """컷 하나를 계산하고 표시용 미리보기 생성을 예약 (단계마다 작업 체크포인트 기록)"""
+        job_store = get_job_store()
+        stage_fns = self._build_stage_functions(config, use_cache, character_bank)
+        generate = stage_fns['image']
+        # 이미지 단계 결과는 블롭 경로로 보관하여 URL이 만료돼도 재개 시 다시 생성하지 않음
+        stage_fns['image'] = lambda inputs: job_store.persist_image(episode.source_hash, index, generate(inputs))
+        recomputed = episode.compute_cut(
+            index, self._stage_config(config), stage_fns,
+            on_stage=lambda _index, _stage: job_store.save(episode, config.__dict__)
+        )
+        image_url = episode.cuts[index].value('image')
+        if image_url and 'image' in recomputed:
+            # 표시용 미리보기를 백그라운드에서 생성
+            get_derivative_worker().submit_source(image_url)
+        return recomputed
+
+    def _caption_cuts(self, episode: Episode, config: SceneConfig) -> List[int]:
+        """장면 텍스트가 바뀐 컷들의 캡션을 한 번의 호출로 생성하고 체크포인트 기록"""
+        scene_types = {cut.index: cut.scene_type for cut in episode.cuts}
+
+        def caption_batch(inputs):
+            return self.captioner.caption(
+                [item['scene_text'] for item in inputs],
+                original_text=episode.text,
+                labels=[scene_types[item['index']] for item in inputs]
+            )
+
+        recomputed = episode.compute_episode_stage('summary', config.__dict__, caption_batch)
+        if recomputed:
+            get_job_store().save(episode, config.__dict__)
+        return recomputed
 
+    def _compute_cut_timed(self, episode: Episode, index: int, config: SceneConfig,
+                           character_bank: Optional[CharacterBank] = None) -> Tuple[List[str], float, int]:
+        """작업 스레드에서 컷 하나를 계산하고 (재계산 단계, 소요 시간, 이미지 생성 시도 횟수) 반환"""
+        scene_start_time = datetime.now()
+        counter = [0]
+        _cut_attempts.set(counter)  # copy_context().run 안에서 실행되므로 이 컷에만 적용
+        with span("cut", index=index):
+            recomputed = self._compute_cut(episode, index, config, character_bank=character_bank)
+        return recomputed, (datetime.now() - scene_start_time).total_seconds(), counter[0]
+
+    @staticmethod
+    def _render_cut(cut, scene_time: Optional[float] = None):
+        """컷 이미지, CLIP 분석 결과, 요약 표시"""
+        image_url = cut.value('image')
+        score = cut.value('score', 0.0)
+
+        # 이미지 표시
+        st.image(display_source(image_url), caption=f"컷 {cut.index+1}: {cut.scene_type}", use_column_width=True)
+
+        # 분석 결과 표시를 위한 expander 추가
+        with st.expander("🔍 CLIP 분석 결과", expanded=False):
+            col1, col2 = st.columns(2)
+            with col1:
+                st.metric("품질 점수", f"{score:.2f}")
+            with col2:
+                if score >= 0.7:
+                    st.success("✓ 높은 품질")
+                elif score >= 0.5:
+                    st.warning("△ 중간 품질")
+                else:
+                    st.error("⚠ 낮은 품질")
+
+            # 세부 분석 결과 표시
+            st.write("프롬프트 매칭:")
+            st.progress(score)
+
+            # 생성 시간 표시
+            if scene_time is not None:
+                st.info(f"⏱ 생성 시간: {scene_time:.1f}초")
+
+        # 장면 설명 표시
+        st.markdown(
+            f"<p style='text-align: center; font-size: 14px;'>{cut.value('summary', '')}</p>",
+            unsafe_allow_html=True
+        )
+
+    def _character_bank(self, episode: Episode, config: SceneConfig) -> Optional[CharacterBank]:
+        """에피소드/캐릭터 설명별 캐릭터 뱅크 (캐릭터 설명이 없으면 사용하지 않음)"""
+        if not config.character_desc:
+            return None
+        key = (episode.source_hash, config.character_desc)
+        bank = st.session_state.get('character_bank')
+        if bank is None or st.session_state.get('character_bank_key') != key:
+            try:
+                bank = CharacterBank(self.clip_analyzer.encoder, config.character_desc)
+            except Exception as e:
+                logging.warning(f"캐릭터 뱅크 생성 실패, 일관성 검사 생략: {str(e)}")
+                return None
+            st.session_state.character_bank = bank
+            st.session_state.character_bank_key = key
+
+        if not bank.seeded:
+            # 이어서 생성하는 경우 이미 완료된 첫 컷을 기준으로 사용
+            first_image = next((cut.value('image') for cut in episode.cuts if cut.value('image')), None)
+            if first_image:
+                bank.seed(first_image)
+        return bank
+
+    def _sync_episode_state(self, episode: Episode):
+        """에피소드 결과를 기존 세션 상태 키에 반영"""
+        st.session_state.episode = episode
+        st.session_state.generated_images = episode.images()
+        st.session_state.scene_descriptions = [
+            cut.value('enhanced_prompt') for cut in episode.cuts if cut.value('enhanced_prompt')
+        ]
+
+    def _record_style_consistency(self, episode: Episode, generation_metrics: Dict):
+        """긴 에피소드의 컷별 화풍 일관성 기록 (모든 쌍 대신 직전 CONTEXT_WINDOW_SCENES컷과만 비교)"""
+        images = episode.images()
+        if len(images) < 2:
+            return
+        indices = sorted(images)
+        try:
+            scores = self.clip_analyzer.windowed_consistency(
+                [images[i] for i in indices], window=CONTEXT_WINDOW_SCENES
+            )
+        except Exception as e:
+            logging.warning(f"화풍 일관성 계산 실패: {str(e)}")
+            return
+
+        by_scene = {index + 1: float(score) for index, score in zip(indices, scores)}
+        for attempt in generation_metrics['generation_attempts']:
+            if attempt['scene_number'] in by_scene:
+                attempt['style_consistency'] = by_scene[attempt['scene_number']]
+        # 첫 컷은 비교 대상이 없어 항상 1.0이므로 평균에서 제외
+        compared = [by_scene[index + 1] for index in indices[1:]]
+        generation_metrics['style_consistency'] = sum(compared) / len(compared)
+
+    @staticmethod
+    def render_stage_breakdown():
+        """현재 에피소드에서 단계별로 소요된 시간을 사이드바에 표시"""
+        tracer = get_tracer()
+        breakdown = tracer.trace_breakdown(current_trace_id())
+        if breakdown:
+            st.sidebar.markdown("### ⏱ 단계별 소요 시간")
+            for name, seconds in breakdown.items():
+                st.sidebar.text(f"{name}: {seconds:.1f}초")
+        tracer.write_openmetrics()
+
+    def render_cut_editor(self):
+        """생성된 에피소드에서 컷 하나만 수정/재생성하는 UI"""
+        activate_session_governor(st.session_state)
+        episode = st.session_state.get('episode')
+        config = st.session_state.get('current_config')
+        if not episode or not episode.cuts or config is None:
+            return
+
+        with st.expander("✏️ 컷 수정 / 다시 생성", expanded=False):
+            index = st.selectbox(
+                "수정할 컷",
+                options=list(range(len(episode.cuts))),
+                format_func=lambda i: f"컷 {i+1}: {episode.cuts[i].scene_type}"
+            )
+            cut = episode.cuts[index]
+            scene_text = st.text_area("장면 내용", value=cut.value('scene_text', ''), height=150,
+                                      key=f"scene_text_{index}")
+
+            if st.button("🔄 이 컷만 다시 생성"):
+                # 내용이 같으면 캐시를 건너뛰고 이미지부터 새로 생성
+                same_text = scene_text == cut.value('scene_text')
+                if not same_text:
+                    episode.set_scene_text(index, scene_text)
+                else:
+                    episode.invalidate(index, 'image')
+
+                with st.spinner(f"컷 {index+1} 다시 생성 중..."):
+                    scene_start_time = datetime.now()
+                    recomputed = self._compute_cut(episode, index, config, use_cache=not same_text,
+                                                   character_bank=self._character_bank(episode, config))
+                    if self._caption_cuts(episode, config):
+                        recomputed.append('summary')
+                    scene_time = (datetime.now() - scene_start_time).total_seconds()
+
+                self._sync_episode_state(episode)
+                if cut.value('image'):
+                    st.caption(f"다시 계산된 단계: {', '.join(recomputed) or '없음'}")
+                    self._render_cut(cut, scene_time)
+                else:
+                    st.error("이미지 생성에 실패했습니다. 다시 시도해주세요.")
+
+    @traced("episode.story")
     def process_submission(self, text: str, config: SceneConfig, cut_count: int):
         try:
             progress_bar = st.progress(0)
             status = st.empty()
         
-            # 로그 저장을 위한 세션 데이터 초기화
-            if 'generation_logs' not in st.session_state:
-                st.session_state.generation_logs = []
         
             # 분석 시작 시간 기록
             start_time = datetime.now()
+            governor = activate_session_governor(st.session_state)
         
             # CLIP 분석기 정보 표시
             st.sidebar.markdown("### 🔍 CLIP 분석기 정보")
             st.sidebar.info(f"디바이스: {self.clip_analyzer.device}")
             st.sidebar.info(f"모델: openai/clip-vit-base-patch32")
-        
-            status.info("📖 스토리 구조 분석 중...")
-            scenes = self.analyze_story_by_cuts(text, cut_count)
-        
-            generated_images = {}
-            scene_descriptions = []
+
+            # 같은 원문/컷 수면 기존 에피소드를 재사용하여 바뀐 설정에 영향받는 단계만 재계산
+            job_store = get_job_store()
+            episode = st.session_state.get('episode')
+            if episode is None or not episode.matches(text, cut_count):
+                # 세션이 끊겼거나 이전 실행이 실패했으면 체크포인트에서 이어서 계산
+                episode = job_store.load(text, cut_count)
+                if episode is not None:
+                    status.info(f"💾 중단된 작업을 이어서 진행합니다 (완료된 컷 {episode.completed_count()}/{len(episode.cuts)})")
+                else:
+                    status.info("📖 스토리 구조 분석 중...")
+                    episode = Episode(text, cut_count)
+                    episode.set_scenes(self.analyze_story_by_cuts(text, cut_count, config.character_desc))
+                    job_store.save(episode, config.__dict__)
+            # 중간에 오류가 나도 완료된 단계가 세션에 남도록 먼저 연결
+            st.session_state.episode = episode
         
             # 생성 메트릭 저장용 딕셔너리
             generation_metrics = {
@@ -621,106 +973,109 @@ class TextToWebtoonConverter:
                 'generation_attempts': []
             }
         
+            cut_count = len(episode.cuts)
             cols_per_row = min(cut_count, 2)
-            rows_needed = (cut_count + 1) // 2
-        
-            for row in range(rows_needed):
-                cols = st.columns(cols_per_row)
-                start_idx = row * cols_per_row
-                end_idx = min(start_idx + cols_per_row, cut_count)
-            
-                for i in range(start_idx, end_idx):
-                    scene_type, scene = list(scenes.items())[i]
-                    status.info(f"🎨 {scene_type} 장면 생성 중... ({i+1}/{cut_count})")
-                
-                    scene_start_time = datetime.now()
-                
-                    # 장면 설명 생성 및 CLIP 분석
-                    description = self.create_scene_description(scene, config)
-                    enhanced_description = self.clip_analyzer.enhance_prompt(
-                        description, config.style, config.mood
-                    )
-                    scene_descriptions.append(enhanced_description)
-                
-                    # 이미지 생성
-                    image_url = self.generate_image(enhanced_description, config)
-                
-                    if image_url:
-                        generated_images[i] = image_url
-                    
-                        # CLIP 검증 및 품질 분석
-                        quality_check = self.clip_analyzer.validate_image(
-                            image_url, 
-                            description,
-                            return_score=True
-                        )
-                    
-                        with cols[i % cols_per_row]:
-                            # 이미지 표시
-                            st.image(image_url, caption=f"컷 {i+1}: {scene_type}", use_column_width=True)
-                        
-                            # 분석 결과 표시를 위한 expander 추가
-                            with st.expander("🔍 CLIP 분석 결과", expanded=False):
-                                col1, col2 = st.columns(2)
-                                score = quality_check.get("similarity_score", 0.0)
-                            
-                                with col1:
-                                    st.metric("품질 점수", f"{score:.2f}")
-                                with col2:
-                                    if score >= 0.7:
-                                        st.success("✓ 높은 품질")
-                                    elif score >= 0.5:
-                                        st.warning("△ 중간 품질")
-                                    else:
-                                        st.error("⚠ 낮은 품질")
-                            
-                                # 세부 분석 결과 표시
-                                st.write("프롬프트 매칭:")
-                                st.progress(score)
-                            
-                                # 생성 시간 표시
-                                scene_time = (datetime.now() - scene_start_time).total_seconds()
-                                st.info(f"⏱ 생성 시간: {scene_time:.1f}초")
-                        
-                            # 장면 설명 표시
-                            summary = self.summarize_scene(description)
-                            st.markdown(
-                                f"<p style='text-align: center; font-size: 14px;'>{summary}</p>",
-                                unsafe_allow_html=True
-                            )
-                    
-                        # 메트릭 업데이트
-                        generation_metrics['scores'].append(score)
-                        generation_metrics['generation_attempts'].append({
-                            'scene_number': i + 1,
-                            'scene_type': scene_type,
-                            'clip_score': score,
-                            'generation_time': scene_time
-                        })
-                
-                    progress_bar.progress((i + 1) / cut_count)
+            slots = []
+            for start_idx in range(0, cut_count, cols_per_row):
+                slots.extend(st.columns(cols_per_row)[:cut_count - start_idx])
+
+            # 설명 -> 이미지 -> 검증을 컷마다 파이프라인으로 실행하되 동시에 CUT_CONCURRENCY컷까지만 계산
+            character_bank = self._character_bank(episode, config)
+            if character_bank is not None and not character_bank.seeded:
+                # 첫 컷이 캐릭터 기준이 되도록 먼저 계산한 뒤 나머지 컷을 동시에 계산
+                waves = [[0], list(range(1, cut_count))]
+            else:
+                waves = [list(range(cut_count))]
+
+            status.info(f"🎨 장면 {cut_count}개 생성 중... (동시 {min(CUT_CONCURRENCY, cut_count)}컷)")
+            failed_cuts = []
+            done = 0
+            with ThreadPoolExecutor(max_workers=CUT_CONCURRENCY, thread_name_prefix="cut-pipeline") as pool, \
+                    ThreadPoolExecutor(max_workers=1, thread_name_prefix="episode-captioner") as caption_pool:
+                # 캡션은 장면 텍스트에만 의존하므로 모든 컷을 한 번에, 이미지 생성과 동시에 생성
+                caption_future = caption_pool.submit(contextvars.copy_context().run, self._caption_cuts, episode, config)
+                for wave in waves:
+                    futures = {
+                        pool.submit(contextvars.copy_context().run, self._compute_cut_timed,
+                                    episode, i, config, character_bank): i
+                        for i in wave
+                    }
+                    for future in as_completed(futures):
+                        done += 1
+                        i = futures[future]
+                        cut = episode.cuts[i]
+                        try:
+                            recomputed, scene_time, image_attempts = future.result()
+                        except Exception as e:
+                            # 완료된 단계는 이미 체크포인트에 있으므로 재실행 시 그 다음 단계부터 계산
+                            logging.error(f"컷 {i+1} 생성 실패: {str(e)}")
+                            recomputed, scene_time, image_attempts = None, 0.0, 0
+
+                        if cut.value('image'):
+                            # 캡션은 보통 첫 이미지보다 먼저 끝나므로 표시 직전에만 기다림
+                            wait([caption_future])
+                            with slots[i]:
+                                self._render_cut(cut, scene_time)
+
+                            # 메트릭 업데이트
+                            score = cut.value('score', 0.0)
+                            generation_metrics['generation_attempts'].append({
+                                'scene_number': i + 1,
+                                'scene_type': cut.scene_type,
+                                'clip_score': score,
+                                'generation_time': scene_time,
+                                'image_attempts': image_attempts,  # 이미지 단계가 캐시/체크포인트에서 재사용되면 0
+                                'recomputed_stages': recomputed or []
+                            })
+                        else:
+                            failed_cuts.append(i + 1)
+
+                        progress_bar.progress(done / cut_count)
+                        status.info(f"🎨 장면 생성 중... ({done}/{cut_count})")
+
+            if caption_future.exception() is not None:
+                logging.error(f"캡션 생성 실패: {str(caption_future.exception())}")
+
+            generation_metrics['generation_attempts'].sort(key=lambda attempt: attempt['scene_number'])
+            # 점수도 컷 순서로 맞춰 생성 로그에서 scene_times와 같은 컷끼리 짝지어지도록 함
+            generation_metrics['scores'] = [attempt['clip_score'] for attempt in generation_metrics['generation_attempts']]
+            if failed_cuts:
+                st.warning(
+                    f"컷 {', '.join(map(str, sorted(failed_cuts)))} 생성에 실패했습니다. "
+                    "같은 내용으로 다시 실행하면 완료된 컷은 건너뛰고 이어서 생성합니다."
+                )
         
             # 전체 생성 시간 계산
             generation_metrics['total_time'] = (datetime.now() - start_time).total_seconds()
-            generation_metrics['avg_clip_score'] = sum(generation_metrics['scores']) / len(generation_metrics['scores'])
+            scores = generation_metrics['scores']
+            generation_metrics['avg_clip_score'] = sum(scores) / len(scores) if scores else 0.0
         
-            # 생성 로그 저장
-            st.session_state.generation_logs.append({
-                'timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                'config': config.__dict__,
-                'metrics': generation_metrics
-            })
+            if cut_count > LONG_EPISODE_THRESHOLD:
+                self._record_style_consistency(episode, generation_metrics)
+
+            # 생성 로그 저장 (영구 저장소 기록, 세션에는 최근 로그만 유지)
+            record_generation_log(st.session_state, 'story', config.__dict__, generation_metrics)
         
             # 생성 결과 요약 표시
             st.sidebar.markdown("### 📊 생성 결과 요약")
             st.sidebar.metric("평균 CLIP 점수", f"{generation_metrics['avg_clip_score']:.2f}")
             st.sidebar.metric("총 생성 시간", f"{generation_metrics['total_time']:.1f}초")
+            if 'style_consistency' in generation_metrics:
+                st.sidebar.metric("화풍 일관성", f"{generation_metrics['style_consistency']:.2f}")
+                drifted = [
+                    str(attempt['scene_number']) for attempt in generation_metrics['generation_attempts']
+                    if attempt.get('style_consistency', 1.0) < STYLE_CONSISTENCY_THRESHOLD
+                ]
+                if drifted:
+                    st.sidebar.warning(f"앞 컷들과 화풍이 달라진 컷: {', '.join(drifted)}")
+            st.sidebar.metric("세션 누적 비용", f"${governor.session.spent_usd:.2f}")
+            self.render_stage_breakdown()
         
             # 세션 상태 업데이트
-            st.session_state.generated_images = generated_images
-            st.session_state.scene_descriptions = scene_descriptions
+            self._sync_episode_state(episode)
         
-            status.success("✨ 웹툰 생성 완료!")
+            if not failed_cuts:
+                status.success("✨ 웹툰 생성 완료!")
         
           
         except Exception as e:
@@ -735,7 +1090,7 @@ def main():
     
     try:
         client = OpenAI()
-        clip_analyzer = CLIPAnalyzer()
+        clip_analyzer = get_clip_analyzer()
         converter = TextToWebtoonConverter(client, clip_analyzer)
         converter.render_ui()
     except Exception as e:
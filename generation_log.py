@@ -0,0 +1,214 @@
+import os
+import json
+import time
+import queue
+import atexit
+import shutil
+import logging
+import threading
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Sequence
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+DEFAULT_LOG_DIR = os.getenv("WEBTOONIZER_GENERATION_LOG_DIR", "generation_logs")
+SESSION_LOG_LIMIT = 20  # 브라우저 세션마다 화면 표시용으로만 유지하는 최근 로그 수
+LATENCY_QUANTILES = (0.5, 0.9, 0.99)
+
+LOG_SCHEMA = pa.schema([
+    ("timestamp", pa.timestamp("us")),
+    ("flow", pa.string()),
+    ("style", pa.string()),
+    ("mood", pa.string()),
+    ("composition", pa.string()),
+    ("aspect_ratio", pa.string()),
+    ("visualization_type", pa.string()),
+    ("scene_count", pa.int32()),
+    ("total_time", pa.float64()),
+    ("avg_clip_score", pa.float64()),
+    ("scene_times", pa.list_(pa.float64())),
+    ("cut_attempts", pa.list_(pa.int32())),
+    ("scores", pa.list_(pa.float64())),
+    ("config_json", pa.string()),
+    ("metrics_json", pa.string()),
+])
+
+
+def _to_row(flow: str, config: Dict, metrics: Dict, timestamp: datetime) -> Dict:
+    attempts = metrics.get('generation_attempts', [])
+    return {
+        "timestamp": timestamp,
+        "flow": flow,
+        "style": config.get('style'),
+        "mood": config.get('mood'),
+        "composition": config.get('composition'),
+        "aspect_ratio": config.get('aspect_ratio'),
+        "visualization_type": config.get('visualization_type'),
+        "scene_count": len(attempts),
+        "total_time": float(metrics.get('total_time', 0.0)),
+        "avg_clip_score": float(metrics.get('avg_clip_score', 0.0)),
+        "scene_times": [float(a.get('generation_time', 0.0)) for a in attempts],
+        "cut_attempts": [int(a.get('image_attempts', 0)) for a in attempts],
+        "scores": [float(s) for s in metrics.get('scores', [])],
+        "config_json": json.dumps(config, ensure_ascii=False, default=str),
+        "metrics_json": json.dumps(metrics, ensure_ascii=False, default=str),
+    }
+
+
+class GenerationLogSink:
+    """
+    생성 로그를 백그라운드 스레드에서 Parquet 파일로 기록하는 저장소
+
+    로그는 날짜별 파티션(date=YYYY-MM-DD) 아래 배치 단위 파일로 추가만 되며,
+    보존 기간이 지난 파티션은 자동으로 삭제됩니다.
+    """
+
+    def __init__(self, log_dir: str = DEFAULT_LOG_DIR, batch_size: int = 50,
+                 flush_interval: float = 5.0, retention_days: int = 90):
+        self.log_dir = log_dir
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.retention_days = retention_days
+        self._queue: "queue.Queue" = queue.Queue()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True, name="generation-log-writer")
+        self._thread.start()
+
+    def write(self, flow: str, config: Dict, metrics: Dict, timestamp: Optional[datetime] = None):
+        """로그 한 건을 비동기로 기록 요청 (호출 스레드는 대기하지 않음)"""
+        self._queue.put(_to_row(flow, config, metrics, timestamp or datetime.now()))
+
+    def _run(self):
+        buffer = []
+        last_flush = time.monotonic()
+        while not (self._stop.is_set() and self._queue.empty()):
+            try:
+                buffer.append(self._queue.get(timeout=0.5))
+            except queue.Empty:
+                pass
+            due = time.monotonic() - last_flush >= self.flush_interval
+            if buffer and (len(buffer) >= self.batch_size or due or self._stop.is_set()):
+                self._flush(buffer)
+                buffer = []
+                last_flush = time.monotonic()
+        if buffer:
+            self._flush(buffer)
+
+    def _flush(self, rows: List[Dict]):
+        try:
+            by_date = {}
+            for row in rows:
+                by_date.setdefault(row["timestamp"].strftime("%Y-%m-%d"), []).append(row)
+            for date, date_rows in by_date.items():
+                partition_dir = os.path.join(self.log_dir, f"date={date}")
+                os.makedirs(partition_dir, exist_ok=True)
+                filename = f"part-{datetime.now().strftime('%H%M%S_%f')}-{os.getpid()}.parquet"
+                tmp_path = os.path.join(partition_dir, f".{filename}.tmp")
+                pq.write_table(pa.Table.from_pylist(date_rows, schema=LOG_SCHEMA), tmp_path)
+                os.replace(tmp_path, os.path.join(partition_dir, filename))
+            self._rotate()
+        except Exception as e:
+            logging.error(f"생성 로그 기록 실패: {str(e)}")
+
+    def _rotate(self):
+        """보존 기간이 지난 날짜 파티션 삭제"""
+        cutoff = (datetime.now() - timedelta(days=self.retention_days)).strftime("%Y-%m-%d")
+        for name in os.listdir(self.log_dir):
+            if name.startswith("date=") and name[len("date="):] < cutoff:
+                shutil.rmtree(os.path.join(self.log_dir, name), ignore_errors=True)
+
+    def close(self, timeout: float = 10.0):
+        """남은 로그를 모두 기록하고 작업 스레드 종료"""
+        self._stop.set()
+        self._thread.join(timeout=timeout)
+
+
+def _dataset(log_dir: str):
+    if not os.path.isdir(log_dir):
+        return None
+    return ds.dataset(log_dir, format="parquet", partitioning="hive", schema=LOG_SCHEMA,
+                      exclude_invalid_files=True)
+
+
+def query_summary(group_by: Sequence[str] = ("style", "mood"), flow: Optional[str] = None,
+                  log_dir: str = DEFAULT_LOG_DIR) -> List[Dict]:
+    """
+    그룹별 평균 CLIP 점수와 생성 시간 분위수 집계
+
+    필요한 열만 읽어 집계하므로 전체 로그를 메모리에 올리지 않습니다.
+
+    Args:
+        group_by (list): 그룹 기준 열 ("style", "mood", "aspect_ratio" 등)
+        flow (str): "story" 또는 "nonfiction"으로 필터 (None이면 전체)
+
+    Returns:
+        list: 그룹별 count, avg_clip_score, total_time_p50/p90/p99 딕셔너리
+    """
+    dataset = _dataset(log_dir)
+    if dataset is None:
+        return []
+
+    columns = list(dict.fromkeys(list(group_by) + ["avg_clip_score", "total_time"]))
+    table = dataset.to_table(columns=columns, filter=(pc.field("flow") == flow) if flow else None)
+    if table.num_rows == 0:
+        return []
+
+    aggregated = table.group_by(list(group_by)).aggregate([
+        ("avg_clip_score", "mean"),
+        ("total_time", "count"),
+        ("total_time", "tdigest", pc.TDigestOptions(q=list(LATENCY_QUANTILES))),
+    ])
+
+    results = []
+    for row in aggregated.to_pylist():
+        quantiles = row.pop("total_time_tdigest") or []
+        summary = {key: row[key] for key in group_by}
+        summary["count"] = row["total_time_count"]
+        summary["avg_clip_score"] = row["avg_clip_score_mean"]
+        for q, value in zip(LATENCY_QUANTILES, quantiles):
+            summary[f"total_time_p{int(q * 100)}"] = value
+        results.append(summary)
+    return sorted(results, key=lambda r: -r["count"])
+
+
+_sink = None
+_sink_lock = threading.Lock()
+
+
+def get_generation_log_sink() -> GenerationLogSink:
+    """프로세스 공용 생성 로그 저장소"""
+    global _sink
+    if _sink is None:
+        with _sink_lock:
+            if _sink is None:
+                _sink = GenerationLogSink()
+                atexit.register(_sink.close)
+    return _sink
+
+
+def record_generation_log(session_state, flow: str, config: Dict, metrics: Dict):
+    """
+    생성 로그를 영구 저장소에 기록하고 세션에는 최근 로그만 유지
+
+    Args:
+        session_state: st.session_state
+        flow (str): "story" 또는 "nonfiction"
+        config (dict): 생성 설정
+        metrics (dict): 생성 메트릭
+    """
+    now = datetime.now()
+    get_generation_log_sink().write(flow, config, metrics, now)
+
+    logs = session_state.get('generation_logs')
+    if not isinstance(logs, deque):
+        logs = deque(logs or [], maxlen=SESSION_LOG_LIMIT)
+        session_state['generation_logs'] = logs
+    logs.append({
+        'timestamp': now.strftime("%Y-%m-%d %H:%M:%S"),
+        'config': config,
+        'metrics': metrics
+    })
@@ -0,0 +1,272 @@
+import os
+import shutil
+import hashlib
+import logging
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, Future
+from io import BytesIO
+from typing import Dict, Optional
+
+from PIL import Image
+
+from image_io import fetch_image_bytes
+
+DERIVATIVE_DIR_NAME = "derivatives"  # 저장된 세션 폴더 안의 변형 이미지 폴더 이름
+# 생성 중 표시용 변형은 캐시 폴더에 만들고 세션을 저장할 때만 saved_sessions로 옮김
+DEFAULT_DERIVATIVE_ROOT = os.getenv("WEBTOONIZER_DERIVATIVE_CACHE_DIR", "derivative_cache")
+DERIVATIVE_CACHE_MAX_BYTES = int(os.getenv("WEBTOONIZER_DERIVATIVE_CACHE_MAX_MB", "256")) * 1024 * 1024
+PRUNE_EVERY = 50  # 캐시 폴더에 이 횟수만큼 변형을 만들 때마다 용량 확인
+
+# 변형 이름: 긴 변 기준 최대 픽셀
+DERIVATIVE_SIZES = {
+    "thumb": 256,     # 세션 목록용 썸네일
+    "preview": 768,   # 2열 그리드 표시용
+}
+WEBP_QUALITY = 80
+COMPLETED_LIMIT = 512  # 조회용으로 기억하는 완료 작업 결과 수 (오래된 것부터 삭제)
+
+
+def derivative_paths(digest: str, root: str = DEFAULT_DERIVATIVE_ROOT) -> Dict[str, str]:
+    """원본 해시에 대응하는 변형 이미지 경로들"""
+    return {
+        name: os.path.join(root, digest[:2], f"{digest}_{name}.webp")
+        for name in DERIVATIVE_SIZES
+    }
+
+
+def build_derivatives(data: bytes, digest: Optional[str] = None,
+                      root: str = DEFAULT_DERIVATIVE_ROOT) -> Dict[str, str]:
+    """
+    원본 이미지 바이트로 WebP 썸네일/미리보기 생성
+
+    Args:
+        data (bytes): 원본 이미지 바이트
+        digest (str): 원본 SHA-256 (없으면 계산)
+        root (str): 변형 이미지 저장 루트
+
+    Returns:
+        dict: {변형 이름: 파일 경로}
+    """
+    digest = digest or hashlib.sha256(data).hexdigest()
+    paths = derivative_paths(digest, root)
+    if all(os.path.exists(path) for path in paths.values()):
+        return paths
+
+    image = Image.open(BytesIO(data))
+    # JPEG는 디코딩 단계에서 축소하여 메모리 사용량 절감
+    image.draft("RGB", (max(DERIVATIVE_SIZES.values()),) * 2)
+    image = image.convert("RGB")
+
+    # 큰 변형부터 만들어 다음 변형의 입력으로 재사용
+    source = image
+    for name, max_side in sorted(DERIVATIVE_SIZES.items(), key=lambda item: -item[1]):
+        path = paths[name]
+        resized = source.copy()
+        resized.thumbnail((max_side, max_side), Image.LANCZOS)
+        if not os.path.exists(path):
+            _save_webp_atomic(resized, path)
+        source = resized
+    return paths
+
+
+def promote_derivatives(digest: str, source_root: str, root: str) -> Optional[Dict[str, str]]:
+    """
+    캐시 폴더에 이미 만든 변형 이미지를 저장 폴더로 복사 (하나라도 없으면 None)
+
+    Returns:
+        dict: {변형 이름: 저장 폴더의 파일 경로}
+    """
+    sources = derivative_paths(digest, source_root)
+    paths = derivative_paths(digest, root)
+    for name, path in paths.items():
+        if os.path.exists(path):
+            continue
+        try:
+            _copy_atomic(sources[name], path)
+        except FileNotFoundError:
+            # 복사 도중 캐시 정리로 삭제된 경우 원본 바이트로 다시 생성
+            return None
+    return paths
+
+
+def prune_derivatives(root: str, max_bytes: int = DERIVATIVE_CACHE_MAX_BYTES) -> int:
+    """
+    변형 캐시 폴더가 용량 한도를 넘으면 오래 사용하지 않은 파일부터 삭제
+
+    Returns:
+        int: 삭제한 파일 수
+    """
+    files = []
+    for directory, _, names in os.walk(root):
+        for name in names:
+            if name.endswith(".webp"):
+                path = os.path.join(directory, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, path))
+
+    excess = sum(size for _, size, _ in files) - max_bytes
+    removed = 0
+    for _, size, path in sorted(files):
+        if excess <= 0:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            continue
+        excess -= size
+        removed += 1
+    if removed:
+        logging.info(f"변형 이미지 캐시 {removed}개 파일 정리")
+    return removed
+
+
+def _copy_atomic(source: str, path: str):
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'wb') as f, open(source, 'rb') as src:
+            shutil.copyfileobj(src, f)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def _save_webp_atomic(image: Image.Image, path: str):
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            image.save(f, format="WEBP", quality=WEBP_QUALITY, method=4)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+class DerivativeWorker:
+    """
+    변형 이미지를 백그라운드 스레드에서 생성하는 작업자
+
+    생성 중 표시용 변형은 root(캐시 폴더)에 만들고 max_bytes를 넘으면 오래 사용하지 않은 파일부터 삭제하며,
+    세션을 저장할 때 submit_bytes(root=저장 폴더)로 캐시에 있는 변형을 복사(없으면 생성)합니다.
+    """
+
+    def __init__(self, root: str = DEFAULT_DERIVATIVE_ROOT, max_workers: int = 2,
+                 max_bytes: int = DERIVATIVE_CACHE_MAX_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._builds = 0
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="derivatives")
+        self._jobs: Dict[str, Future] = {}  # 진행 중인 작업만 보관 (완료되면 _completed로 이동)
+        self._completed: "OrderedDict[str, Dict[str, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit_bytes(self, data: bytes, digest: Optional[str] = None, root: Optional[str] = None) -> Future:
+        """이미 가진 원본 바이트로 변형 생성 작업 등록 (root가 캐시 밖이면 캐시에 있는 변형을 복사해 재사용)"""
+        digest = digest or hashlib.sha256(data).hexdigest()
+        if not root or root == self.root:
+            return self._submit(digest, lambda: self._build_cached(data, digest))
+        return self._submit(
+            f"{root}:{digest}",
+            lambda: promote_derivatives(digest, self.root, root) or build_derivatives(data, digest, root)
+        )
+
+    def submit_source(self, source: str) -> Future:
+        """이미지 URL/경로를 받아 다운로드와 변형 생성을 모두 백그라운드에서 처리"""
+        return self._submit(source, lambda: self._build_cached(fetch_image_bytes(source)))
+
+    def _build_cached(self, data: bytes, digest: Optional[str] = None) -> Dict[str, str]:
+        """캐시 폴더에 변형을 만들고 PRUNE_EVERY회마다 용량 한도 확인"""
+        paths = build_derivatives(data, digest, self.root)
+        with self._lock:
+            self._builds += 1
+            due = self._builds % PRUNE_EVERY == 0
+        if due:
+            prune_derivatives(self.root, self.max_bytes)
+        return paths
+
+    def _submit(self, key: str, task) -> Future:
+        with self._lock:
+            future = self._jobs.get(key)
+            if future is not None:
+                return future
+            paths = self._completed.get(key)
+            if paths is not None:
+                # 이미 만든 변형은 다시 만들지 않음
+                future = Future()
+                future.set_result(paths)
+                return future
+            future = self._executor.submit(self._run, key, task)
+            self._jobs[key] = future
+        future.add_done_callback(lambda done: self._complete(key, done))
+        return future
+
+    def _complete(self, key: str, future: Future):
+        """완료된 작업을 진행 목록에서 빼고 결과 경로만 제한된 개수로 기억"""
+        paths = future.result() if not future.cancelled() else {}
+        with self._lock:
+            if self._jobs.get(key) is future:
+                del self._jobs[key]
+            if paths:
+                self._completed[key] = paths
+                self._completed.move_to_end(key)
+                while len(self._completed) > COMPLETED_LIMIT:
+                    self._completed.popitem(last=False)
+
+    @staticmethod
+    def _run(key: str, task) -> Dict[str, str]:
+        try:
+            return task()
+        except Exception as e:
+            logging.error(f"변형 이미지 생성 실패 ({key[:60]}): {str(e)}")
+            return {}
+
+    def lookup(self, source: str, variant: str = "preview", timeout: float = 0) -> Optional[str]:
+        """완료된 변형 이미지 경로 조회 (timeout 동안만 대기)"""
+        with self._lock:
+            paths = self._completed.get(source)
+            future = self._jobs.get(source) if paths is None else None
+        if paths is None:
+            if future is None:
+                return None
+            try:
+                paths = future.result(timeout=timeout) if timeout else (future.result() if future.done() else {})
+            except Exception:
+                return None
+        path = paths.get(variant)
+        if not path:
+            return None
+        try:
+            os.utime(path)  # 캐시 정리 시 최근 표시한 변형이 남도록 사용 시각 갱신
+        except FileNotFoundError:
+            return None  # 캐시 정리로 삭제됨 (원본으로 표시)
+        return path
+
+
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def get_derivative_worker() -> DerivativeWorker:
+    """프로세스 공용 변형 이미지 작업자"""
+    global _worker
+    if _worker is None:
+        with _worker_lock:
+            if _worker is None:
+                _worker = DerivativeWorker()
+    return _worker
+
+
+def display_source(source: str, variant: str = "preview", timeout: float = 0) -> str:
+    """화면 표시에 쓸 가장 작은 적정 크기 이미지 반환 (준비되지 않았으면 원본)"""
+    return get_derivative_worker().lookup(source, variant, timeout) or source
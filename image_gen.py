@@ -5,22 +5,90 @@ import requests
 import logging
 from PIL import Image
 import io
+from tracing import span
+from cost_governor import current_governor
+from prompt_cache import get_prompt_cache
+from dataclasses import dataclass
 # .env 파일 로드
 load_dotenv()
 client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 
+ASPECT_RATIO_SIZES = {
+    "1:1": "1024x1024",
+    "16:9": "1792x1024",
+    "9:16": "1024x1792"
+}
 
-def generate_image(prompt, style, negative_prompt):
+# 생성 모드: SceneConfig/NonFictionConfig.generation_mode 값
+GENERATION_MODES = {
+    "final": "모든 시도를 최종 품질로 생성",
+    "draft": "빠른 초안 품질로만 생성 (탐색용)",
+    "draft_then_final": "초안으로 검증한 뒤 통과한 컷만 최종 품질로 다시 생성",
+}
+
+
+@dataclass(frozen=True)
+class ImagePolicy:
+    model: str
+    size: str
+    quality: str
+
+
+def resolve_image_policy(purpose: str = "final", aspect_ratio: str = "1:1") -> ImagePolicy:
+    """
+    용도에 맞는 이미지 크기와 품질 결정
+
+    Args:
+        purpose (str): "draft"(미리보기), "retry"(재시도 후보), "final"(최종)
+        aspect_ratio (str): 이미지 비율 ("1:1", "16:9", "9:16")
+
+    Returns:
+        ImagePolicy: 모델, 크기, 품질
+    """
+    size = ASPECT_RATIO_SIZES.get(aspect_ratio, "1024x1024")
+    if purpose in ("draft", "retry"):
+        # 초안도 요청한 비율을 유지해야 구도가 최종본과 같고 "draft" 모드 결과를 그대로 쓸 수 있으므로
+        # 크기는 유지하고 표준 품질로만 지연/비용을 줄임
+        return ImagePolicy("dall-e-3", size, "standard")
+    return ImagePolicy("dall-e-3", size, "hd")
+
+
+def attempt_purpose(mode: str, attempt: int = 0) -> str:
+    """생성 모드와 시도 순번으로 이번 호출의 용도 결정"""
+    if mode == "final":
+        return "final"
+    if mode == "draft":
+        return "draft"
+    return "draft" if attempt == 0 else "retry"
+
+
+def _compose_prompt(prompt, style=None, negative_prompt=None):
+    """스타일과 부정적 프롬프트를 본문 프롬프트에 결합"""
+    full_prompt = prompt
+    if style:
+        full_prompt += f"\nStyle: {style}"
+    if negative_prompt:
+        full_prompt += f"\nNegative prompt: {negative_prompt}"
+    return full_prompt
+
+
+def generate_image(prompt, style, negative_prompt, purpose="final", aspect_ratio="1:1"):
     """DALL-E를 이용하여 이미지 생성"""
     try:
+        governor = current_governor()
+        policy = resolve_image_policy(purpose, aspect_ratio)
+        quality, _ = governor.plan_image(policy.quality)
+
         # OpenAI 이미지 생성 요청
-        response = client.images.generate(
-            model="dall-e-3",
-            prompt=prompt,
-            size="1024x1024",
-            quality="hd",
-            n=1
-        )
+        with span("dalle.generate", size=policy.size, quality=quality, purpose=purpose):
+            response = client.images.generate(
+                model=policy.model,
+                prompt=_compose_prompt(prompt, style, negative_prompt),
+                size=policy.size,
+                quality=quality,
+                n=1
+            )
+        governor.record_image(policy.model, policy.size, quality)
         
         # URL 반환
         return response.data[0].url
@@ -32,7 +100,8 @@ def generate_image(prompt, style, negative_prompt):
 def save_image(image_url, filename):
     """이미지를 URL에서 다운로드하여 로컬에 저장"""
     try:
-        response = requests.get(image_url)
+        with span("download.image"):
+            response = requests.get(image_url)
         if response.status_code == 200:
             image_path = os.path.join("generated_images", filename)
             os.makedirs("generated_images", exist_ok=True)
@@ -44,7 +113,8 @@ def save_image(image_url, filename):
         print(f"이미지 저장 중 오류 발생: {str(e)}")
         return None
     
-def generate_image_from_text(prompt, style="minimalist", aspect_ratio="1:1", negative_prompt=None, retries=2):
+def generate_image_from_text(prompt, style="minimalist", aspect_ratio="1:1", negative_prompt=None, retries=2,
+                             purpose="final", use_cache=True):
     """
      DALL-E API를 통해 이미지를 생성합니다.
     
@@ -54,33 +124,49 @@ def generate_image_from_text(prompt, style="minimalist", aspect_ratio="1:1", neg
         aspect_ratio (str): 이미지 비율 ("1:1", "16:9", "9:16")
         negative_prompt (str): 부정적 프롬프트
         retries (int): 재시도 횟수
+        purpose (str): 생성 용도 ("draft", "retry", "final") - 크기와 품질 결정
+        use_cache (bool): 같은 프롬프트로 만든 이미지를 캐시에서 재사용할지 여부
         
     Returns:
-        tuple: (image_url, revised_prompt, created_seed)
+        tuple: (image_url, revised_prompt, created_seed) - 캐시 적중 시 image_url은 로컬 블롭 경로
     """
-    size = "1024x1024" if aspect_ratio == "1:1" else "1792x1024" if aspect_ratio == "16:9" else "1024x1792"
+    policy = resolve_image_policy(purpose, aspect_ratio)
     
-    # 최종 프롬프트 구성
-    full_prompt = prompt  # construct_webtoon_prompt에서 이미 스타일 정보가 포함됨
-    if negative_prompt:
-        full_prompt += f"\nNegative prompt: {negative_prompt}"
+    # 최종 프롬프트 구성 (construct_webtoon_prompt에서 이미 스타일 정보가 포함됨)
+    full_prompt = _compose_prompt(prompt, negative_prompt=negative_prompt)
     
     logging.info(f"최종 프롬프트:\n{full_prompt}")  # 디버깅용
     
+    # 캐시 적중은 비용이 없으므로 예산 확인보다 먼저 조회
+    cache = get_prompt_cache() if use_cache else None
+    if cache is not None:
+        cached = cache.lookup(full_prompt, policy.size, policy.quality)
+        if cached:
+            logging.info("이미지 캐시 적중")
+            return cached['blob_path'], cached['revised_prompt'] or full_prompt, None
+
+    # 예산 상황에 따라 품질과 재시도 횟수 조정
+    governor = current_governor()
+    quality, retries = governor.plan_image(policy.quality, retries)
+
     # 이 부분이 retry
-    for _ in range(retries):
+    for attempt in range(retries):
         try:
-            response = client.images.generate(
-                model="dall-e-3",
-                prompt=full_prompt,
-                size=size,
-                n=1,
-                quality="hd"
-            )
+            with span("dalle.generate", size=policy.size, quality=quality, purpose=purpose, attempt=attempt):
+                response = client.images.generate(
+                    model=policy.model,
+                    prompt=full_prompt,
+                    size=policy.size,
+                    n=1,
+                    quality=quality
+                )
+            governor.record_image(policy.model, policy.size, quality)
             
             image_url = response.data[0].url
             revised_prompt = getattr(response.data[0], 'revised_prompt', full_prompt)
             created_seed = getattr(response, 'created', None)
+            if cache is not None:
+                cache.store_from_source_async(full_prompt, policy.size, quality, image_url, revised_prompt)
             return image_url, revised_prompt, created_seed
             
         except Exception as e:
@@ -88,6 +174,21 @@ def generate_image_from_text(prompt, style="minimalist", aspect_ratio="1:1", neg
             continue
     return None, None, None
 
+def upscale_to_final(draft_revised_prompt, aspect_ratio="1:1", negative_prompt=None):
+    """
+    검증을 통과한 초안의 수정된 프롬프트로 최종 품질 이미지를 다시 생성
+
+    Returns:
+        tuple: (image_url, revised_prompt, created_seed), 실패 시 (None, None, None)
+    """
+    return generate_image_from_text(
+        prompt=draft_revised_prompt,
+        aspect_ratio=aspect_ratio,
+        negative_prompt=negative_prompt,
+        retries=1,
+        purpose="final"
+    )
+
 # 이미지 다운로드 및 표시 함수
 def download_and_display_image(image_url, filename=None):
     """
@@ -95,7 +196,8 @@ def download_and_display_image(image_url, filename=None):
     """
     try:
         logging.info(f"이미지 다운로드 시작: {image_url}")
-        response = requests.get(image_url)
+        with span("download.image"):
+            response = requests.get(image_url)
         if response.status_code == 200:
             # 바이트 스트림으로부터 이미지 생성
             image = Image.open(io.BytesIO(response.content))
@@ -0,0 +1,269 @@
+import os
+import logging
+import threading
+import contextvars
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+import requests
+from PIL import Image
+from requests.adapters import HTTPAdapter
+
+from tracing import span
+from shared_cache import digest_key, get_shared_cache
+
+DEFAULT_TIMEOUT = 30  # 초
+DEFAULT_DOWNLOAD_WORKERS = 4
+
+_http_session = None
+_http_session_lock = threading.Lock()
+
+
+def get_http_session() -> requests.Session:
+    """커넥션 풀을 공유하는 프로세스 단위 HTTP 세션 반환"""
+    global _http_session
+    if _http_session is None:
+        with _http_session_lock:
+            if _http_session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=8, pool_maxsize=16)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                _http_session = session
+    return _http_session
+
+
+def fetch_image_bytes(source: str, timeout: float = DEFAULT_TIMEOUT) -> bytes:
+    """
+    이미지 원본 바이트를 가져오는 함수 (URL 또는 로컬 경로)
+
+    Args:
+        source (str): 이미지 URL 또는 로컬 파일 경로
+        timeout (float): 네트워크 요청 제한 시간
+
+    Returns:
+        bytes: 디코딩하지 않은 원본 이미지 바이트
+    """
+    if os.path.exists(source):
+        with open(source, 'rb') as f:
+            return f.read()
+
+    # 같은 URL은 다른 앱 프로세스가 이미 받아둔 바이트를 재사용
+    cache = get_shared_cache()
+    key = digest_key(source)
+    cached = cache.get("image", key)
+    if cached is not None:
+        return cached
+
+    with span("download.image") as current:
+        response = get_http_session().get(source, timeout=timeout)
+        response.raise_for_status()
+        current.set_attribute("bytes", len(response.content))
+    cache.set("image", key, response.content)
+    return response.content
+
+
+def fetch_many(sources: Dict, max_workers: int = DEFAULT_DOWNLOAD_WORKERS) -> Dict:
+    """
+    여러 이미지를 동시에 다운로드
+
+    Args:
+        sources (dict): {키: 이미지 URL 또는 경로}
+        max_workers (int): 동시 다운로드 수
+
+    Returns:
+        dict: {키: 원본 바이트}, 실패한 항목은 제외
+    """
+    if not sources:
+        return {}
+
+    results = {}
+    workers = max(1, min(max_workers, len(sources)))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        # 작업 스레드에서도 현재 트레이스에 스팬이 연결되도록 컨텍스트 복사
+        futures = {
+            key: executor.submit(contextvars.copy_context().run, fetch_image_bytes, source)
+            for key, source in sources.items()
+        }
+        for key, future in futures.items():
+            try:
+                results[key] = future.result()
+            except Exception as e:
+                logging.error(f"이미지 {key} 다운로드 실패: {str(e)}")
+    return results
+
+
+def detect_image_extension(data: bytes) -> Optional[str]:
+    """매직 바이트로 이미지 확장자 판별"""
+    if data.startswith(b'\x89PNG\r\n\x1a\n'):
+        return "png"
+    if data.startswith(b'\xff\xd8\xff'):
+        return "jpg"
+    if data[:4] == b'RIFF' and data[8:12] == b'WEBP':
+        return "webp"
+    if data[:6] in (b'GIF87a', b'GIF89a'):
+        return "gif"
+    return None
+
+
+# CLIP 이미지 전처리 기본값 (openai/clip-vit-base-patch32)
+CLIP_IMAGE_SIZE = 224
+CLIP_MEAN = (0.48145466, 0.4578275, 0.40821073)
+CLIP_STD = (0.26862954, 0.26130258, 0.27577711)
+
+
+class DecodedImage:
+    """
+    한 번 디코딩한 이미지를 uint8 RGB 배열 하나로 보관하고 용도별 뷰를 제공하는 객체
+
+    - array: (H, W, 3) uint8 RGB 배열 (모든 뷰의 원본)
+    - bgr(), gray(): OpenCV 메트릭용 뷰 (gray는 처음 요청 시 한 번만 계산)
+    - clip_tensor(): 리사이즈/크롭/정규화를 torch 연산 한 번에 처리한 CLIP 입력
+    - data / save(): 재인코딩 없이 원본 바이트 저장
+    - key: 임베딩 캐시용 내용 식별자 (잘라낸 이미지는 원본 식별자와 영역으로 만들어 인코딩하지 않음)
+    """
+
+    def __init__(self, data: Optional[bytes], array: np.ndarray, source_size, key: Optional[str] = None):
+        self._data = data
+        self.array = array
+        self.source_size = source_size  # 축소 디코딩 전 원본 (너비, 높이)
+        self._key = key
+        self._gray = None
+
+    @property
+    def data(self) -> bytes:
+        """인코딩된 바이트 (잘라낸 이미지는 원격 워커 전송 등 실제로 필요할 때 처음 한 번만 PNG 인코딩)"""
+        if self._data is None:
+            buffer = BytesIO()
+            Image.fromarray(self.array).save(buffer, format="PNG")
+            self._data = buffer.getvalue()
+        return self._data
+
+    @property
+    def key(self) -> str:
+        if self._key is None:
+            self._key = digest_key(self.data)
+        return self._key
+
+    @classmethod
+    def from_bytes(cls, data: bytes, min_side: Optional[int] = None) -> "DecodedImage":
+        """
+        원본 바이트 디코딩
+
+        Args:
+            data (bytes): 인코딩된 이미지 바이트
+            min_side (int): 지정 시 짧은 변이 이 크기 이상으로 유지되는 범위에서 축소 디코딩
+                (JPEG은 draft 모드, 그 외 형식은 정수배 reduce)
+        """
+        image = Image.open(BytesIO(data))
+        source_size = image.size
+        if min_side:
+            scale = min(image.size) / min_side
+            if scale >= 2:
+                target = (int(image.size[0] / scale), int(image.size[1] / scale))
+                image.draft("RGB", target)  # JPEG이면 DCT 단계에서 축소
+        image = image.convert("RGB")
+        if min_side and min(image.size) >= 2 * min_side:
+            image = image.reduce(min(image.size) // min_side)
+        return cls(data, np.asarray(image), source_size)
+
+    @property
+    def size(self):
+        """현재 배열 크기 (너비, 높이)"""
+        return self.array.shape[1], self.array.shape[0]
+
+    def pil(self) -> Image.Image:
+        return Image.fromarray(self.array)
+
+    def bgr(self) -> np.ndarray:
+        """OpenCV용 BGR 뷰 (채널 순서만 바꾼 뷰, 복사 없음)"""
+        return self.array[..., ::-1]
+
+    def gray(self) -> np.ndarray:
+        if self._gray is None:
+            import cv2
+            self._gray = cv2.cvtColor(self.array, cv2.COLOR_RGB2GRAY)
+        return self._gray
+
+    def crop(self, box) -> "DecodedImage":
+        """
+        (left, top, right, bottom) 영역을 새 이미지로 잘라냄
+
+        잘라낸 이미지의 key는 원본 key, 현재 배열 크기, 영역으로 만들므로 인코딩 없이 임베딩 캐시를 조회할 수 있습니다.
+        """
+        left, top, right, bottom = box
+        array = np.ascontiguousarray(self.array[top:bottom, left:right])
+        return DecodedImage(None, array, (right - left, bottom - top), key=digest_key(self.key, self.size, box))
+
+    def clip_tensor(self, size: int = CLIP_IMAGE_SIZE, mean: Sequence[float] = CLIP_MEAN,
+                    std: Sequence[float] = CLIP_STD, device: str = "cpu"):
+        """
+        CLIPProcessor와 같은 전처리(짧은 변 리사이즈 -> 중앙 크롭 -> 정규화)를 torch로 한 번에 수행
+
+        Returns:
+            torch.Tensor: (3, size, size) float32
+        """
+        import torch
+        import torch.nn.functional as F
+
+        # uint8 배열을 복사 없이 텐서로 감싼 뒤 한 번만 float 변환
+        tensor = torch.from_numpy(self.array).to(device).permute(2, 0, 1).unsqueeze(0).float()
+        height, width = tensor.shape[-2:]
+        scale = size / min(height, width)
+        resized = (max(size, round(height * scale)), max(size, round(width * scale)))
+        tensor = F.interpolate(tensor, size=resized, mode="bicubic", align_corners=False, antialias=True)
+
+        top = (resized[0] - size) // 2
+        left = (resized[1] - size) // 2
+        tensor = tensor[0, :, top:top + size, left:left + size]
+
+        mean_t = torch.tensor(mean, device=device).view(3, 1, 1) * 255
+        std_t = torch.tensor(std, device=device).view(3, 1, 1) * 255
+        return tensor.sub_(mean_t).div_(std_t).contiguous()
+
+    def save(self, path: str):
+        """원본 바이트를 그대로 저장 (재인코딩 없음)"""
+        with open(path, 'wb') as f:
+            f.write(self.data)
+
+
+_decoded_cache: "OrderedDict[tuple, DecodedImage]" = OrderedDict()
+_decoded_cache_lock = threading.Lock()
+DECODED_CACHE_SIZE = 8
+
+
+def _cached_decoded(source: str, min_side: Optional[int]) -> Optional[DecodedImage]:
+    """요청 해상도 이상으로 디코딩된 같은 원본의 캐시 항목 (_decoded_cache_lock 안에서 호출)"""
+    for (cached_source, cached_side), decoded in reversed(_decoded_cache.items()):
+        if cached_source != source:
+            continue
+        if cached_side == min_side or cached_side is None or (min_side and cached_side >= min_side):
+            _decoded_cache.move_to_end((cached_source, cached_side))
+            return decoded
+    return None
+
+
+def load_decoded(source: str, min_side: Optional[int] = None) -> DecodedImage:
+    """
+    이미지를 가져와 디코딩 (최근 디코딩 결과는 재사용)
+
+    같은 원본을 요청 해상도 이상으로 이미 디코딩했다면 그 결과를 그대로 사용합니다
+    (예: 캐릭터 뱅크의 2배 해상도 디코딩을 CLIP 검증이 재사용).
+    더 큰 해상도가 필요하면 다시 디코딩하되, 원본 바이트는 캐시된 항목의 것을 사용해 다시 받지 않습니다.
+    """
+    with _decoded_cache_lock:
+        decoded = _cached_decoded(source, min_side)
+        if decoded is not None:
+            return decoded
+        data = next((entry.data for (cached_source, _), entry in _decoded_cache.items() if cached_source == source), None)
+
+    with span("decode.image", reduced=bool(min_side)):
+        decoded = DecodedImage.from_bytes(data if data is not None else fetch_image_bytes(source), min_side)
+    with _decoded_cache_lock:
+        _decoded_cache[(source, min_side)] = decoded
+        while len(_decoded_cache) > DECODED_CACHE_SIZE:
+            _decoded_cache.popitem(last=False)
+    return decoded
@@ -0,0 +1,176 @@
+import os
+import json
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from episode_model import Episode, stable_hash
+from image_io import fetch_image_bytes
+from save_utils import store_blob, write_json_atomic
+
+JOB_DIR_NAME = "jobs"
+COMPLETE_JOB_RETENTION_DAYS = int(os.getenv("WEBTOONIZER_JOB_RETENTION_DAYS", "7"))  # 저장되지 않은 완료 작업 보관 기간
+
+
+class JobStore:
+    """
+    생성 중인 에피소드를 세션 저장소(saved_sessions/jobs)에 체크포인트로 남기는 저장소
+
+    장면 분할, 설명, 이미지(원본 URL과 블롭으로 보관한 바이트), 점수 등 단계 결과가 나올 때마다 기록하므로
+    실패나 세션 종료 후 같은 작업을 다시 실행하면 마지막으로 완료된 단계부터 이어서 계산합니다.
+    작업은 원문과 컷 수의 해시(Episode.source_hash)로 식별됩니다.
+    """
+
+    def __init__(self, save_dir: str = "saved_sessions"):
+        self.save_dir = save_dir
+        self.job_dir = os.path.join(save_dir, JOB_DIR_NAME)
+        self._lock = threading.Lock()
+        self._images: Dict[str, Dict[int, Dict]] = {}
+
+    def _path(self, source_hash: str) -> str:
+        return os.path.join(self.job_dir, f"{source_hash}.json")
+
+    def _is_stored(self, path: str) -> bool:
+        """세션 저장소(save_dir) 안에 이미 있는 로컬 파일인지 여부"""
+        if not os.path.exists(path):
+            return False
+        root = os.path.realpath(self.save_dir)
+        return os.path.commonpath([root, os.path.realpath(path)]) == root
+
+    def persist_image(self, source_hash: str, index: int, source: Optional[str]) -> Optional[str]:
+        """
+        생성된 이미지 바이트를 세션 저장소 블롭으로 보관 (DALL-E URL이 만료된 뒤에도 재개 가능)
+
+        이미지 캐시 블롭처럼 세션 저장소 밖의 로컬 파일도 복사합니다 (캐시 정리로 삭제될 수 있으므로).
+
+        Returns:
+            str: 블롭 경로 (보관에 실패하거나 이미 세션 저장소 안의 파일이면 원래 값)
+        """
+        if not source or self._is_stored(source):
+            return source
+        try:
+            blob_path, digest = store_blob(fetch_image_bytes(source), self.save_dir)
+        except Exception as e:
+            logging.warning(f"컷 {index + 1} 이미지 보관 실패, URL 그대로 사용: {str(e)}")
+            return source
+        with self._lock:
+            self._images.setdefault(source_hash, {})[index] = {"url": source, "blob": blob_path, "sha256": digest}
+        return blob_path
+
+    def save(self, episode: Episode, config: Dict):
+        """에피소드의 현재 상태를 원자적으로 기록 (실패해도 생성은 계속 진행)"""
+        try:
+            with self._lock:
+                # 여러 컷 스레드가 동시에 저장하므로 스냅샷도 잠금 안에서 만들어 최신 상태가 나중에 기록되도록 함
+                completed = episode.completed_count()
+                data = {
+                    "source_hash": episode.source_hash,
+                    "updated_at": datetime.now().isoformat(),
+                    "status": "complete" if episode.cuts and completed == len(episode.cuts) else "in_progress",
+                    "completed_cuts": completed,
+                    "total_cuts": len(episode.cuts),
+                    "config": config,
+                    "episode": episode.to_dict(),
+                    "images": {
+                        str(index): image for index, image in self._images.get(episode.source_hash, {}).items()
+                    },
+                }
+                os.makedirs(self.job_dir, exist_ok=True)
+                write_json_atomic(self._path(episode.source_hash), data)
+        except OSError as e:
+            logging.warning(f"작업 체크포인트 저장 실패: {str(e)}")
+
+    def _read(self, source_hash: str) -> Optional[Dict]:
+        path = self._path(source_hash)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            logging.warning(f"작업 체크포인트 읽기 실패 ({path}): {str(e)}")
+            return None
+
+    def load_job(self, source_hash: str) -> Optional[Tuple[Episode, Dict]]:
+        """체크포인트를 (에피소드, 저장 당시 설정)으로 복원"""
+        data = self._read(source_hash)
+        if data is None:
+            return None
+        try:
+            episode = Episode.from_dict(data["episode"])
+        except (KeyError, TypeError) as e:
+            logging.warning(f"작업 체크포인트 형식 오류 ({source_hash}): {str(e)}")
+            return None
+        with self._lock:
+            self._images[source_hash] = {int(index): image for index, image in data.get("images", {}).items()}
+        logging.info(f"작업 체크포인트 복원: {source_hash} (완료된 컷 {episode.completed_count()}/{len(episode.cuts)})")
+        return episode, data.get("config", {})
+
+    def load(self, text: str, cut_count: int) -> Optional[Episode]:
+        """같은 원문/컷 수의 체크포인트가 있으면 에피소드로 복원"""
+        job = self.load_job(stable_hash(text, cut_count))
+        if job is None or not job[0].matches(text, cut_count):
+            return None
+        return job[0]
+
+    def list_jobs(self, include_complete: bool = False, limit: int = 10) -> List[Dict]:
+        """
+        최근 체크포인트 목록 (최근 수정 순)
+
+        Returns:
+            list: source_hash, title, updated_at, status, completed_cuts, total_cuts를 담은 딕셔너리 리스트
+        """
+        if not os.path.isdir(self.job_dir):
+            return []
+        paths = [
+            os.path.join(self.job_dir, name) for name in os.listdir(self.job_dir) if name.endswith(".json")
+        ]
+        paths.sort(key=os.path.getmtime, reverse=True)
+
+        jobs = []
+        cutoff = (datetime.now() - timedelta(days=COMPLETE_JOB_RETENTION_DAYS)).isoformat()
+        for path in paths:
+            data = self._read(os.path.basename(path)[:-len(".json")])
+            if data is None:
+                continue
+            if data.get("status") == "complete":
+                if data.get("updated_at", "") < cutoff:
+                    # 세션으로 저장되지 않은 채 오래된 완료 작업은 재개할 일이 없으므로 정리
+                    self.discard(data.get("source_hash") or os.path.basename(path)[:-len(".json")])
+                    continue
+                if not include_complete:
+                    continue
+            jobs.append({
+                "source_hash": data.get("source_hash"),
+                "title": data.get("episode", {}).get("text", "")[:50],
+                "updated_at": data.get("updated_at", ""),
+                "status": data.get("status", "in_progress"),
+                "completed_cuts": data.get("completed_cuts", 0),
+                "total_cuts": data.get("total_cuts", 0),
+            })
+            if len(jobs) >= limit:
+                break
+        return jobs
+
+    def discard(self, source_hash: str):
+        """작업 체크포인트 삭제 (블롭은 저장된 세션과 공유하므로 남겨둠)"""
+        path = self._path(source_hash)
+        if os.path.exists(path):
+            os.remove(path)
+        with self._lock:
+            self._images.pop(source_hash, None)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_job_store() -> JobStore:
+    """프로세스 공용 작업 체크포인트 저장소"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = JobStore()
+    return _store
@@ -1,13 +1,11 @@
 import logging
-from PIL import Image
 import numpy as np
-from io import BytesIO
-import requests
 from datetime import datetime
 from dataclasses import dataclass
 from typing import Dict, List, Optional
 import streamlit as st
 import cv2
+from image_io import load_decoded
 
 @dataclass
 class GenerationMetrics:
@@ -57,16 +55,10 @@ class MetricsAnalyzer:
     def calculate_image_metrics(self, image_url: str) -> ImageQualityMetrics:
         """이미지 품질 관련 메트릭 계산"""
         try:
-            # 이미지 다운로드
-            response = requests.get(image_url)
-            image = Image.open(BytesIO(response.content))
-            img_array = np.array(image)
-            
-            # OpenCV로 변환
-            if len(img_array.shape) == 3:
-                img_gray = cv2.cvtColor(img_array, cv2.COLOR_RGB2GRAY)
-            else:
-                img_gray = img_array
+            # 이미지 다운로드 및 디코딩 (같은 이미지는 한 번만 디코딩)
+            decoded = load_decoded(image_url)
+            img_array = decoded.array
+            img_gray = decoded.gray()
 
             # 선명도 계산
             laplacian_var = cv2.Laplacian(img_gray, cv2.CV_64F).var()
@@ -75,12 +67,10 @@ class MetricsAnalyzer:
             # 대비 계산
             contrast = img_gray.std() / 128  # 정규화
 
-            # 색상 다양성 계산
-            if len(img_array.shape) == 3:
-                unique_colors = len(np.unique(img_array.reshape(-1, img_array.shape[-1]), axis=0))
-                color_diversity = min(unique_colors / 1000, 1.0)  # 정규화
-            else:
-                color_diversity = 0.0
+            # 색상 다양성 계산 (RGB를 24비트 정수 하나로 묶어 고유값 계산)
+            packed = (img_array[..., 0].astype(np.uint32) << 16) | (img_array[..., 1].astype(np.uint32) << 8) | img_array[..., 2]
+            unique_colors = len(np.unique(packed))
+            color_diversity = min(unique_colors / 1000, 1.0)  # 정규화
 
             # 구도 균형 계산 (중심점 기준)
             height, width = img_gray.shape
@@ -135,11 +125,9 @@ class MetricsAnalyzer:
             # 캐릭터 일관성 (이미지 간 특징점 매칭으로 대체)
             character_scores = []
             for i in range(len(scene_sequence) - 1):
-                response_current = requests.get(scene_sequence[i])
-                response_next = requests.get(scene_sequence[i + 1])
-                
-                img_current = cv2.imdecode(np.frombuffer(response_current.content, np.uint8), 1)
-                img_next = cv2.imdecode(np.frombuffer(response_next.content, np.uint8), 1)
+                # 스타일 계산에서 디코딩한 이미지를 재사용 (SIFT는 그레이스케일 입력 사용)
+                img_current = load_decoded(scene_sequence[i]).gray()
+                img_next = load_decoded(scene_sequence[i + 1]).gray()
 
                 # SIFT 특징점 검출
                 sift = cv2.SIFT_create()
@@ -0,0 +1,111 @@
+import os
+import time
+import queue
+import logging
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, List, Optional, Sequence
+
+from tracing import span, increment
+
+RESULT_TIMEOUT = float(os.getenv("WEBTOONIZER_MICRO_BATCH_TIMEOUT", "120"))  # 초, 배치 결과 대기 상한
+_CLOSE = object()  # 배치 스레드 종료 신호
+
+
+class MicroBatcher:
+    """
+    동시에 들어온 단건 요청을 모아 한 번의 배치 호출로 처리하는 스케줄러
+
+    첫 요청이 도착한 뒤 최대 max_wait_ms 동안 또는 max_batch_size개가 찰 때까지 요청을 모아
+    run_batch(items)를 한 번 호출하고, 결과를 요청 순서대로 각 Future에 돌려줍니다.
+    """
+
+    def __init__(self, run_batch: Callable[[List[Any]], Sequence[Any]], max_batch_size: int = 16,
+                 max_wait_ms: float = 5.0, name: str = "micro-batcher", timeout: float = RESULT_TIMEOUT):
+        self.run_batch = run_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.name = name
+        self.timeout = timeout
+        self._queue: "queue.Queue" = queue.Queue()
+        self._closed = False
+        self._thread = threading.Thread(target=self._loop, daemon=True, name=name)
+        self._thread.start()
+
+    def submit(self, item) -> Future:
+        """요청 하나를 대기열에 넣고 결과를 받을 Future 반환"""
+        if self._closed:
+            raise RuntimeError(f"{self.name}: 이미 종료된 배치 스케줄러")
+        future = Future()
+        self._queue.put((item, future))
+        return future
+
+    def map(self, items: List, timeout: Optional[float] = None) -> List:
+        """
+        여러 요청을 넣고 모든 결과를 기다림 (다른 호출자의 요청과 함께 배치될 수 있음)
+
+        timeout(기본 self.timeout) 안에 결과가 오지 않으면 concurrent.futures.TimeoutError
+        """
+        futures = [self.submit(item) for item in items]
+        deadline = time.monotonic() + (self.timeout if timeout is None else timeout)
+        return [future.result(timeout=max(0.0, deadline - time.monotonic())) for future in futures]
+
+    def close(self, timeout: Optional[float] = None):
+        """대기 중인 요청까지 처리한 뒤 배치 스레드 종료"""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_CLOSE)
+        self._thread.join(timeout)
+
+    def _collect(self) -> List:
+        """한 배치 분량의 요청 수집 (종료 신호를 만나면 마지막 원소로 _CLOSE 포함)"""
+        batch = [self._queue.get()]
+        if batch[0] is _CLOSE:
+            return batch
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                entry = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            batch.append(entry)
+            if entry is _CLOSE:
+                break
+        return batch
+
+    def _run(self, batch: List):
+        items = [item for item, _ in batch]
+        try:
+            with span(f"{self.name}.batch", size=len(items)):
+                results = list(self.run_batch(items))
+            if len(results) != len(batch):
+                raise RuntimeError(f"배치 결과 수 불일치 (요청 {len(batch)}건, 결과 {len(results)}건)")
+            increment("micro_batches", 1, batcher=self.name)
+            increment("micro_batch_items", len(items), batcher=self.name)
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+        except Exception as e:
+            logging.error(f"배치 처리 실패 ({self.name}, {len(items)}건): {str(e)}")
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+
+    def _loop(self):
+        while True:
+            batch = self._collect()
+            closing = batch[-1] is _CLOSE
+            if closing:
+                batch.pop()
+            if batch:
+                try:
+                    self._run(batch)
+                except Exception as e:
+                    # 예외 처리 중 오류가 나도 배치 스레드는 계속 동작해야 함
+                    logging.error(f"배치 스레드 오류 ({self.name}): {str(e)}")
+            if closing:
+                return
@@ -0,0 +1,221 @@
+"""
+네이버 뉴스 검색/기사 본문 수집 모듈
+
+연결 풀을 재사용하는 aiohttp 세션 하나로 검색 결과 기사들을 동시에 가져오며,
+검색 응답과 추출된 본문은 TTL 캐시에 보관합니다.
+
+로컬 테스트용 픽스처 서버:
+    python news_ingest.py --serve news_fixtures --port 8765
+    WEBTOONIZER_NAVER_SEARCH_URL=http://127.0.0.1:8765/v1/search/news.json streamlit run webapp.py
+"""
+import os
+import asyncio
+import logging
+import argparse
+import threading
+from concurrent.futures import Future
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+import aiohttp
+from cachetools import TTLCache
+
+from tracing import span
+from article_extract import extract_article_text
+
+NAVER_SEARCH_URL = os.getenv("WEBTOONIZER_NAVER_SEARCH_URL", "https://openapi.naver.com/v1/search/news.json")
+MAX_CONCURRENCY = int(os.getenv("WEBTOONIZER_NEWS_CONCURRENCY", "4"))
+REQUEST_TIMEOUT = float(os.getenv("WEBTOONIZER_NEWS_TIMEOUT", "10"))
+SEARCH_TTL = 300  # 검색 결과는 자주 바뀌므로 5분
+ARTICLE_TTL = 3600
+
+USER_AGENT = ('Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 '
+              '(KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36')
+
+
+class NewsIngestor:
+    """
+    뉴스 검색과 기사 본문 수집기
+
+    전용 이벤트 루프 스레드에서 동작하므로 Streamlit 스크립트 스레드에서는
+    동기 메서드(search, extract, extract_many)를 그대로 호출하면 됩니다.
+    """
+
+    def __init__(self, search_url: str = NAVER_SEARCH_URL, max_concurrency: int = MAX_CONCURRENCY,
+                 timeout: float = REQUEST_TIMEOUT):
+        self.search_url = search_url
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self._search_cache = TTLCache(maxsize=256, ttl=SEARCH_TTL)
+        self._article_cache = TTLCache(maxsize=1024, ttl=ARTICLE_TTL)
+        self._inflight: Dict[str, asyncio.Future] = {}  # 같은 기사를 동시에 두 번 받지 않도록 공유
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, daemon=True, name="news-ingest")
+        self._thread.start()
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    def _submit(self, coro) -> Future:
+        return asyncio.run_coroutine_threadsafe(coro, self._loop)
+
+    async def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.max_concurrency * 2, limit_per_host=self.max_concurrency,
+                                             ttl_dns_cache=300)
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                headers={'User-Agent': USER_AGENT}
+            )
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._session
+
+    async def search_async(self, query: str, sort: str = 'sim', client_id: Optional[str] = None,
+                           client_secret: Optional[str] = None, display: int = 10) -> Optional[Dict]:
+        """네이버 뉴스 검색 API 호출 (실패 시 None)"""
+        key = (query, sort, display)
+        if key in self._search_cache:
+            return self._search_cache[key]
+
+        session = await self._get_session()
+        headers = {"X-Naver-Client-Id": client_id or "", "X-Naver-Client-Secret": client_secret or ""}
+        params = {"query": query, "sort": sort, "display": display}
+        try:
+            with span("news.search"):
+                async with self._semaphore:
+                    async with session.get(self.search_url, headers=headers, params=params) as response:
+                        if response.status != 200:
+                            logging.error(f"뉴스 검색 실패: HTTP {response.status}")
+                            return None
+                        result = await response.json(content_type=None)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logging.error(f"뉴스 검색 실패: {str(e)}")
+            return None
+
+        self._search_cache[key] = result
+        return result
+
+    async def _fetch_article(self, url: str) -> Optional[str]:
+        session = await self._get_session()
+        try:
+            with span("news.fetch_article"):
+                async with self._semaphore:
+                    async with session.get(url) as response:
+                        response.raise_for_status()
+                        html = await response.text(errors='replace')
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logging.error(f"기사 다운로드 실패 ({url}): {str(e)}")
+            return None
+
+        # HTML 파싱은 CPU 작업이므로 이벤트 루프 밖에서 실행
+        with span("news.extract"):
+            content = await self._loop.run_in_executor(None, extract_article_text, html)
+        if content:
+            logging.info(f"Successfully extracted content (length: {len(content)})")
+            self._article_cache[url] = content
+        else:
+            logging.warning(f"No article content found in any known sections: {url}")
+        return content
+
+    async def extract_async(self, url: str) -> Optional[str]:
+        """기사 본문 추출 (캐시 또는 진행 중인 요청이 있으면 재사용)"""
+        if url in self._article_cache:
+            return self._article_cache[url]
+        if url not in self._inflight:
+            task = asyncio.ensure_future(self._fetch_article(url))
+            self._inflight[url] = task
+            task.add_done_callback(lambda _: self._inflight.pop(url, None))
+        return await asyncio.shield(self._inflight[url])
+
+    async def extract_many_async(self, urls: List[str]) -> Dict[str, Optional[str]]:
+        """여러 기사 본문을 동시 실행 수 제한 안에서 함께 추출"""
+        unique_urls = list(dict.fromkeys(urls))
+        contents = await asyncio.gather(*(self.extract_async(url) for url in unique_urls))
+        return dict(zip(unique_urls, contents))
+
+    def search(self, query: str, sort: str = 'sim', client_id: Optional[str] = None,
+               client_secret: Optional[str] = None, display: int = 10) -> Optional[Dict]:
+        return self._submit(self.search_async(query, sort, client_id, client_secret, display)).result()
+
+    def extract(self, url: str) -> Optional[str]:
+        return self._submit(self.extract_async(url)).result()
+
+    def extract_many(self, urls: List[str]) -> Dict[str, Optional[str]]:
+        return self._submit(self.extract_many_async(urls)).result()
+
+    def prefetch(self, urls: List[str]):
+        """검색 결과 기사들을 백그라운드에서 미리 가져와 캐시에 저장 (기다리지 않음)"""
+        self._submit(self.extract_many_async(urls))
+
+    def close(self):
+        async def _close():
+            if self._session is not None and not self._session.closed:
+                await self._session.close()
+        self._submit(_close()).result(timeout=5)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+
+
+_ingestor = None
+_ingestor_lock = threading.Lock()
+
+
+def get_news_ingestor() -> NewsIngestor:
+    """프로세스 공용 뉴스 수집기"""
+    global _ingestor
+    if _ingestor is None:
+        with _ingestor_lock:
+            if _ingestor is None:
+                _ingestor = NewsIngestor()
+    return _ingestor
+
+
+class _FixtureHandler(SimpleHTTPRequestHandler):
+    """
+    저장된 네이버 형식 HTML과 검색 응답(search.json)을 제공하는 픽스처 핸들러
+
+    search.json 안의 {base} 는 서버 주소로 치환되어 검색 결과 링크가 픽스처 기사를 가리킵니다.
+    """
+
+    def do_GET(self):
+        if self.path.split('?')[0] == "/v1/search/news.json":
+            with open(os.path.join(self.directory, "search.json"), 'r', encoding='utf-8') as f:
+                base = f"http://{self.headers.get('Host')}"
+                body = f.read().replace("{base}", base).encode('utf-8')
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+        super().do_GET()
+
+    def log_message(self, format, *args):
+        logging.debug(format % args)
+
+
+def serve_fixtures(fixture_dir: str, host: str = "127.0.0.1", port: int = 8765) -> ThreadingHTTPServer:
+    """픽스처 디렉토리를 제공하는 로컬 HTTP 서버를 백그라운드 스레드에서 시작"""
+    handler = lambda *args, **kwargs: _FixtureHandler(*args, directory=fixture_dir, **kwargs)
+    server = ThreadingHTTPServer((host, port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True, name="news-fixtures").start()
+    logging.info(f"뉴스 픽스처 서버 시작: http://{host}:{server.server_address[1]}")
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="네이버 뉴스 형식 픽스처 서버")
+    parser.add_argument("--serve", default="news_fixtures", help="픽스처 디렉토리")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    server = serve_fixtures(args.serve, args.host, args.port)
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,6 @@
+import math
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import streamlit as st
 from typing import List, Dict, Tuple, Optional
 from dataclasses import dataclass
@@ -5,11 +8,20 @@ from openai import OpenAI
 import logging
 from datetime import datetime
 from PIL import Image
-from general_text_input import TextToWebtoonConverter
+from general_text_input import (
+    CONTEXT_WINDOW_SCENES, CUT_CONCURRENCY, LONG_EPISODE_THRESHOLD, MAX_CUTS, PLAN_CHUNK_CUTS, TextToWebtoonConverter,
+    distribute_counts, split_story_chunks
+)
 from io import BytesIO
-from image_gen import generate_image_from_text
+from image_gen import GENERATION_MODES, attempt_purpose, generate_image_from_text, upscale_to_final
 from save_utils import save_session
-from clip_analyzer import CLIPAnalyzer  # CLIP 분석기 추가
+from image_derivatives import get_derivative_worker, display_source
+from generation_log import record_generation_log
+from cost_governor import activate_session_governor, governed_chat
+from captioner import NONFICTION_CAPTION_GUIDE, EpisodeCaptioner, fit_caption
+from prompt_templates import NONFICTION_NEGATIVE_PROMPT, VISUALIZATION_TYPES, get_prompt_registry
+from tracing import span, traced
+from clip_analyzer import CLIP_MODEL_NAME, get_clip_analyzer
 
 
 @dataclass
@@ -19,39 +31,19 @@ class NonFictionConfig:
     aspect_ratio: str
     num_images: int
     emphasis: str = "clarity"
+    generation_mode: str = "final"  # image_gen.GENERATION_MODES 참고
 
 class NonFictionConverter:
-    def __init__(self, openai_client: OpenAI):
+    def __init__(self, openai_client: OpenAI, clip_analyzer):
         self.client = openai_client
+        self.clip_analyzer = clip_analyzer
         self.setup_logging()
+        self.captioner = EpisodeCaptioner(openai_client, NONFICTION_CAPTION_GUIDE, max_chars=70)
         
+        self.prompts = get_prompt_registry()
         # 시각화 타입을 스토리텔링 방식으로 변경
-        self.visualization_types = {
-           "설명하기": {
-        "prompt": "simple minimalistic shapes, thin and sharp lines, clean composition, no text",
-        "layout": "minimalistic single-concept layout",
-        "elements": "sole object, no unnecessary shading or details",
-        "style": "educational minimalistic style with thin lines"
-    },
-    "비교하기": {
-        "prompt": "two-column comparison, thin outlines, minimalistic shapes, clean layout, no unnecessary details",
-        "layout": "side-by-side layout, focus on clear differences",
-        "elements": "precise shapes, no shading, no text",
-        "style": "minimalistic cartoon style with fine lines"
-    },
-    "과정 보여주기": {
-        "prompt": "step-by-step flow, clean lines, thin minimalistic shapes, cartoon-like simplicity without exaggeration",
-        "layout": "horizontal or vertical progression with arrows",
-        "elements": "single-colored shapes, no gradients, no text",
-        "style": "thin line cartoon minimalistic style"
-    },
-    "원리 설명하기": {
-        "prompt": "cause-and-effect diagram with minimalistic shapes, thin lines, plain white background, no text",
-        "layout": "input-output or cause-effect structure",
-        "elements": "clear, distinct shapes, no complex details",
-        "style": "scientific minimalistic style with cartoon simplicity"
-    }
-}
+        self.visualization_types = VISUALIZATION_TYPES
+        self.negative_elements = NONFICTION_NEGATIVE_PROMPT
 
     @staticmethod
     def setup_logging():
@@ -60,9 +52,50 @@ class NonFictionConverter:
             format='%(asctime)s - %(levelname)s - %(message)s'
         )
 
+    @traced("cut.generate_image")
+    def generate_image_with_policy(self, prompt: str, config: NonFictionConfig, style: str,
+                                   negative_prompt: str) -> Tuple[Optional[str], Optional[str]]:
+        """생성 모드에 맞는 크기/품질로 이미지 생성 (초안 후 최종 모드는 검증 통과 시에만 최종 생성)"""
+        image_url, revised_prompt, _ = generate_image_from_text(
+            prompt=prompt,
+            style=style,
+            aspect_ratio=config.aspect_ratio,
+            negative_prompt=negative_prompt,
+            purpose=attempt_purpose(config.generation_mode)
+        )
+        if not image_url or config.generation_mode != "draft_then_final":
+            return image_url, revised_prompt
+
+        check = self.clip_analyzer.validate_image(image_url, prompt, return_score=True, prescreen_prompt=revised_prompt)
+        if check.get("similarity_score", 0.0) < self.clip_analyzer.minimum_score_threshold:
+            logging.info("초안 검증 미통과 - 최종 품질 생성 생략")
+            return image_url, revised_prompt
+
+        final_url, final_revised_prompt, _ = upscale_to_final(revised_prompt, config.aspect_ratio, negative_prompt)
+        if final_url:
+            return final_url, final_revised_prompt
+        return image_url, revised_prompt
+
+    @traced("gpt.split_content_into_scenes")
     def split_content_into_scenes(self, text: str, num_scenes: int) -> List[str]:
-        """텍스트를 설명 가능한 장면들로 분할"""
+        """텍스트를 설명 가능한 장면들로 분할 (LONG_EPISODE_THRESHOLD를 넘으면 구간별로 나누어 분할)"""
+        if num_scenes <= LONG_EPISODE_THRESHOLD:
+            return self._split_chunk(text, num_scenes)
+
+        chunks = split_story_chunks(text, math.ceil(num_scenes / PLAN_CHUNK_CUTS))
+        scenes = []
+        for chunk, count in zip(chunks, distribute_counts(num_scenes, len(chunks))):
+            # 전체 텍스트 대신 직전 장면 몇 개만 문맥으로 넘겨 구간 간 흐름 유지
+            scenes.extend(self._split_chunk(chunk, count, scenes[-CONTEXT_WINDOW_SCENES:]))
+        return scenes
+
+    def _split_chunk(self, text: str, num_scenes: int, previous_scenes: Optional[List[str]] = None) -> List[str]:
+        """텍스트(또는 긴 텍스트의 한 구간)를 num_scenes개 장면으로 분할"""
         try:
+            previous = ""
+            if previous_scenes:
+                previous = "\n        직전 장면 (겹치지 않게 이어서 분리):\n        " + "\n        ".join(previous_scenes) + "\n"
+
             prompt = f"""다음 내용을 {num_scenes}개의 핵심 장면으로 분리해주세요.
         각 장면은 시각적으로 표현할 수 있어야 합니다.
 
@@ -73,6 +106,7 @@ class NonFictionConverter:
         4. 복잡한 내용은 단순한 관계로 재구성
         5. 추상적인 개념은 구체적인 비유로 변환
 
+{previous}
         현재 텍스트:
         {text}
 
@@ -82,7 +116,8 @@ class NonFictionConverter:
         - 한 장면당 1-2문장으로 간단히 기술"""
 
             
-            response = self.client.chat.completions.create(
+            response = governed_chat(
+                self.client,
                 model="gpt-4",
                 messages=[{"role": "user", "content": prompt}],
                 temperature=0.5
@@ -99,47 +134,19 @@ class NonFictionConverter:
         """장면을 웹툰 스타일의 프롬프트로 변환"""
         try:
         # visualization_type이 유효한지 확인
-            if config.visualization_type not in self.visualization_types:
-                logging.error(f"Invalid visualization type: {config.visualization_type}")
+            visualization_type = config.visualization_type
+            if visualization_type not in self.visualization_types:
+                logging.error(f"Invalid visualization type: {visualization_type}")
                 # 기본값 "설명하기" 사용
-                vis_type = self.visualization_types["설명하기"]
-            else:
-                vis_type = self.visualization_types[config.visualization_type]
+                visualization_type = "설명하기"
             
             # 입력 텍스트 길이 제한
             max_length = 200
             content = scene[:max_length] if len(scene) > max_length else scene
             
-            prompt = f"""Create a clear, simple educational illustration:
-
-Main concept: {content}
-
-Style requirements:
-- {vis_type['style']}
-- Layout: {vis_type['layout']}
-- Elements: {vis_type['elements']}
-- Visual style: {vis_type['prompt']}
-- Single focused concept per image
-- Bold, clean lines like manhwa/manga style
-- Soft, pleasant color palette (2-3 colors maximum)
-- White or very light background
-
-Must include:
-- One clear focal point
-- Simple visual metaphor
-- Easy-to-understand layout
-- Gentle, rounded edges
-- Ample white space around main element
-
-Must avoid:
-- Multiple competing concepts
-- Complex diagrams or flowcharts
-- Technical symbols or formulas
-- Connecting lines or arrows
-- Text labels or numbers
-- Cluttered compositions
-- Multiple scenes in one image
-"""
+            prompt = self.prompts.render(
+                "nonfiction.scene_description", {"visualization": visualization_type}, content=content
+            ).text
 
             return prompt
 
@@ -147,34 +154,99 @@ Must avoid:
             logging.error(f"Scene description creation failed: {str(e)}")
             raise
 
+    def _process_scene(self, index: int, scene: str, config: NonFictionConfig) -> Dict:
+        """작업 스레드에서 장면 하나를 프롬프트 -> 이미지 -> CLIP 검증까지 처리"""
+        scene_start_time = datetime.now()
+        with span("cut", index=index):
+            prompt = self.create_scene_description(scene, config)
+            image_url, revised_prompt = self.generate_image_with_policy(
+                prompt=prompt,
+                config=config,
+                style="minimalistic",
+                negative_prompt=self.negative_elements
+            )
+
+            score = 0.0
+            prescreen_rejected = False
+            if image_url:
+                # 표시용 미리보기를 백그라운드에서 생성
+                get_derivative_worker().submit_source(image_url)
+                quality_check = self.clip_analyzer.validate_image(
+                    image_url, prompt, return_score=True, prescreen_prompt=revised_prompt
+                )
+                # 1차 선별 탈락은 정밀 점수가 없으므로 0점으로 취급
+                prescreen_rejected = bool(quality_check.get("prescreen_rejected"))
+                score = quality_check.get("similarity_score", 0.0)
+
+        return {
+            "prompt": prompt,
+            "image_url": image_url,
+            "revised_prompt": revised_prompt,
+            "score": score,
+            "prescreen_rejected": prescreen_rejected,
+            "generation_time": (datetime.now() - scene_start_time).total_seconds(),
+        }
+
+    @staticmethod
+    def _render_scene(index: int, result: Dict):
+        """장면 이미지, CLIP 분석 결과, 요약 표시"""
+        score = result["score"]
+        st.image(display_source(result["image_url"]), use_column_width=True)
+
+        # 분석 결과 표시를 위한 expander 추가
+        with st.expander("🔍 CLIP 분석 결과", expanded=False):
+            col1, col2 = st.columns(2)
+            with col1:
+                st.metric("품질 점수", f"{score:.2f}")
+            with col2:
+                if result.get("prescreen_rejected"):
+                    st.error("⚠ 1차 선별 탈락 (장면과 관련이 낮음)")
+                elif score >= 0.7:
+                    st.success("✓ 높은 품질")
+                elif score >= 0.5:
+                    st.warning("△ 중간 품질")
+                else:
+                    st.error("⚠ 낮은 품질")
+
+            # 세부 분석 결과 표시
+            st.write("프롬프트 매칭:")
+            st.progress(score)
+
+            # 생성 시간 표시
+            st.info(f"⏱ 생성 시간: {result['generation_time']:.1f}초")
+
+        with st.expander(f"이미지 {index + 1} 상세 정보"):
+            st.text(f"사용된 프롬프트:\n{result['prompt']}")
+            if result['revised_prompt']:
+                st.text(f"수정된 프롬프트:\n{result['revised_prompt']}")
+
+        # 장면 설명 표시
+        st.markdown(
+            f"<p style='text-align: center; font-size: 14px;'>{result['summary']}</p>",
+            unsafe_allow_html=True
+        )
+
+    @traced("episode.nonfiction")
     def process_submission(self, text: str, config: NonFictionConfig):
-        
         """웹툰 스타일의 교육 컨텐츠 생성"""
         try:
             progress_bar = st.progress(0)
             status = st.empty()
 
-            # 로그 저장을 위한 세션 데이터 초기화
-            if 'generation_logs' not in st.session_state:
-                st.session_state.generation_logs = []
-
             # 분석 시작 시간 기록
             start_time = datetime.now()
+            governor = activate_session_governor(st.session_state)
 
             # CLIP 분석기 정보 표시
             st.sidebar.markdown("### 🔍 CLIP 분석기 정보")
             st.sidebar.info(f"디바이스: {self.clip_analyzer.device}")
-            st.sidebar.info(f"모델: openai/clip-vit-base-patch32")
+            st.sidebar.info(f"모델: {CLIP_MODEL_NAME}")
 
             # 1. 텍스트를 설명 가능한 장면들로 분할
             status.info("📝 내용 분석 중...")
             scenes = self.split_content_into_scenes(text, config.num_images)
             progress_bar.progress(0.2)
 
-            # 2. 결과 저장을 위한 딕셔너리 초기화
-            generated_images = {}
-            scene_descriptions = []
-
             # 생성 메트릭 저장용 딕셔너리
             generation_metrics = {
                 'total_time': 0,
@@ -183,158 +255,88 @@ Must avoid:
                 'generation_attempts': []
             }
 
-            # 3. 각 장면별 처리
-            for i, scene in enumerate(scenes):
-                scene_start_time = datetime.now()
-                status.info(f"🎨 {i+1}/{len(scenes)} 장면 생성 중...")
-            
-                # 장면별 프롬프트 생성
-                prompt = self.create_scene_description(scene, config)
-                scene_descriptions.append(prompt)
-            
-                # 이미지 생성
-                image_url, _, _ = generate_image_from_text(
-                    prompt=prompt,
-                    style="minimalistic",
-                    aspect_ratio=config.aspect_ratio,
-                    negative_prompt=(
-                         "abstract art, messy layout, unclear connections, "
-                            "photorealistic style, 3d rendering, "
-                                "complex textures, dark colors, "
-                                    "artistic interpretation, painterly style"
-                    )
-                    )
-            
-                if image_url:
-                    generated_images[i] = image_url
-                
-                    # CLIP 검증 및 품질 분석
-                    quality_check = self.clip_analyzer.validate_image(
-                        image_url, 
-                        prompt,
-                        return_score=True
-                    )
-
-                    if i % 2 == 0:
-                        cols = st.columns(min(2, config.num_images - i))
-                
-                    with cols[i % 2]:
-                        # 이미지 표시
-                        st.image(image_url, use_column_width=True)
-                    
-                        # 분석 결과 표시를 위한 expander 추가
-                        with st.expander("🔍 CLIP 분석 결과", expanded=False):
-                            col1, col2 = st.columns(2)
-                            score = quality_check.get("similarity_score", 0.0)
-                        
-                            with col1:
-                                st.metric("품질 점수", f"{score:.2f}")
-                            with col2:
-                                if score >= 0.7:
-                                    st.success("✓ 높은 품질")
-                                elif score >= 0.5:
-                                    st.warning("△ 중간 품질")
-                                else:
-                                    st.error("⚠ 낮은 품질")
-                        
-                            # 세부 분석 결과 표시
-                            st.write("프롬프트 매칭:")
-                            st.progress(score)
-                        
-                            # 생성 시간 표시
-                            scene_time = (datetime.now() - scene_start_time).total_seconds()
-                            st.info(f"⏱ 생성 시간: {scene_time:.1f}초")
-                    
-                        # 장면 설명 표시
-                        summary = self.summarize_scene(scene)
-                        st.markdown(
-                            f"<p style='text-align: center; font-size: 14px;'>{summary}</p>", 
-                            unsafe_allow_html=True
-                        )
-
-                    # 메트릭 업데이트
-                    generation_metrics['scores'].append(score)
-                    generation_metrics['generation_attempts'].append({
-                        'scene_number': i + 1,
-                        'clip_score': score,
-                        'generation_time': scene_time
-                    })
-            
-                progress_bar.progress((i + 1) / config.num_images)
+            scene_count = len(scenes)
+            cols_per_row = min(scene_count, 2)
+            slots = []
+            for start_idx in range(0, scene_count, cols_per_row):
+                slots.extend(st.columns(cols_per_row)[:scene_count - start_idx])
+
+            # 2. 장면별 프롬프트 -> 이미지 -> 검증은 최대 CUT_CONCURRENCY개씩 동시에 처리하고,
+            #    장면 텍스트에만 의존하는 캡션은 모든 장면을 한 번의 호출로, 이미지 생성과 동시에 생성
+            status.info(f"🎨 장면 {scene_count}개 생성 중... (동시 {min(CUT_CONCURRENCY, scene_count)}장)")
+            results: Dict[int, Dict] = {}
+            failed_scenes = []
+            with ThreadPoolExecutor(max_workers=CUT_CONCURRENCY, thread_name_prefix="nonfiction-cut") as scene_pool, \
+                    ThreadPoolExecutor(max_workers=1, thread_name_prefix="nonfiction-captioner") as caption_pool:
+                caption_future = caption_pool.submit(contextvars.copy_context().run, self.captioner.caption, scenes)
+                futures = {
+                    scene_pool.submit(contextvars.copy_context().run, self._process_scene, i, scene, config): i
+                    for i, scene in enumerate(scenes)
+                }
+                for done, future in enumerate(as_completed(futures), start=1):
+                    i = futures[future]
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        logging.error(f"장면 {i+1} 생성 실패: {str(e)}")
+                        result = None
+
+                    if result and result["image_url"]:
+                        try:
+                            result["summary"] = caption_future.result()[i]
+                        except Exception as e:
+                            # 캡션 생성이 실패해도 완성된 장면은 버리지 않고 장면 텍스트를 잘라 요약으로 사용
+                            logging.error(f"장면 {i+1} 캡션 생성 실패: {str(e)}")
+                            result["summary"] = fit_caption(scenes[i], self.captioner.max_chars)
+                        results[i] = result
+                        with slots[i]:
+                            self._render_scene(i, result)
+
+                        # 메트릭 업데이트
+                        generation_metrics['generation_attempts'].append({
+                            'scene_number': i + 1,
+                            'clip_score': result["score"],
+                            'generation_time': result["generation_time"],
+                            'image_attempts': 1  # 정보 시각화는 장면마다 한 번만 생성
+                        })
+                    else:
+                        failed_scenes.append(i + 1)
+
+                    progress_bar.progress(0.2 + 0.8 * done / scene_count)
+                    status.info(f"🎨 장면 생성 중... ({done}/{scene_count})")
+
+            generation_metrics['generation_attempts'].sort(key=lambda attempt: attempt['scene_number'])
+            # 점수도 컷 순서로 맞춰 생성 로그에서 scene_times와 같은 컷끼리 짝지어지도록 함
+            generation_metrics['scores'] = [attempt['clip_score'] for attempt in generation_metrics['generation_attempts']]
+            if failed_scenes:
+                st.warning(f"장면 {', '.join(map(str, sorted(failed_scenes)))} 생성에 실패했습니다.")
 
             # 전체 생성 시간 계산
             generation_metrics['total_time'] = (datetime.now() - start_time).total_seconds()
-            generation_metrics['avg_clip_score'] = sum(generation_metrics['scores']) / len(generation_metrics['scores'])
+            scores = generation_metrics['scores']
+            generation_metrics['avg_clip_score'] = sum(scores) / len(scores) if scores else 0.0
 
-            # 생성 로그 저장
-            st.session_state.generation_logs.append({
-                'timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                'config': config.__dict__,
-                'metrics': generation_metrics
-            })
+            # 생성 로그 저장 (영구 저장소 기록, 세션에는 최근 로그만 유지)
+            record_generation_log(st.session_state, 'nonfiction', config.__dict__, generation_metrics)
 
             # 생성 결과 요약 표시
             st.sidebar.markdown("### 📊 생성 결과 요약")
             st.sidebar.metric("평균 CLIP 점수", f"{generation_metrics['avg_clip_score']:.2f}")
             st.sidebar.metric("총 생성 시간", f"{generation_metrics['total_time']:.1f}초")
+            st.sidebar.metric("세션 누적 비용", f"${governor.session.spent_usd:.2f}")
+            TextToWebtoonConverter.render_stage_breakdown()
 
             # 세션 상태에 결과 저장
-            st.session_state.generated_images = generated_images
-            st.session_state.scene_descriptions = scene_descriptions
+            st.session_state.generated_images = {i: result["image_url"] for i, result in sorted(results.items())}
+            st.session_state.scene_descriptions = [result["prompt"] for _, result in sorted(results.items())]
 
-            status.success("✨ 웹툰 생성 완료!")
-
-         
+            if not failed_scenes:
+                status.success("✨ 웹툰 생성 완료!")
 
         except Exception as e:
             st.error(f"오류가 발생했습니다: {str(e)}")
             logging.error(f"Error in process_submission: {str(e)}")
 
-    def summarize_scene(self, description: str) -> str:
-        """장면의 맥락과 의미를 담은 설명 생성"""
-        try:
-            prompt = """다음 시각적 설명을 보고 장면의 맥락과 핵심 메시지를 설명해주세요.
-
-        요구사항:
-    1. 단순한 시각적 묘사("~장면이다")는 피하고, 맥락과 의미를 담아주세요
-    2. 가능한 현재형으로 설명해주세요
-    3. 필요시 인과관계나 변화를 포함해도 좋습니다
-    4. 최대 70자 이내로 작성해주세요
-
-    예시:
-    ❌ "원과 화살표가 연결된 장면이다"
-    ⭕ "물이 수증기로 변하며 순환하는 과정을 보여줍니다"
-
-    ❌ "두 개의 사각형이 비교된 장면이다"
-    ⭕ "고체와 액체 상태에서 분자의 움직임이 달라집니다"
-
-    ❌ "인물이 있는 배경 장면이다"
-    ⭕ "환경오염으로 인해 지구의 온도가 계속 상승하고 있습니다"
-
-    설명할 내용:
-    {description}"""
-
-            response = self.client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                {"role": "system", "content": prompt},
-                {"role": "user", "content": description}
-                ],
-                temperature=0.7,
-                max_tokens=200
-            )
-        
-            summary = response.choices[0].message.content.strip()
-            # 마침표가 없다면 추가
-            if not summary.endswith(('.', '!', '?')):
-                summary += '.'
-            return summary[:150]
-    
-        except Exception as e:
-            logging.error(f"Scene summarization failed: {str(e)}")
-            return description[:70]
-                
-
     def render_ui(self):
        #UI 단순화
         st.title("교육/ 과학 텍스트 시각화하기")
@@ -420,11 +422,13 @@ Must avoid:
                 help="컨텐츠에 가장 적합한 설명 방식을 선택하세요"
             )
             
-                num_images = st.radio(
+                num_images = int(st.number_input(
                 "몇 장의 그림이 필요하신가요?",
-                options=[1, 2, 3, 4],
-                horizontal=True
-            )
+                min_value=1,
+                max_value=MAX_CUTS,
+                value=4,
+                step=1
+            ))
 
             with col2:
                 aspect_ratio = st.selectbox(
@@ -432,6 +436,12 @@ Must avoid:
                 ["정사각형 (1:1)", "와이드 (16:9)", "세로형 (9:16)"]
                 )
 
+                generation_mode = st.selectbox(
+                "생성 모드",
+                list(GENERATION_MODES.keys()),
+                format_func=lambda mode: GENERATION_MODES[mode]
+                )
+
             submit = st.form_submit_button("✨ 웹툰 생성 시작")
 
             if submit and text_content:
@@ -446,7 +456,8 @@ Must avoid:
                 visualization_type=visualization_type,
                 aspect_ratio=ratio_map.get(aspect_ratio, "1:1"),
                 num_images=num_images,
-                emphasis="clarity"
+                emphasis="clarity",
+                generation_mode=generation_mode
             )
                  # 세션 상태에 현재 설정 저장
                 st.session_state.current_config = config
@@ -456,42 +467,6 @@ Must avoid:
             elif submit:
                 st.warning("텍스트를 입력하거나 파일을 업로드해주세요!")
     
-    def create_scene_description(self, scene: str, config: NonFictionConfig) -> str:
-      #각 장면에 대한 시각화 프롬프트 생성"""
-        try:
-            vis_type = self.visualization_types[config.visualization_type]
-            
-        # 기본 스타일과 선택된 시각화 타입 결합
-            prompt = f"""Create a simple and friendly cartoon visualization:
-
-            Content to explain: {scene}
-
-            Style:
-            - Simple cartoon style like children's book illustrations
-            - Clean and easy to understand
-            - Use cute and friendly elements
-            - Minimal details, maximum clarity
-
-            Visual approach: {vis_type['prompt']}
-            Layout: {vis_type['layout']}
-            Main elements: {vis_type['elements']}
-
-            Key requirements:
-            - Keep it super simple and friendly
-            - Use basic shapes and cute symbols
-            - Make it instantly understandable
-            - Avoid complex details
-            - Use clear, cheerful colors
-            - Make it engaging and fun
-
-            Complexity: {config.complexity} (but keep it simple regardless)"""
-
-            return prompt
-
-        except Exception as e:
-            logging.error(f"Scene description creation failed: {str(e)}")
-            raise
-
     def _parse_analysis_response(self, response_text: str) -> Dict[str, float]:
     #"""분석 응답을 파싱하여 점수로 변환"""
          try:
@@ -507,92 +482,6 @@ Must avoid:
             logging.error(f"Analysis parsing failed: {str(e)}")
             return {"process": 0.5, "concept": 0.5, "system": 0.5, "comparison": 0.5}
 
-    def process_submission(self, text: str, config: NonFictionConfig):
-    #"""여러 장의 이미지 생성 및 처리"""
-        try:
-            progress_bar = st.progress(0)
-            status = st.empty()
-
-        # 1. 텍스트를 여러 장면으로 분할
-            status.info("📝 내용 분석 중...")
-            scenes = self.split_content_into_scenes(text, config.num_images)
-            progress_bar.progress(0.2)
-
-        # 2. 각 장면별 처리
-            generated_images = []
-            for i, scene in enumerate(scenes):
-                status.info(f"🎨 {i+1}/{len(scenes)} 이미지 생성 중...")
-            
-            # 장면별 프롬프트 생성
-                prompt = self.create_scene_description(scene, config)
-            
-            # 이미지 생성
-                image_url, revised_prompt, _ = generate_image_from_text(
-                    prompt=prompt,
-                    style="minimalist",  # 항상 미니멀 스타일 사용
-                    aspect_ratio=config.aspect_ratio,
-                    negative_prompt=self.negative_elements
-            )
-            
-                if image_url:
-                # imported summarize_scene 함수 사용
-                    summary = self.summarize_scene(scene)  # 자체 메소드 대신 imported 함수 사용
-                    generated_images.append({
-                    "url": image_url,
-                    "summary": summary,
-                    "prompt": prompt,
-                    "revised_prompt": revised_prompt
-                })
-            
-                progress_bar.progress((i + 1) / len(scenes))
-
-        # 3. 결과 표시
-            if generated_images:
-                cols = st.columns(min(2, len(generated_images)))
-                for i, img_data in enumerate(generated_images):
-                    with cols[i % 2]:
-                        st.image(img_data["url"], use_column_width=True)
-                        st.markdown(f"<p style='text-align: center; font-size: 14px;'>{img_data['summary']}</p>", 
-                              unsafe_allow_html=True)
-                    
-                        with st.expander(f"이미지 {i+1} 상세 정보"):
-                            st.text(f"사용된 프롬프트:\n{img_data['prompt']}")
-                            if img_data['revised_prompt']:
-                                st.text(f"수정된 프롬프트:\n{img_data['revised_prompt']}")
-
-            progress_bar.progress(1.0)
-            status.success("✨ 시각화된 웹툰 생성 완료!")
-
-        except Exception as e:
-            st.error(f"오류가 발생했습니다: {str(e)}")
-            logging.error(f"Error in process_submission: {str(e)}")
-    def summarize_scene(self, description: str) -> str:
-   # """장면 설명 요약"""
-        try:
-            prompt = """다음 시각화 내용을 간단히 설명해주세요:
-        1. 한 문장으로 작성
-        2. 객관적인 설명 위주
-        3. 핵심 요소만 포함
-        4. 최대 50자 이내
-        
-            설명할 내용:"""
-        
-            response = self.client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {"role": "system", "content": prompt},
-                {"role": "user", "content": description}
-            ],
-            temperature=0.7,
-            max_tokens=100
-            )
-        
-            summary = response.choices[0].message.content.strip()
-            return summary[:100]  # 50자로 제한
-        
-        except Exception as e:
-            logging.error(f"Scene summarization failed: {str(e)}")
-            return description[:100]                
 # The main function would be similar to your existing code
 def main():
     st.set_page_config(
@@ -603,7 +492,7 @@ def main():
     
     try:
         client = OpenAI()
-        converter = NonFictionConverter(client)
+        converter = NonFictionConverter(client, get_clip_analyzer())
         converter.render_ui()
     except Exception as e:
         st.error(f"애플리케이션 실행 중 오류 발생: {e}")
@@ -0,0 +1,215 @@
+import os
+import re
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing, contextmanager
+from typing import Dict, Iterator, Optional
+
+from image_io import fetch_image_bytes
+from save_utils import store_blob
+from tracing import span, increment
+
+CACHE_DIR = os.getenv("WEBTOONIZER_IMAGE_CACHE_DIR", "image_cache")
+CACHE_ENABLED = os.getenv("WEBTOONIZER_IMAGE_CACHE", "1") != "0"
+MAX_ENTRIES = int(os.getenv("WEBTOONIZER_IMAGE_CACHE_MAX_ENTRIES", "500"))
+MAX_BYTES = int(os.getenv("WEBTOONIZER_IMAGE_CACHE_MAX_MB", "1024")) * 1024 * 1024
+
+
+def normalize_prompt(prompt: str) -> str:
+    """공백, 대소문자, 구두점 차이를 제거한 정규화 프롬프트"""
+    text = prompt.lower()
+    text = re.sub(r"[^\w\s]", " ", text)
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def cache_key(normalized_prompt: str, size: str, quality: str) -> str:
+    return hashlib.sha256(f"{size}|{quality}|{normalized_prompt}".encode('utf-8')).hexdigest()
+
+
+class PromptImageCache:
+    """
+    프롬프트/크기/품질 기준 이미지 결과 캐시
+
+    정규화(공백/대소문자/구두점)한 프롬프트가 정확히 일치하는 항목만 반환합니다.
+    항목 수와 디스크 용량 한도를 넘으면 가장 오래 사용하지 않은 항목부터 삭제합니다.
+    """
+
+    def __init__(self, cache_dir: str = CACHE_DIR, max_entries: int = MAX_ENTRIES,
+                 max_bytes: int = MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.db_path = os.path.join(cache_dir, "index.sqlite3")
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._source_keys: "OrderedDict[str, str]" = OrderedDict()  # 저장 대기 중인 원본 URL -> 키
+        self._pending_scores: Dict[str, float] = {}
+        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="prompt-cache")
+        os.makedirs(cache_dir, exist_ok=True)
+        self._init_schema()
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """트랜잭션 단위 연결 (성공 시 커밋, 예외 시 롤백, 끝나면 항상 닫음)"""
+        with closing(sqlite3.connect(self.db_path, timeout=10)) as conn:
+            conn.row_factory = sqlite3.Row
+            with conn:
+                yield conn
+
+    def _init_schema(self):
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS entries (
+                    key TEXT PRIMARY KEY,
+                    normalized_prompt TEXT NOT NULL,
+                    size TEXT NOT NULL,
+                    quality TEXT NOT NULL,
+                    blob_path TEXT NOT NULL,
+                    digest TEXT NOT NULL,
+                    revised_prompt TEXT,
+                    score REAL,
+                    bytes INTEGER NOT NULL,
+                    embedding BLOB NOT NULL,  -- 사용하지 않음 (기존 인덱스 파일과의 호환을 위해 빈 값 기록)
+                    created_at REAL NOT NULL,
+                    last_access REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_access ON entries (last_access)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_blob ON entries (blob_path)")
+
+    def lookup(self, prompt: str, size: str, quality: str) -> Optional[Dict]:
+        """
+        캐시된 이미지 조회
+
+        Returns:
+            dict: key, blob_path, revised_prompt, score (없으면 None)
+        """
+        key = cache_key(normalize_prompt(prompt), size, quality)
+        with span("cache.image_lookup"):
+            with self._connect() as conn:
+                row = conn.execute("SELECT * FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None or not os.path.exists(row["blob_path"]):
+                increment("image_cache", 1, result="miss")
+                return None
+
+            with self._connect() as conn:
+                conn.execute("UPDATE entries SET last_access = ? WHERE key = ?", (time.time(), row["key"]))
+            increment("image_cache", 1, result="hit")
+            return {
+                "key": row["key"],
+                "blob_path": row["blob_path"],
+                "revised_prompt": row["revised_prompt"],
+                "score": row["score"],
+            }
+
+    def store(self, prompt: str, size: str, quality: str, data: bytes, revised_prompt: Optional[str] = None,
+              score: Optional[float] = None) -> str:
+        """이미지 바이트를 블롭으로 저장하고 캐시 항목 등록"""
+        normalized = normalize_prompt(prompt)
+        key = cache_key(normalized, size, quality)
+        blob_path, digest = store_blob(data, self.cache_dir)
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                """
+                INSERT OR REPLACE INTO entries
+                    (key, normalized_prompt, size, quality, blob_path, digest, revised_prompt, score,
+                     bytes, embedding, created_at, last_access)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (key, normalized, size, quality, blob_path, digest, revised_prompt, score,
+                 len(data), b"", now, now)
+            )
+            with self._lock:
+                pending_score = self._pending_scores.pop(key, None)
+            if pending_score is not None:
+                conn.execute("UPDATE entries SET score = ? WHERE key = ?", (pending_score, key))
+        self._evict()
+        return blob_path
+
+    def store_from_source_async(self, prompt: str, size: str, quality: str, source: str,
+                                revised_prompt: Optional[str] = None):
+        """생성 직후 URL의 이미지를 백그라운드에서 내려받아 캐시에 저장"""
+        with self._lock:
+            self._source_keys[source] = cache_key(normalize_prompt(prompt), size, quality)
+            while len(self._source_keys) > 256:
+                self._source_keys.popitem(last=False)
+
+        def task():
+            try:
+                self.store(prompt, size, quality, fetch_image_bytes(source), revised_prompt)
+            except Exception as e:
+                logging.error(f"이미지 캐시 저장 실패: {str(e)}")
+        self._executor.submit(task)
+
+    def record_score(self, source: str, score: float):
+        """
+        검증 점수 기록
+
+        source는 캐시 블롭 경로이거나 저장 대기 중인 원본 URL이며,
+        아직 저장되지 않은 항목의 점수는 저장 시점에 반영합니다.
+        """
+        with self._lock:
+            key = self._source_keys.get(source)
+        with self._connect() as conn:
+            updated = conn.execute(
+                "UPDATE entries SET score = ? WHERE key = ? OR blob_path = ?", (score, key, source)
+            ).rowcount
+        if key and not updated:
+            with self._lock:
+                self._pending_scores[key] = score
+
+    def score_for(self, blob_path: str) -> Optional[float]:
+        """캐시에서 반환된 이미지의 검증 점수 조회 (캐시 이미지가 아니거나 점수가 없으면 None)"""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT score FROM entries WHERE blob_path = ? AND score IS NOT NULL", (blob_path,)
+            ).fetchone()
+        return row["score"] if row else None
+
+    def _evict(self):
+        """LRU 순서로 항목 수/디스크 용량 한도 초과분 삭제"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT key, blob_path, bytes FROM entries ORDER BY last_access DESC"
+            ).fetchall()
+            # 같은 블롭을 공유하는 항목은 용량을 한 번만 계산
+            kept_blobs, total_bytes, evicted = set(), 0, []
+            for i, row in enumerate(rows):
+                new_blob = row["blob_path"] not in kept_blobs
+                if i >= self.max_entries or (new_blob and total_bytes + row["bytes"] > self.max_bytes):
+                    evicted.append(row)
+                    continue
+                if new_blob:
+                    kept_blobs.add(row["blob_path"])
+                    total_bytes += row["bytes"]
+
+            for row in evicted:
+                conn.execute("DELETE FROM entries WHERE key = ?", (row["key"],))
+        if not evicted:
+            return
+
+        for row in evicted:
+            if row["blob_path"] not in kept_blobs and os.path.exists(row["blob_path"]):
+                os.remove(row["blob_path"])
+        logging.info(f"이미지 캐시 {len(evicted)}개 항목 정리")
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_prompt_cache() -> Optional[PromptImageCache]:
+    """프로세스 공용 이미지 캐시 (비활성화 시 None)"""
+    global _cache
+    if not CACHE_ENABLED:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = PromptImageCache()
+    return _cache
@@ -0,0 +1,313 @@
+import string
+import itertools
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, List, Tuple
+
+from episode_model import stable_hash
+
+TEMPLATE_VERSION = 1  # 문구 외 렌더링 방식이 바뀌면 올림 (문구 변경은 정적 해시에 자동 반영)
+
+STYLE_GUIDES = {
+    "미니멀리스트": {
+        "prompt": "minimal details, simple lines, clean composition, essential elements only",
+        "emphasis": "Focus on simplicity and negative space"
+    },
+    "픽토그램": {
+        "prompt": "pictogram style, symbolic representation, simplified shapes, icon-like style",
+        "emphasis": "Clear silhouettes and symbolic elements"
+    },
+    "카툰": {
+        "prompt": "animated style, exaggerated features, bold colors",
+        "emphasis": "Expressive and dynamic elements"
+    },
+    "웹툰": {
+        "prompt": "webtoon style, manhwa art style, clean lines, vibrant colors",
+        "emphasis": "Dramatic angles and clear storytelling"
+    },
+    "예술적": {
+        "prompt": "painterly style, artistic interpretation, creative composition",
+        "emphasis": "Atmospheric and textural details"
+    }
+}
+
+MOOD_GUIDES = {
+    "일상적": {
+        "prompt": "natural lighting, soft colors, everyday atmosphere",
+        "lighting": "warm, natural daylight",
+        "color": "neutral, balanced palette"
+    },
+    "긴장된": {
+        "prompt": "dramatic lighting, high contrast, intense atmosphere",
+        "lighting": "harsh shadows, dramatic highlights",
+        "color": "high contrast, intense tones"
+    },
+    "진지한": {
+        "prompt": "subdued lighting, serious atmosphere, formal composition",
+        "lighting": "soft, directional light",
+        "color": "muted, serious tones"
+    },
+    "따뜻한": {
+        "prompt": "warm colors, soft lighting, comfortable atmosphere",
+        "lighting": "golden hour, soft glow",
+        "color": "warm, inviting palette"
+    },
+    "즐거운": {
+        "prompt": "bright lighting, warm colors, dynamic composition",
+        "lighting": "bright, cheerful",
+        "color": "vibrant, playful colors"
+    }
+}
+
+COMPOSITION_GUIDES = {
+    "배경과 인물": "balanced composition of character and background, eye-level shot",
+    "근접 샷": "close-up shot, focused on character's expression",
+    "대화형": "two-shot composition, characters facing each other",
+    "풍경 위주": "wide shot, emphasis on background scenery",
+    "일반": "standard view, balanced composition"
+}
+
+VISUALIZATION_TYPES = {
+    "설명하기": {
+        "prompt": "simple minimalistic shapes, thin and sharp lines, clean composition, no text",
+        "layout": "minimalistic single-concept layout",
+        "elements": "sole object, no unnecessary shading or details",
+        "style": "educational minimalistic style with thin lines"
+    },
+    "비교하기": {
+        "prompt": "two-column comparison, thin outlines, minimalistic shapes, clean layout, no unnecessary details",
+        "layout": "side-by-side layout, focus on clear differences",
+        "elements": "precise shapes, no shading, no text",
+        "style": "minimalistic cartoon style with fine lines"
+    },
+    "과정 보여주기": {
+        "prompt": "step-by-step flow, clean lines, thin minimalistic shapes, cartoon-like simplicity without exaggeration",
+        "layout": "horizontal or vertical progression with arrows",
+        "elements": "single-colored shapes, no gradients, no text",
+        "style": "thin line cartoon minimalistic style"
+    },
+    "원리 설명하기": {
+        "prompt": "cause-and-effect diagram with minimalistic shapes, thin lines, plain white background, no text",
+        "layout": "input-output or cause-effect structure",
+        "elements": "clear, distinct shapes, no complex details",
+        "style": "scientific minimalistic style with cartoon simplicity"
+    }
+}
+
+NEGATIVE_ELEMENTS = (
+    "blurry images, distorted faces, text in image, unrealistic proportions, "
+    "extra limbs, overly complicated backgrounds, too much characters,excessive details,poor lighting, bad anatomy, "
+    "abstract images, cut-off elements"
+)
+
+STORY_NEGATIVE_PROMPT = """
+추상적인 이미지, 흐릿한 이미지, 낮은 품질, 비현실적인 비율,
+왜곡된 얼굴, 추가 사지, 이미지 안 텍스트, 말풍선, 5명 이상의 인물, 국기 또는 나라,
+잘린 이미지, 과도한 필터, 비문법적 구조, 중복된 특징,
+나쁜 해부학, 나쁜 손, 과도하게 복잡한 배경
+"""
+
+NONFICTION_NEGATIVE_PROMPT = (
+    "abstract art, messy layout, unclear connections, "
+    "photorealistic style, 3d rendering, "
+    "complex textures, dark colors, "
+    "artistic interpretation, painterly style"
+)
+
+
+@dataclass(frozen=True)
+class RenderedPrompt:
+    text: str
+    template: str
+    static_hash: str  # 템플릿 이름/버전/배치/렌더링된 정적 부분의 해시 (에피소드 단계 입력 해시용)
+
+
+class PromptTemplate:
+    """
+    가이드 조합으로 정해지는 정적 부분과 호출마다 바뀌는 동적 부분으로 나뉜 프롬프트 템플릿
+
+    - static: 축(axes)별로 선택된 가이드를 {style[prompt]}처럼 참조하는 부분.
+      compile() 시 모든 조합을 미리 렌더링하여 캐시합니다.
+    - layout: {static}과 동적 필드({scene} 등)를 배치하는 부분
+    """
+
+    def __init__(self, name: str, static: str, layout: str, axes: Dict[str, Dict[str, Any]],
+                 version: int = TEMPLATE_VERSION):
+        self.name = name
+        self.static = static
+        self.layout = layout
+        self.axes = axes
+        self.version = version
+        self.fields = sorted({
+            field for _, field, _, _ in string.Formatter().parse(layout) if field and field != "static"
+        })
+        self._compiled: Dict[Tuple[str, ...], Tuple[str, str]] = {}
+
+    def combinations(self) -> List[Tuple[str, ...]]:
+        return list(itertools.product(*(guides.keys() for guides in self.axes.values())))
+
+    def compile(self) -> List[str]:
+        """
+        모든 가이드 조합의 정적 부분을 렌더링하여 캐시
+
+        Returns:
+            list: 렌더링에 실패한 조합의 오류 메시지 (비어 있으면 정상)
+        """
+        errors = []
+        compiled = {}
+        for combination in self.combinations():
+            selection = dict(zip(self.axes, combination))
+            try:
+                text = self.static.format(**{axis: self.axes[axis][key] for axis, key in selection.items()})
+            except (KeyError, IndexError, TypeError, ValueError) as e:
+                errors.append(f"{self.name} {selection}: {type(e).__name__} {e}")
+                continue
+            compiled[combination] = (text, stable_hash(self.name, self.version, self.layout, text))
+
+        try:
+            self.layout.format(static="", **{field: "" for field in self.fields})
+        except (KeyError, IndexError, ValueError) as e:
+            errors.append(f"{self.name} layout: {type(e).__name__} {e}")
+
+        self._compiled = compiled
+        return errors
+
+    def static_for(self, **selection) -> Tuple[str, str]:
+        """선택한 가이드 조합의 (정적 부분, 정적 부분 해시)"""
+        key = tuple(selection[axis] for axis in self.axes)
+        try:
+            return self._compiled[key]
+        except KeyError:
+            raise KeyError(f"{self.name}: 등록되지 않은 가이드 조합 {selection}")
+
+    def render(self, selection: Dict[str, str], **fields) -> RenderedPrompt:
+        static_text, static_hash = self.static_for(**selection)
+        values = {field: fields.get(field, "") for field in self.fields}
+        return RenderedPrompt(
+            text=self.layout.format(static=static_text, **values),
+            template=self.name,
+            static_hash=static_hash,
+        )
+
+
+class PromptRegistry:
+    """이름으로 템플릿을 찾고 시작 시 모든 템플릿을 한 번에 검증/컴파일하는 레지스트리"""
+
+    def __init__(self):
+        self._templates: Dict[str, PromptTemplate] = {}
+
+    def register(self, template: PromptTemplate) -> PromptTemplate:
+        self._templates[template.name] = template
+        return template
+
+    def get(self, name: str) -> PromptTemplate:
+        return self._templates[name]
+
+    def render(self, name: str, selection: Dict[str, str], **fields) -> RenderedPrompt:
+        return self._templates[name].render(selection, **fields)
+
+    def static_hash(self, name: str, selection: Dict[str, str]) -> str:
+        """선택한 가이드 조합의 정적 해시 (템플릿 문구가 바뀌면 함께 바뀜)"""
+        return self._templates[name].static_for(**selection)[1]
+
+    def compile_all(self):
+        """모든 템플릿의 모든 가이드 조합을 렌더링하고, 하나라도 실패하면 ValueError"""
+        errors = [error for template in self._templates.values() for error in template.compile()]
+        if errors:
+            raise ValueError("프롬프트 템플릿 검증 실패:\n" + "\n".join(errors))
+
+
+def build_default_registry() -> PromptRegistry:
+    registry = PromptRegistry()
+
+    registry.register(PromptTemplate(
+        "story.scene_description",
+        axes={"style": STYLE_GUIDES, "mood": MOOD_GUIDES, "composition": COMPOSITION_GUIDES},
+        static="""웹툰 작화 지침:
+
+스타일 요구사항:
+{style[prompt]}
+{style[emphasis]}
+
+분위기 요구사항:
+{mood[prompt]}
+조명: {mood[lighting]}
+색감: {mood[color]}
+
+구도: {composition}""",
+        layout="""{static}
+
+장면: {scene}
+캐릭터 특징: {character_desc}
+
+다음 요소들을 상세히 설명해주세요:
+1. 화면 구도와 시점
+2. 캐릭터의 위치, 포즈, 표정
+3. 배경의 깊이감과 디테일
+4. 조명과 그림자의 처리
+5. 감정을 강조하는 시각적 요소""",
+    ))
+
+    registry.register(PromptTemplate(
+        "story.image",
+        axes={"style": STYLE_GUIDES, "mood": MOOD_GUIDES},
+        static="""Visual style: {style[prompt]}
+Mood: {mood[prompt]}
+Lighting: {mood[lighting]}
+Color: {mood[color]}""",
+        layout="""{description}
+{static}""",
+    ))
+
+    registry.register(PromptTemplate(
+        "nonfiction.scene_description",
+        axes={"visualization": VISUALIZATION_TYPES},
+        static="""Style requirements:
+- {visualization[style]}
+- Layout: {visualization[layout]}
+- Elements: {visualization[elements]}
+- Visual style: {visualization[prompt]}
+- Single focused concept per image
+- Bold, clean lines like manhwa/manga style
+- Soft, pleasant color palette (2-3 colors maximum)
+- White or very light background
+
+Must include:
+- One clear focal point
+- Simple visual metaphor
+- Easy-to-understand layout
+- Gentle, rounded edges
+- Ample white space around main element
+
+Must avoid:
+- Multiple competing concepts
+- Complex diagrams or flowcharts
+- Technical symbols or formulas
+- Connecting lines or arrows
+- Text labels or numbers
+- Cluttered compositions
+- Multiple scenes in one image
+""",
+        layout="""Create a clear, simple educational illustration:
+
+Main concept: {content}
+
+{static}""",
+    ))
+
+    registry.compile_all()
+    return registry
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_prompt_registry() -> PromptRegistry:
+    """프로세스 공용 프롬프트 템플릿 레지스트리 (처음 호출 시 모든 가이드 조합 검증)"""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = build_default_registry()
+    return _registry
@@ -1,63 +1,134 @@
 import os
 import json
+import hashlib
+import tempfile
 from datetime import datetime
-import shutil
-from PIL import Image
-import requests
-from io import BytesIO
+from image_io import fetch_many, detect_image_extension
+from session_catalog import SessionCatalog
+from image_derivatives import DERIVATIVE_DIR_NAME, derivative_paths, get_derivative_worker
+from tracing import span, traced
 
+BLOB_DIR_NAME = "blobs"
+MANIFEST_VERSION = 2
+
+
+def _blob_path(save_dir: str, digest: str, ext: str) -> str:
+    """해시값으로 블롭 저장 경로 계산 (앞 두 글자로 디렉토리 분산)"""
+    return os.path.join(save_dir, BLOB_DIR_NAME, digest[:2], f"{digest}.{ext}")
+
+
+@traced("save.blob")
+def store_blob(data: bytes, save_dir: str = "saved_sessions") -> tuple:
+    """
+    이미지 바이트를 SHA-256 기반 블롭으로 저장 (세션 간 중복 제거)
+
+    Returns:
+        tuple: (블롭 경로, sha256 해시)
+    """
+    digest = hashlib.sha256(data).hexdigest()
+    ext = detect_image_extension(data) or "png"
+    blob_path = _blob_path(save_dir, digest, ext)
+    if os.path.exists(blob_path):
+        return blob_path, digest
+
+    blob_dir = os.path.dirname(blob_path)
+    os.makedirs(blob_dir, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=blob_dir, suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, blob_path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return blob_path, digest
+
+
+def write_json_atomic(path: str, data: dict):
+    """임시 파일에 쓴 뒤 rename으로 교체하여 JSON을 원자적으로 저장"""
+    directory = os.path.dirname(path) or "."
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def _create_session_dir(save_dir: str) -> tuple:
+    """충돌하지 않는 세션 폴더 생성 (마이크로초 타임스탬프 + 중복 시 접미사)"""
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+    session_dir = os.path.join(save_dir, f"session_{timestamp}")
+    suffix = 0
+    while True:
+        try:
+            os.makedirs(session_dir)
+            return session_dir, timestamp
+        except FileExistsError:
+            suffix += 1
+            session_dir = os.path.join(save_dir, f"session_{timestamp}_{suffix}")
+
+
+@traced("save.session")
 def save_session(config: dict, images: dict, save_dir: str = "saved_sessions") -> str:
     """
     세션 정보와 이미지들을 저장하는 함수
     
     Args:
         config (dict): 설정 정보 (프롬프트, 스타일, 구도 등)
-        images (dict): 생성된 이미지 URL들의 딕셔너리
+        images (dict): 생성된 이미지 URL(또는 로컬 경로)들의 딕셔너리
         save_dir (str): 저장할 기본 디렉토리
     
     Returns:
         str: 저장된 세션 디렉토리 경로
     """
-    # 타임스탬프로 세션 폴더 생성
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    session_dir = os.path.join(save_dir, f"session_{timestamp}")
-    os.makedirs(session_dir, exist_ok=True)
-    
-    # 설정 정보를 JSON 파일로 저장
-    config['timestamp'] = timestamp
-    config_path = os.path.join(session_dir, "config.json")
-    with open(config_path, 'w', encoding='utf-8') as f:
-        json.dump(config, f, ensure_ascii=False, indent=2)
-    
-    # 이미지 저장
-    images_dir = os.path.join(session_dir, "images")
-    os.makedirs(images_dir, exist_ok=True)
-    
+    os.makedirs(save_dir, exist_ok=True)
+    session_dir, timestamp = _create_session_dir(save_dir)
+
+    # 이미지 동시 다운로드 후 원본 바이트 그대로 블롭 저장
     saved_images = {}
-    for idx, image_url in images.items():
+    saved_blobs = {}
+    derivatives = {}
+    derivative_root = os.path.join(save_dir, DERIVATIVE_DIR_NAME)
+    worker = get_derivative_worker()
+    for idx, data in fetch_many(images).items():
         try:
-            # URL에서 이미지 다운로드
-            response = requests.get(image_url)
-            if response.status_code == 200:
-                image = Image.open(BytesIO(response.content))
-                image_path = os.path.join(images_dir, f"image_{idx}.png")
-                image.save(image_path)
-                saved_images[idx] = image_path
+            blob_path, digest = store_blob(data, save_dir)
+            saved_images[idx] = blob_path
+            saved_blobs[idx] = digest
+            # 생성 중 캐시에 만든 썸네일/미리보기를 백그라운드에서 세션 폴더로 복사 (없으면 생성, 경로는 해시로 미리 결정됨)
+            worker.submit_bytes(data, digest, derivative_root)
+            derivatives[idx] = derivative_paths(digest, derivative_root)
         except Exception as e:
             print(f"이미지 {idx} 저장 중 오류 발생: {str(e)}")
-    
-    # 저장된 이미지 정보를 JSON에 추가
-    with open(config_path, 'r', encoding='utf-8') as f:
-        config_data = json.load(f)
-    config_data['saved_images'] = saved_images
-    with open(config_path, 'w', encoding='utf-8') as f:
-        json.dump(config_data, f, ensure_ascii=False, indent=2)
-    
+
+    # 매니페스트는 한 번만 원자적으로 기록
+    manifest = dict(config)
+    manifest['timestamp'] = timestamp
+    manifest['manifest_version'] = MANIFEST_VERSION
+    manifest['saved_images'] = saved_images
+    manifest['saved_blobs'] = saved_blobs
+    manifest['derivatives'] = derivatives
+    with span("save.manifest"):
+        write_json_atomic(os.path.join(session_dir, "config.json"), manifest)
+
+    # 목록 조회용 카탈로그 갱신 (실패해도 세션 저장 자체는 유지)
+    try:
+        SessionCatalog(save_dir).upsert_from_manifest(session_dir, manifest)
+    except Exception as e:
+        print(f"세션 카탈로그 갱신 중 오류 발생: {str(e)}")
+
     return session_dir
 
 def load_session(session_dir: str) -> tuple:
     """
     저장된 세션을 불러오는 함수
+
+    이미지를 필요할 때만 열어야 한다면 open_session을 사용하세요.
     
     Args:
         session_dir (str): 세션 디렉토리 경로
@@ -78,24 +149,35 @@ def load_session(session_dir: str) -> tuple:
         print(f"세션 로드 중 오류 발생: {str(e)}")
         return None, None
 
-def list_saved_sessions(save_dir: str = "saved_sessions") -> list:
-    """저장된 세션 목록 반환"""
+def list_saved_sessions(save_dir: str = "saved_sessions", limit: int = None, offset: int = 0,
+                        sort_by: str = "timestamp", descending: bool = True,
+                        session_type: str = None, title_query: str = None) -> list:
+    """
+    저장된 세션 목록 반환 (SQLite 카탈로그 조회)
+
+    Args:
+        save_dir (str): 세션 기본 디렉토리
+        limit (int): 페이지 크기 (None이면 전체)
+        offset (int): 건너뛸 항목 수
+        sort_by (str): 정렬 기준 ("timestamp", "title", "type")
+        descending (bool): 내림차순 여부
+        session_type (str): 세션 타입 필터
+        title_query (str): 제목 부분 일치 필터
+
+    Returns:
+        list: name, path, timestamp, type, title, thumbnail_path를 담은 딕셔너리 리스트
+    """
     if not os.path.exists(save_dir):
         return []
-    
-    sessions = []
-    for session_name in os.listdir(save_dir):
-        session_path = os.path.join(save_dir, session_name)
-        config_path = os.path.join(session_path, "config.json")
-        if os.path.exists(config_path):
-            with open(config_path, 'r', encoding='utf-8') as f:
-                config = json.load(f)
-                sessions.append({
-                    'name': session_name,
-                    'path': session_path,
-                    'timestamp': config.get('timestamp', ''),
-                    'type': config.get('type', ''),
-                    'title': config.get('title', '')
-                })
-    
-    return sorted(sessions, key=lambda x: x['timestamp'], reverse=True)
\ No newline at end of file
+
+    catalog = SessionCatalog(save_dir)
+    # 카탈로그 도입 이전에 저장된 세션은 최초 1회만 스캔하여 색인
+    catalog.migrate_existing()
+    return catalog.query(
+        limit=limit,
+        offset=offset,
+        sort_by=sort_by,
+        descending=descending,
+        session_type=session_type,
+        title_query=title_query
+    )
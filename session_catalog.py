@@ -0,0 +1,174 @@
+import os
+import json
+import sqlite3
+import logging
+from contextlib import closing, contextmanager
+from typing import Dict, Iterator, List, Optional
+
+CATALOG_FILENAME = "catalog.sqlite3"
+TITLE_MAX_LENGTH = 100
+
+
+class SessionCatalog:
+    """저장된 세션의 목록 필드만 담는 SQLite 인덱스"""
+
+    SORT_COLUMNS = ("timestamp", "title", "type")
+
+    def __init__(self, save_dir: str = "saved_sessions"):
+        self.save_dir = save_dir
+        self.db_path = os.path.join(save_dir, CATALOG_FILENAME)
+        os.makedirs(save_dir, exist_ok=True)
+        self._init_schema()
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """트랜잭션 단위 연결 (성공 시 커밋, 예외 시 롤백, 끝나면 항상 닫음)"""
+        with closing(sqlite3.connect(self.db_path, timeout=10)) as conn:
+            conn.row_factory = sqlite3.Row
+            with conn:
+                yield conn
+
+    def _init_schema(self):
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS sessions (
+                    name TEXT PRIMARY KEY,
+                    path TEXT NOT NULL,
+                    timestamp TEXT NOT NULL,
+                    type TEXT NOT NULL DEFAULT '',
+                    title TEXT NOT NULL DEFAULT '',
+                    thumbnail_path TEXT
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_sessions_timestamp ON sessions (timestamp)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_sessions_type ON sessions (type, timestamp)")
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+
+    def upsert(self, name: str, path: str, timestamp: str, session_type: str = "",
+               title: str = "", thumbnail_path: Optional[str] = None):
+        """세션 항목 추가 또는 갱신"""
+        with self._connect() as conn:
+            conn.execute(
+                """
+                INSERT INTO sessions (name, path, timestamp, type, title, thumbnail_path)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(name) DO UPDATE SET
+                    path = excluded.path,
+                    timestamp = excluded.timestamp,
+                    type = excluded.type,
+                    title = excluded.title,
+                    thumbnail_path = excluded.thumbnail_path
+                """,
+                (name, path, timestamp, session_type or "", (title or "")[:TITLE_MAX_LENGTH], thumbnail_path)
+            )
+
+    def upsert_from_manifest(self, session_dir: str, manifest: Dict):
+        """세션 매니페스트(config.json 내용)에서 목록 필드만 추려 색인"""
+        self.upsert(
+            name=os.path.basename(os.path.normpath(session_dir)),
+            path=session_dir,
+            timestamp=manifest.get('timestamp', ''),
+            session_type=manifest.get('type', ''),
+            title=manifest.get('title', ''),
+            thumbnail_path=self._pick_thumbnail(manifest)
+        )
+
+    @staticmethod
+    def _pick_thumbnail(manifest: Dict) -> Optional[str]:
+        """목록에 표시할 대표 이미지 경로 선택"""
+        saved_images = manifest.get('saved_images') or {}
+        if not saved_images:
+            return None
+        first_key = sorted(saved_images.keys(), key=lambda k: int(k) if str(k).isdigit() else str(k))[0]
+        # WebP 썸네일이 있으면 우선 사용
+        derivatives = (manifest.get('derivatives') or {}).get(first_key) or {}
+        return derivatives.get('thumb') or saved_images[first_key]
+
+    def remove(self, name: str):
+        """세션 항목 삭제"""
+        with self._connect() as conn:
+            conn.execute("DELETE FROM sessions WHERE name = ?", (name,))
+
+    @staticmethod
+    def _where_clause(session_type: Optional[str], title_query: Optional[str]) -> tuple:
+        clauses, params = [], []
+        if session_type:
+            clauses.append("type = ?")
+            params.append(session_type)
+        if title_query:
+            clauses.append("title LIKE ?")
+            params.append(f"%{title_query}%")
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        return where, params
+
+    def query(self, limit: Optional[int] = 20, offset: int = 0, sort_by: str = "timestamp",
+              descending: bool = True, session_type: Optional[str] = None,
+              title_query: Optional[str] = None) -> List[Dict]:
+        """
+        정렬, 필터, 페이지 단위로 세션 목록 조회
+
+        Args:
+            limit (int): 페이지 크기 (None이면 전체)
+            offset (int): 건너뛸 항목 수
+            sort_by (str): 정렬 기준 ("timestamp", "title", "type")
+            descending (bool): 내림차순 여부
+            session_type (str): 세션 타입 필터 ("story", "nonfiction" 등)
+            title_query (str): 제목 부분 일치 필터
+
+        Returns:
+            list: 세션 목록 딕셔너리 리스트
+        """
+        if sort_by not in self.SORT_COLUMNS:
+            raise ValueError(f"지원하지 않는 정렬 기준: {sort_by}")
+
+        where, params = self._where_clause(session_type, title_query)
+        order = "DESC" if descending else "ASC"
+        sql = (
+            f"SELECT name, path, timestamp, type, title, thumbnail_path FROM sessions {where} "
+            f"ORDER BY {sort_by} {order}, name {order} LIMIT ? OFFSET ?"
+        )
+        params += [-1 if limit is None else limit, offset]
+
+        with self._connect() as conn:
+            rows = conn.execute(sql, params).fetchall()
+        return [dict(row) for row in rows]
+
+    def count(self, session_type: Optional[str] = None, title_query: Optional[str] = None) -> int:
+        """필터 조건에 맞는 세션 수"""
+        where, params = self._where_clause(session_type, title_query)
+        with self._connect() as conn:
+            return conn.execute(f"SELECT COUNT(*) FROM sessions {where}", params).fetchone()[0]
+
+    def is_migrated(self) -> bool:
+        with self._connect() as conn:
+            row = conn.execute("SELECT value FROM meta WHERE key = 'migrated'").fetchone()
+        return row is not None
+
+    def migrate_existing(self, force: bool = False) -> int:
+        """
+        기존 세션 폴더들을 한 번만 스캔하여 색인
+
+        Returns:
+            int: 새로 색인한 세션 수
+        """
+        if self.is_migrated() and not force:
+            return 0
+
+        indexed = 0
+        for session_name in os.listdir(self.save_dir):
+            session_path = os.path.join(self.save_dir, session_name)
+            config_path = os.path.join(session_path, "config.json")
+            if not os.path.isfile(config_path):
+                continue
+            try:
+                with open(config_path, 'r', encoding='utf-8') as f:
+                    manifest = json.load(f)
+                self.upsert_from_manifest(session_path, manifest)
+                indexed += 1
+            except Exception as e:
+                logging.error(f"세션 색인 실패 ({session_name}): {str(e)}")
+
+        with self._connect() as conn:
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('migrated', '1')")
+        logging.info(f"세션 카탈로그 마이그레이션 완료: {indexed}개")
+        return indexed
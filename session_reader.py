@@ -0,0 +1,129 @@
+import os
+import json
+import logging
+from collections.abc import Mapping
+from typing import Dict, Optional
+
+import numpy as np
+from PIL import Image
+
+PIXEL_CACHE_DIR_NAME = "pixel_cache"
+
+
+def resolve_saved_path(path: str) -> str:
+    """다른 OS에서 저장된 경로 구분자를 현재 OS에 맞게 변환"""
+    return path.replace("\\", os.sep).replace("/", os.sep)
+
+
+class LazySessionImage:
+    """접근 시점에만 파일을 여는 세션 이미지"""
+
+    def __init__(self, index: str, path: str, derivatives: Optional[Dict[str, str]] = None,
+                 cache_dir: Optional[str] = None):
+        self.index = index
+        self.path = resolve_saved_path(path)
+        self.derivatives = {name: resolve_saved_path(p) for name, p in (derivatives or {}).items()}
+        self.cache_dir = cache_dir
+        self._pixels = None
+
+    def read_bytes(self) -> bytes:
+        """디코딩 없이 원본 바이트 읽기"""
+        with open(self.path, 'rb') as f:
+            return f.read()
+
+    def open(self) -> Image.Image:
+        """PIL 이미지로 열기 (헤더만 읽고 픽셀은 사용할 때 디코딩)"""
+        return Image.open(self.path)
+
+    def display_path(self, variant: str = "preview") -> str:
+        """표시용 변형 이미지 경로 (없으면 원본)"""
+        path = self.derivatives.get(variant)
+        return path if path and os.path.exists(path) else self.path
+
+    def pixels(self) -> np.ndarray:
+        """
+        RGB uint8 픽셀 배열 반환
+
+        cache_dir가 지정된 경우 최초 1회 디코딩 결과를 .npy로 저장하고,
+        이후에는 메모리 맵으로 열어 반복 분석 시 디코딩을 생략합니다.
+        """
+        if self._pixels is not None:
+            return self._pixels
+
+        if self.cache_dir is None:
+            with self.open() as image:
+                self._pixels = np.asarray(image.convert("RGB"))
+            return self._pixels
+
+        cache_path = os.path.join(
+            self.cache_dir,
+            os.path.splitext(os.path.basename(self.path))[0] + ".npy"
+        )
+        if not os.path.exists(cache_path):
+            with self.open() as image:
+                decoded = np.asarray(image.convert("RGB"))
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp_path = cache_path + ".tmp"
+            mapped = np.lib.format.open_memmap(tmp_path, mode='w+', dtype=np.uint8, shape=decoded.shape)
+            mapped[:] = decoded
+            mapped.flush()
+            del mapped
+            os.replace(tmp_path, cache_path)
+
+        self._pixels = np.load(cache_path, mmap_mode='r')
+        return self._pixels
+
+    def __repr__(self):
+        return f"LazySessionImage(index={self.index!r}, path={self.path!r})"
+
+
+class SessionReader(Mapping):
+    """
+    저장된 세션을 지연 로딩하는 읽기 전용 뷰
+
+    config.json만 읽고, 이미지는 인덱스로 접근할 때에만 파일을 엽니다.
+    """
+
+    def __init__(self, session_dir: str, use_memmap: bool = False):
+        self.session_dir = session_dir
+        config_path = os.path.join(session_dir, "config.json")
+        with open(config_path, 'r', encoding='utf-8') as f:
+            self.config = json.load(f)
+
+        cache_dir = os.path.join(session_dir, PIXEL_CACHE_DIR_NAME) if use_memmap else None
+        derivatives = self.config.get('derivatives') or {}
+        self._images = {
+            str(idx): LazySessionImage(str(idx), path, derivatives.get(str(idx)), cache_dir)
+            for idx, path in (self.config.get('saved_images') or {}).items()
+        }
+
+    def __getitem__(self, index) -> LazySessionImage:
+        return self._images[str(index)]
+
+    def __iter__(self):
+        return iter(sorted(self._images, key=lambda k: int(k) if k.isdigit() else k))
+
+    def __len__(self):
+        return len(self._images)
+
+    def image_paths(self) -> Dict[str, str]:
+        """인덱스별 원본 이미지 경로 (CLIP/메트릭 분석 입력용)"""
+        return {idx: self._images[idx].path for idx in self}
+
+
+def open_session(session_dir: str, use_memmap: bool = False) -> Optional[SessionReader]:
+    """
+    저장된 세션을 지연 로딩 방식으로 여는 함수
+
+    Args:
+        session_dir (str): 세션 디렉토리 경로
+        use_memmap (bool): 픽셀 배열을 메모리 맵 캐시로 유지할지 여부
+
+    Returns:
+        SessionReader: 세션 리더 (실패 시 None)
+    """
+    try:
+        return SessionReader(session_dir, use_memmap=use_memmap)
+    except Exception as e:
+        logging.error(f"세션 열기 중 오류 발생: {str(e)}")
+        return None
@@ -0,0 +1,132 @@
+import os
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from typing import Optional
+
+SHARED_CACHE_DIR = os.getenv("WEBTOONIZER_SHARED_CACHE_DIR", "shared_cache")
+SHARED_CACHE_MAX_BYTES = int(os.getenv("WEBTOONIZER_SHARED_CACHE_MAX_MB", "1024")) * 1024 * 1024
+PRUNE_EVERY = 200  # 이 횟수만큼 저장할 때마다 용량 확인
+
+
+def digest_key(*parts) -> str:
+    """바이트/문자열 조각들로 캐시 키 생성"""
+    hasher = hashlib.sha256()
+    for part in parts:
+        hasher.update(part if isinstance(part, bytes) else str(part).encode('utf-8'))
+        hasher.update(b'\x00')
+    return hasher.hexdigest()
+
+
+class SharedCache:
+    """
+    같은 호스트의 여러 앱 프로세스와 추론 워커가 함께 쓰는 디스크 캐시
+
+    SQLite(WAL 모드) 파일 하나에 네임스페이스별 키/값 바이트를 저장하므로
+    프로세스 간 잠금은 SQLite가 처리하며, 용량을 넘으면 오래 사용하지 않은 항목부터 삭제합니다.
+
+    네임스페이스: "llm"(채팅 응답), "image"(이미지 원본 바이트), "embedding"(CLIP 임베딩)
+    """
+
+    def __init__(self, cache_dir: str = SHARED_CACHE_DIR, max_bytes: int = SHARED_CACHE_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.db_path = os.path.join(cache_dir, "cache.sqlite3")
+        self._local = threading.local()
+        self._writes = 0
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+        conn = self._connection()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS entries (
+                namespace TEXT NOT NULL,
+                key TEXT NOT NULL,
+                value BLOB NOT NULL,
+                bytes INTEGER NOT NULL,
+                last_access REAL NOT NULL,
+                PRIMARY KEY (namespace, key)
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_access ON entries (last_access)")
+        conn.commit()
+
+    def _connection(self) -> sqlite3.Connection:
+        # 스레드마다 연결을 하나씩 유지 (sqlite3 연결은 스레드 간 공유 불가)
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, namespace: str, key: str) -> Optional[bytes]:
+        try:
+            conn = self._connection()
+            row = conn.execute(
+                "SELECT value FROM entries WHERE namespace = ? AND key = ?", (namespace, key)
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE entries SET last_access = ? WHERE namespace = ? AND key = ?",
+                (time.time(), namespace, key)
+            )
+            conn.commit()
+            return row[0]
+        except sqlite3.Error as e:
+            logging.warning(f"공유 캐시 조회 실패 ({namespace}): {str(e)}")
+            return None
+
+    def set(self, namespace: str, key: str, value: bytes):
+        try:
+            conn = self._connection()
+            conn.execute(
+                "INSERT OR REPLACE INTO entries (namespace, key, value, bytes, last_access) VALUES (?, ?, ?, ?, ?)",
+                (namespace, key, sqlite3.Binary(value), len(value), time.time())
+            )
+            conn.commit()
+        except sqlite3.Error as e:
+            logging.warning(f"공유 캐시 저장 실패 ({namespace}): {str(e)}")
+            return
+
+        with self._lock:
+            self._writes += 1
+            due = self._writes % PRUNE_EVERY == 0
+        if due:
+            self.prune()
+
+    def prune(self):
+        """용량 한도를 넘으면 오래 사용하지 않은 항목부터 삭제"""
+        conn = self._connection()
+        total = conn.execute("SELECT COALESCE(SUM(bytes), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        excess, removed = total - self.max_bytes, 0
+        rows = conn.execute("SELECT namespace, key, bytes FROM entries ORDER BY last_access").fetchall()
+        victims = []
+        for namespace, key, size in rows:
+            if removed >= excess:
+                break
+            victims.append((namespace, key))
+            removed += size
+        conn.executemany("DELETE FROM entries WHERE namespace = ? AND key = ?", victims)
+        conn.commit()
+        logging.info(f"공유 캐시 {len(victims)}개 항목 정리 ({removed / 1024 / 1024:.1f} MB)")
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_shared_cache() -> SharedCache:
+    """프로세스 공용 공유 디스크 캐시"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = SharedCache()
+    return _cache
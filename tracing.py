@@ -0,0 +1,307 @@
+import os
+import json
+import math
+import time
+import uuid
+import logging
+import threading
+import contextvars
+from collections import deque, defaultdict
+from contextlib import contextmanager
+from functools import wraps
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+TRACE_DIR = os.getenv("WEBTOONIZER_TRACE_DIR", "metrics")
+SPANS_FILENAME = "spans.jsonl"
+SPANS_MAX_BYTES = int(os.getenv("WEBTOONIZER_TRACE_MAX_MB", "50")) * 1024 * 1024  # 넘으면 spans.jsonl.1로 교체
+SPANS_BACKUPS = int(os.getenv("WEBTOONIZER_TRACE_BACKUPS", "3"))  # 보관할 이전 파일 수 (spans.jsonl.1 ~ .N)
+OPENMETRICS_FILENAME = "metrics.prom"
+EXPORT_QUANTILES = (0.5, 0.9, 0.99)
+
+_current_span = contextvars.ContextVar("current_span", default=None)
+
+
+class LatencyHistogram:
+    """
+    HDR 방식의 로그-선형 버킷 히스토그램 (밀리초 단위)
+
+    2의 거듭제곱 구간마다 SUB_BUCKETS개의 균등 하위 버킷을 두어
+    값의 크기와 무관하게 약 1/SUB_BUCKETS 이내의 상대 오차를 유지합니다.
+    """
+
+    SUB_BUCKETS = 32
+
+    def __init__(self):
+        self.counts: Dict[int, int] = defaultdict(int)
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = 0.0
+        self._lock = threading.Lock()
+
+    def _bucket_index(self, value: float) -> int:
+        if value < 1.0:
+            return int(value * self.SUB_BUCKETS)  # 1ms 미만은 선형 구간
+        exponent = int(math.floor(math.log2(value)))
+        sub = int((value / (2 ** exponent) - 1.0) * self.SUB_BUCKETS)
+        return (exponent + 1) * self.SUB_BUCKETS + min(sub, self.SUB_BUCKETS - 1)
+
+    def _bucket_upper(self, index: int) -> float:
+        if index < self.SUB_BUCKETS:
+            return (index + 1) / self.SUB_BUCKETS
+        exponent = index // self.SUB_BUCKETS - 1
+        sub = index % self.SUB_BUCKETS
+        return (2 ** exponent) * (1.0 + (sub + 1) / self.SUB_BUCKETS)
+
+    def record(self, value_ms: float):
+        value_ms = max(0.0, value_ms)
+        with self._lock:
+            self.counts[self._bucket_index(value_ms)] += 1
+            self.count += 1
+            self.total += value_ms
+            self.min = min(self.min, value_ms)
+            self.max = max(self.max, value_ms)
+
+    def percentile(self, q: float) -> float:
+        """q(0~1) 분위수 추정값"""
+        with self._lock:
+            if self.count == 0:
+                return 0.0
+            target = max(1, math.ceil(q * self.count))
+            seen = 0
+            for index in sorted(self.counts):
+                seen += self.counts[index]
+                if seen >= target:
+                    return min(self._bucket_upper(index), self.max)
+            return self.max
+
+    def snapshot(self) -> Dict:
+        return {
+            "count": self.count,
+            "sum_ms": self.total,
+            "min_ms": 0.0 if self.count == 0 else self.min,
+            "max_ms": self.max,
+            **{f"p{int(q * 100)}_ms": self.percentile(q) for q in EXPORT_QUANTILES},
+        }
+
+
+class Span:
+    def __init__(self, name: str, attributes: Dict, parent: Optional["Span"]):
+        self.name = name
+        self.attributes = attributes
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent.span_id if parent else None
+        self.trace_id = parent.trace_id if parent else uuid.uuid4().hex
+        self.start_wall = time.time()
+        self._start = time.perf_counter()
+        self.duration_ms = 0.0
+        self.error = None
+
+    def set_attribute(self, key: str, value):
+        self.attributes[key] = value
+
+    def finish(self):
+        self.duration_ms = (time.perf_counter() - self._start) * 1000
+
+    def to_dict(self) -> Dict:
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start": self.start_wall,
+            "duration_ms": round(self.duration_ms, 3),
+            "error": self.error,
+            "attributes": self.attributes,
+        }
+
+
+class Tracer:
+    """스팬을 기록하고 단계별 지연 히스토그램으로 집계"""
+
+    def __init__(self, trace_dir: str = TRACE_DIR, recent_limit: int = 5000,
+                 max_bytes: int = SPANS_MAX_BYTES, backups: int = SPANS_BACKUPS):
+        self.trace_dir = trace_dir
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.histograms: Dict[str, LatencyHistogram] = defaultdict(LatencyHistogram)
+        self.recent = deque(maxlen=recent_limit)
+        self.counters: Dict[str, Dict[tuple, float]] = defaultdict(lambda: defaultdict(float))
+        self._file_lock = threading.Lock()
+        self._histogram_lock = threading.Lock()
+        self._counter_lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name: str, **attributes):
+        parent = _current_span.get()
+        current = Span(name, attributes, parent)
+        token = _current_span.set(current)
+        try:
+            yield current
+        except Exception as e:
+            current.error = str(e)
+            raise
+        finally:
+            _current_span.reset(token)
+            current.finish()
+            self._record(current)
+
+    def _record(self, span: Span):
+        with self._histogram_lock:
+            histogram = self.histograms[span.name]
+        histogram.record(span.duration_ms)
+        self.recent.append(span)
+        try:
+            with self._file_lock:
+                os.makedirs(self.trace_dir, exist_ok=True)
+                path = os.path.join(self.trace_dir, SPANS_FILENAME)
+                with open(path, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(span.to_dict(), ensure_ascii=False, default=str) + "\n")
+                    size = f.tell()
+                if size >= self.max_bytes:
+                    self._rotate(path)
+        except Exception as e:
+            logging.error(f"스팬 기록 실패: {str(e)}")
+
+    def _rotate(self, path: str):
+        """크기 한도를 넘은 스팬 파일을 .1로 밀어내고 가장 오래된 파일 삭제 (_file_lock 안에서 호출)"""
+        if self.backups <= 0:
+            os.remove(path)
+            return
+        for index in range(self.backups - 1, 0, -1):
+            older = f"{path}.{index}"
+            if os.path.exists(older):
+                os.replace(older, f"{path}.{index + 1}")
+        os.replace(path, f"{path}.1")
+
+    def increment(self, name: str, value: float = 1.0, **labels):
+        """누적 카운터 증가 (비용, 토큰 수 등), 현재 스팬에도 속성으로 남김"""
+        key = tuple(sorted((k, str(v)) for k, v in labels.items()))
+        with self._counter_lock:
+            self.counters[name][key] += value
+        current = _current_span.get()
+        if current is not None:
+            current.attributes[name] = current.attributes.get(name, 0) + value
+
+    def trace_breakdown(self, trace_id: str) -> Dict[str, float]:
+        """
+        한 트레이스(에피소드) 안에서 스팬 이름별 누적 시간(초)
+
+        중첩된 스팬의 이중 집계를 피하기 위해 하위 스팬이 없는 말단 스팬만 합산합니다.
+        """
+        spans = [s for s in list(self.recent) if s.trace_id == trace_id]
+        parent_ids = {s.parent_id for s in spans}
+        breakdown = defaultdict(float)
+        for span in spans:
+            if span.span_id not in parent_ids:
+                breakdown[span.name] += span.duration_ms / 1000
+        return dict(sorted(breakdown.items(), key=lambda item: -item[1]))
+
+    def export_openmetrics(self) -> str:
+        """히스토그램을 OpenMetrics 텍스트 형식(summary)으로 변환"""
+        lines = [
+            "# TYPE webtoonizer_stage_latency_milliseconds summary",
+            "# UNIT webtoonizer_stage_latency_milliseconds milliseconds",
+        ]
+        with self._histogram_lock:
+            items = sorted(self.histograms.items())
+        for name, histogram in items:
+            for q in EXPORT_QUANTILES:
+                lines.append(
+                    f'webtoonizer_stage_latency_milliseconds{{stage="{name}",quantile="{q}"}} {histogram.percentile(q):.3f}'
+                )
+            lines.append(f'webtoonizer_stage_latency_milliseconds_sum{{stage="{name}"}} {histogram.total:.3f}')
+            lines.append(f'webtoonizer_stage_latency_milliseconds_count{{stage="{name}"}} {histogram.count}')
+
+        with self._counter_lock:
+            counters = {name: dict(series) for name, series in sorted(self.counters.items())}
+        for name, series in counters.items():
+            metric = f"webtoonizer_{name}"
+            lines.append(f"# TYPE {metric} counter")
+            for labels, value in sorted(series.items()):
+                label_text = ",".join(f'{k}="{v}"' for k, v in labels)
+                lines.append(f"{metric}_total{{{label_text}}} {value:.6f}")
+        lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+    def write_openmetrics(self, path: Optional[str] = None) -> str:
+        path = path or os.path.join(self.trace_dir, OPENMETRICS_FILENAME)
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(self.export_openmetrics())
+        return path
+
+
+_tracer = Tracer()
+
+
+def get_tracer() -> Tracer:
+    return _tracer
+
+
+def span(name: str, **attributes):
+    """전역 트레이서로 스팬 생성: `with span("dalle.generate", size=size):`"""
+    return _tracer.span(name, **attributes)
+
+
+def increment(name: str, value: float = 1.0, **labels):
+    """전역 트레이서 카운터 증가"""
+    _tracer.increment(name, value, **labels)
+
+
+def traced(name: str, **attributes):
+    """함수 호출 전체를 하나의 스팬으로 기록하는 데코레이터"""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with _tracer.span(name, **attributes):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def current_trace_id() -> Optional[str]:
+    current = _current_span.get()
+    return current.trace_id if current else None
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.rstrip("/") == "/metrics":
+            body = _tracer.export_openmetrics().encode('utf-8')
+            content_type = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+        elif self.path.rstrip("/") == "/spans":
+            recent: List[Span] = list(_tracer.recent)
+            body = "".join(json.dumps(s.to_dict(), ensure_ascii=False, default=str) + "\n" for s in recent).encode('utf-8')
+            content_type = "application/jsonl; charset=utf-8"
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+_metrics_server = None
+_metrics_server_lock = threading.Lock()
+
+
+def serve_metrics(host: str = "127.0.0.1", port: int = 9464) -> Optional[ThreadingHTTPServer]:
+    """/metrics(OpenMetrics)와 /spans(JSONL)를 제공하는 로컬 HTTP 엔드포인트 시작 (중복 호출 시 재사용)"""
+    global _metrics_server
+    with _metrics_server_lock:
+        if _metrics_server is None:
+            try:
+                _metrics_server = ThreadingHTTPServer((host, port), _MetricsHandler)
+            except OSError as e:
+                logging.warning(f"메트릭 엔드포인트 시작 실패 ({host}:{port}): {str(e)}")
+                return None
+            threading.Thread(target=_metrics_server.serve_forever, daemon=True, name="metrics-server").start()
+            logging.info(f"메트릭 엔드포인트 시작: http://{host}:{port}/metrics")
+    return _metrics_server
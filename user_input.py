@@ -1,60 +1,35 @@
 import streamlit as st
-import requests
-from bs4 import BeautifulSoup
-import re
 import logging
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+
+from news_ingest import get_news_ingestor
+from article_org import get_news_pipeline
+from cost_governor import activate_session_governor
+from image_gen import generate_image_from_text
+from image_derivatives import get_derivative_worker, display_source
 
 # 로깅 설정
 logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
 def search_news(query, sort='sim', client_id=None, client_secret=None):
-    """네이버 뉴스 API를 통해 뉴스 검색"""
-    url = f"https://openapi.naver.com/v1/search/news.json"
-    headers = {
-        "X-Naver-Client-Id": client_id,
-        "X-Naver-Client-Secret": client_secret
-    }
-    params = {
-        "query": query,
-        "sort": sort,
-        "display": 10
-    }
-    
-    response = requests.get(url, headers=headers, params=params)
-    return response.json() if response.status_code == 200 else None
+    """네이버 뉴스 API를 통해 뉴스 검색 (결과는 잠시 캐시)"""
+    return get_news_ingestor().search(query, sort, client_id, client_secret)
 
 def extract_news_content(url):
-    """네이버 뉴스 기사 내용 추출"""
+    """네이버 뉴스 기사 내용 추출 (미리 가져온 본문이 있으면 재사용)"""
     logger.info(f"Extracting content from: {url}")
     try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
-        
-        response = requests.get(url, headers=headers)
-        response.raise_for_status()
-        
-        soup = BeautifulSoup(response.text, 'html.parser')
-        
-        # 여러 가능한 본문 영역을 순차적으로 시도
-        article = soup.select_one('#dic_area') or soup.select_one('#articleBodyContents') or soup.select_one('.news_end')
-        
-        if article:
-            for tag in article.select('script, iframe, style'):
-                tag.decompose()
-            
-            content = article.get_text(strip=True)
-            logger.info(f"Successfully extracted content (length: {len(content)})")
-            return re.sub(r'\s+', ' ', content)
-        
-        logger.warning("No article content found in any known sections")
-        return None
-
+        return get_news_ingestor().extract(url)
     except Exception as e:
         logger.error(f"Error in extract_news_content: {e}")
         return None
 
+def extract_news_contents(urls):
+    """여러 기사 내용을 동시에 추출 ({url: 본문 또는 None})"""
+    return get_news_ingestor().extract_many(urls)
+
 
 def render_news_search():
     """뉴스 검색 페이지 렌더링"""
@@ -77,6 +52,8 @@ def render_news_search():
             results = search_news(search_query, sort_param, st.session_state.get('NAVER_CLIENT_ID'), st.session_state.get('NAVER_CLIENT_SECRET'))
             
             if results and 'items' in results:
+                # 사용자가 고르기 전에 결과 기사 본문을 동시에 미리 가져옴
+                get_news_ingestor().prefetch([item['link'] for item in results['items']])
                 for idx, item in enumerate(results['items']):
                     col1, col2 = st.columns([4, 1])
                     with col1:
@@ -132,3 +109,64 @@ def generate_final_prompt(article_content, extracted_info, simplified_content, w
         f"Use vibrant colors, keep details clear, and avoid including text in the image. Limit characters to two or fewer, and exclude unmentioned details."
     )
     return prompt
+
+
+def render_generate_webtoon(client):
+    """선택한 뉴스 기사를 웹툰 장면과 이미지로 변환하는 페이지"""
+    st.markdown("<h1 style='text-align: center;'>뉴스 웹툰 만들기</h1>", unsafe_allow_html=True)
+
+    article = st.session_state.get('selected_article')
+    content = st.session_state.get('article_content')
+    if not article or not content:
+        st.warning("먼저 뉴스 기사를 선택해주세요.")
+        if st.button("뉴스 검색으로 돌아가기"):
+            st.session_state.page = 'news_search'
+            st.rerun()
+        return
+
+    title = article['title'].replace('<b>', '').replace('</b>', '')
+    st.markdown(f"### {title}")
+    activate_session_governor(st.session_state)
+
+    with st.spinner("기사 분석 중..."):
+        result = get_news_pipeline(client).process_article(title, content, article.get('url'))
+    st.session_state.extracted_info = result['extracted_info']
+    st.session_state.simplified_content = result['simplified_content']
+    st.session_state.webtoon_episode = result['scenes']
+
+    if not result['scenes']:
+        st.error("기사에서 웹툰 장면을 만들지 못했습니다.")
+        return
+
+    with st.expander("📝 핵심 정보", expanded=False):
+        st.write("\n".join(result['extracted_info'] or []))
+    with st.expander("💡 쉬운 용어 설명", expanded=False):
+        st.write("\n".join(result['simplified_content'] or []))
+    with st.expander("🎬 웹툰 장면", expanded=True):
+        for scene in result['scenes']:
+            st.write(scene)
+
+    if st.button("🎨 웹툰 이미지 생성"):
+        overview = "\n".join(result['extracted_info'] or [])
+        prompts = [
+            generate_final_prompt(title, overview, "\n".join(result['simplified_content'] or []), scene)
+            for scene in result['scenes']
+        ]
+        with st.spinner("이미지 생성 중..."):
+            # 컷 이미지는 서로 독립적이므로 동시에 생성
+            with ThreadPoolExecutor(max_workers=len(prompts)) as pool:
+                futures = [
+                    pool.submit(contextvars.copy_context().run, generate_image_from_text, prompt, "webtoon")
+                    for prompt in prompts
+                ]
+                image_urls = [future.result()[0] for future in futures]
+        st.session_state.selected_images = {i: url for i, url in enumerate(image_urls) if url}
+        for url in st.session_state.selected_images.values():
+            get_derivative_worker().submit_source(url)
+
+    images = st.session_state.get('selected_images') or {}
+    if images:
+        cols = st.columns(min(2, len(images)))
+        for i, (index, url) in enumerate(sorted(images.items())):
+            with cols[i % 2]:
+                st.image(display_source(url), caption=f"컷 {index + 1}", use_column_width=True)
@@ -5,11 +5,12 @@ import os
 from openai import OpenAI
 import requests
 from dotenv import load_dotenv
-from clip_analyzer import CLIPAnalyzer
+from clip_analyzer import get_clip_analyzer
+from tracing import serve_metrics
+from prompt_templates import get_prompt_registry
 
 # 각 기능별 모듈 import
-from article_org import extract_news_info, simplify_terms_dynamically, generate_webtoon_scenes
-from user_input import render_news_search, search_news, generate_final_prompt
+from user_input import render_news_search, render_generate_webtoon
 from general_text_input import TextToWebtoonConverter
 from nonfiction_input import NonFictionConverter
 
@@ -21,6 +22,13 @@ client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 NAVER_CLIENT_ID = os.getenv("NAVER_CLIENT_ID")
 NAVER_CLIENT_SECRET = os.getenv("NAVER_CLIENT_SECRET")
 
+# 단계별 지연 메트릭 엔드포인트 (포트가 지정된 경우에만 실행)
+if os.getenv("WEBTOONIZER_METRICS_PORT"):
+    serve_metrics(port=int(os.getenv("WEBTOONIZER_METRICS_PORT")))
+
+# 프롬프트 템플릿의 모든 가이드 조합을 시작 시 검증 (잘못된 가이드는 첫 생성 전에 드러남)
+get_prompt_registry()
+
 # 세션 상태 초기화
 if "page" not in st.session_state:
     st.session_state.update({
@@ -95,15 +103,15 @@ def render_home():
         st.write("---")  # 구분선 추가
 
         # 뉴스 시각화 버튼 추가
-        #if st.button("📰 뉴스 시각화", use_container_width=True, key="news"):
-            #st.session_state.page = "news_search"
-            #st.rerun()
+        if st.button("📰 뉴스 시각화", use_container_width=True, key="news"):
+            st.session_state.page = "news_search"
+            st.rerun()
 
-        #st.markdown("""
-        #<div class="description">
-        #최신 뉴스 기사를 검색하고 웹툰으로 변환합니다.
-        #</div>
-        #""", unsafe_allow_html=True)
+        st.markdown("""
+        <div class="description">
+        최신 뉴스 기사를 검색하고 웹툰으로 변환합니다.
+        </div>
+        """, unsafe_allow_html=True)
 
 def main():
     st.set_page_config(
@@ -126,7 +134,8 @@ def main():
         
     elif st.session_state.page == "text_input":
         try:
-            clip_analyzer = CLIPAnalyzer()
+            # 프로세스 공용 분석기 (워커 모드에서는 원격 추론 워커 사용)
+            clip_analyzer = get_clip_analyzer()
             converter = TextToWebtoonConverter(client, clip_analyzer)
             converter.render_ui()
         except Exception as e:
@@ -134,10 +143,22 @@ def main():
             
     elif st.session_state.page == "nonfiction_input":
         try:
-            converter = NonFictionConverter(client)
+            converter = NonFictionConverter(client, get_clip_analyzer())
             converter.render_ui()
         except Exception as e:
             st.error(f"교육/과학 콘텐츠 처리 중 오류 발생: {str(e)}")
+
+    elif st.session_state.page == "news_search":
+        try:
+            render_news_search()
+        except Exception as e:
+            st.error(f"뉴스 검색 중 오류 발생: {str(e)}")
+
+    elif st.session_state.page == "generate_webtoon":
+        try:
+            render_generate_webtoon(client)
+        except Exception as e:
+            st.error(f"뉴스 웹툰 생성 중 오류 발생: {str(e)}")
   
     # 에러 처리
     try: